@@ -0,0 +1,41 @@
+#!/bin/bash
+
+# Servicio de backtests persistente (mhm/service.py): velas, exchange y estrategia
+# quedan en memoria entre runs, así que cada backtest solo paga el backtest.
+#
+#   ./backtest_service.sh start                      # arranca el servicio (contenedor en segundo plano)
+#   ./backtest_service.sh                            # mismo run que test_BREAKEVEN_v7.sh
+#   ./backtest_service.sh -p BTC/USDT ETH/USDT --timerange 20241101-20241201
+#   ./backtest_service.sh --engine fast              # backtester rápido (mhm.backtest)
+#   ./backtest_service.sh status | stop
+
+CONTAINER=freqtrade-backtests
+
+client() {
+  docker exec "$CONTAINER" python -m mhm.client "$@"
+}
+
+case "$1" in
+  start)
+    docker compose run -d --rm --name "$CONTAINER" \
+      -e PYTHONPATH=/freqtrade/user_data/strategies \
+      --entrypoint python \
+      freqtrade -m mhm.service \
+      -c user_data/config.json
+    ;;
+  status)
+    client status
+    ;;
+  stop)
+    client shutdown
+    ;;
+  *)
+    client backtest \
+      -s MultiHorizonMomentum \
+      -p BTC/USDT \
+      --timerange 20241120-20241210 \
+      --fee 0.0002 \
+      --timeframe 1m \
+      "$@"
+    ;;
+esac
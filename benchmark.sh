@@ -0,0 +1,15 @@
+#!/bin/bash
+
+echo "⏱  Hot-path benchmarks - MultiHorizonMomentum / SampleStrategy"
+echo "==============================================================="
+echo "Velas 1m sintéticas (seed fija), sin exchange ni datos descargados."
+echo "--save guarda la baseline; sin --save compara y sale con 1 si hay regresiones."
+echo ""
+
+docker compose run --rm \
+  -e PYTHONPATH=/freqtrade/user_data/strategies \
+  --entrypoint python \
+  freqtrade -m mhm.bench \
+  --days 365 \
+  --pairs 100 \
+  "$@"
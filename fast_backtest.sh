@@ -0,0 +1,19 @@
+#!/bin/bash
+
+echo "⚡ Fast backtest - MultiHorizonMomentum (pure ATR exits)"
+echo "========================================================"
+echo "Mismo par / timerange / fee que test_BREAKEVEN_v7.sh, sin el loop de freqtrade."
+echo "Argumentos extra se pasan tal cual (p.ej. --compare user_data/backtest_results/<resultado>.zip)"
+echo ""
+
+docker compose run --rm \
+  -e PYTHONPATH=/freqtrade/user_data/strategies \
+  --entrypoint python \
+  freqtrade -m mhm.backtest \
+  -c user_data/config.json \
+  -s MultiHorizonMomentum \
+  -p BTC/USDT \
+  --timerange 20241120-20241210 \
+  --fee 0.0002 \
+  --timeframe 1m \
+  "$@"
@@ -0,0 +1,48 @@
+"""Puts the strategy directory on ``sys.path`` so the ``mhm`` package imports like in freqtrade."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+STRATEGIES = ROOT / "user_data" / "strategies"
+
+if str(STRATEGIES) not in sys.path:
+    sys.path.insert(0, str(STRATEGIES))
+
+BACKTEST_PAIRS = ["BTC/USDT", "ETH/USDT"]
+BACKTEST_TIMERANGE = "20240110-20240124"
+
+
+@pytest.fixture(scope="session")
+def backtest_config(tmp_path_factory) -> dict:
+    """
+    Fast-backtest config of MultiHorizonMomentum over seeded synthetic 1m / 15m
+    candles (``mhm.bench.synthetic_ohlcv``) in a temporary json datadir.
+    """
+    from freqtrade.configuration import Configuration
+    from freqtrade.data.history import get_datahandler
+    from freqtrade.enums import CandleType, RunMode
+
+    from mhm.bench import synthetic_ohlcv
+    from mhm.resample import resample_ohlcv
+
+    user_data = tmp_path_factory.mktemp("user_data")
+    datadir = user_data / "data" / "binance"
+    datadir.mkdir(parents=True)
+    handler = get_datahandler(datadir, "json")
+    for pair in BACKTEST_PAIRS:
+        candles = synthetic_ohlcv(pair, days=24, seed=1)
+        handler.ohlcv_store(pair, "1m", candles, CandleType.SPOT)
+        handler.ohlcv_store(pair, "15m", resample_ohlcv(candles, "15m"), CandleType.SPOT)
+
+    config = Configuration({
+        "config": [str(ROOT / "user_data" / "config.json")],
+        "strategy": "MultiHorizonMomentum", "strategy_path": str(STRATEGIES),
+        "user_data_dir": str(user_data), "datadir": str(datadir),
+        "timerange": BACKTEST_TIMERANGE, "timeframe": "1m", "fee": 0.0002,
+        "pairs": BACKTEST_PAIRS,
+    }, RunMode.BACKTEST).get_config()
+    config["dataformat_ohlcv"] = "json"
+    return config
@@ -0,0 +1,25 @@
+"""Chunked backtests give the trades of a single run."""
+
+import pandas as pd
+
+from mhm.backtest import run
+from mhm.chunked import run_chunked, walk_forward
+
+
+def test_chunks_match_single_run(backtest_config):
+    single, single_rejected = run(backtest_config)
+    assert len(single)
+
+    # Warm-up por defecto: las EMAs de cada chunk convergen a las de la ejecución completa
+    chunked, chunked_rejected = run_chunked(backtest_config, chunks=3, workers=1)
+    pd.testing.assert_frame_equal(chunked, single)
+    assert chunked_rejected == single_rejected
+
+
+def test_walk_forward_keeps_integer_parameters(backtest_config):
+    table = walk_forward(backtest_config, 5, 4, grid={"EMA_FAST_PERIOD": [20, 30]}, workers=1)
+    assert len(table) == 3
+    # Cada ventana corre con el periodo elegido: un float rompería ta.EMA
+    for period in table["EMA_FAST_PERIOD"]:
+        assert period in (20, 30)
+    assert table["EMA_FAST_PERIOD"].dtype.kind == "i"
@@ -0,0 +1,124 @@
+"""Candle-close events against the kline replay server."""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mhm.events import CandleEvents, ExitWatch, ReplayServer, install_wakeup
+from mhm.exits import ExitLevels
+
+
+def _wait(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _candles(close: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": pd.date_range("2024-11-01", periods=len(close), freq="1min", tz="UTC"),
+        "open": close, "high": close + 0.1, "low": close - 0.1, "close": close,
+        "volume": np.full(len(close), 10.0),
+    })
+
+
+@pytest.fixture
+def replay():
+    # BTC sube de 100 a 103 durante 30 velas; ETH solo tiene la primera
+    candles = {"BTC/USDT": _candles(np.linspace(100.0, 103.0, 30)),
+               "ETH/USDT": _candles(np.array([50.0]))}
+    server = ReplayServer(candles, "1m", speed=600, port=0)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+    yield f"ws://127.0.0.1:{server.port}"
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def _levels(take_profit: float, trail: float = 0.0, stop_distance: float = 10.0) -> ExitLevels:
+    return ExitLevels(atr=1.0, take_profit=take_profit, trail=trail, stop_distance=stop_distance)
+
+
+def test_due_returns_only_closed_pairs(replay):
+    pairs = ["BTC/USDT", "ETH/USDT"]
+    events = CandleEvents(replay, "1m")
+    events.watch(pairs)
+    events.start()
+    try:
+        assert _wait(lambda: None not in (events.last_closed(pair) for pair in pairs))
+        assert sorted(events.due(pairs)) == pairs
+        seen = events.last_closed("BTC/USDT")
+        assert _wait(lambda: events.last_closed("BTC/USDT") > seen)
+        assert events.due(pairs) == ["BTC/USDT"]
+    finally:
+        events.stop()
+
+
+def test_exit_level_crossing_wakes_the_loop(replay):
+    watch = ExitWatch(min_interval=60.0)
+    watch.update("BTC/USDT", 1, open_rate=100.0, max_rate=None, levels=_levels(102.0))
+    hits = []
+
+    def on_price(pair: str, price: float) -> bool:
+        hit = watch.hit(pair, price)
+        if hit:
+            hits.append(price)
+        return hit
+
+    events = CandleEvents(replay, "1m", on_price=on_price)
+    events.watch(["BTC/USDT"])
+    events.start()
+    try:
+        assert _wait(lambda: hits)
+    finally:
+        events.stop()
+    assert hits[0] >= 102.0
+    assert len(hits) == 1           # min_interval: una sola alarma por trade
+
+
+def test_exit_watch_levels():
+    watch = ExitWatch(min_interval=0.0)
+    watch.update("BTC/USDT", 1, open_rate=100.0, max_rate=None,
+                 levels=_levels(take_profit=105.0, trail=103.0, stop_distance=2.0))
+    assert not watch.hit("BTC/USDT", 101.0)
+    assert not watch.hit("ETH/USDT", 200.0)
+    assert not watch.hit("BTC/USDT", 97.5)       # stop: custom_stoploss desactivado
+    assert watch.hit("BTC/USDT", 105.0)          # take-profit
+    assert watch.hit("BTC/USDT", 102.0)          # trailing: el máximo pasó de 103
+    watch.drop(1)
+    assert not watch.hit("BTC/USDT", 97.0)
+
+
+def test_exit_watch_stop_with_custom_stoploss():
+    watch = ExitWatch(min_interval=0.0, stoploss=True)
+    watch.update("BTC/USDT", 1, open_rate=100.0, max_rate=None,
+                 levels=_levels(take_profit=105.0, trail=103.0, stop_distance=2.0))
+    assert not watch.hit("BTC/USDT", 98.5)
+    assert watch.hit("BTC/USDT", 97.5)
+
+
+def test_install_wakeup_restores_worker_sleep():
+    from freqtrade.worker import Worker
+
+    original = Worker.__dict__["_sleep"]
+    events = CandleEvents("ws://127.0.0.1:9", "1m")
+    restore = install_wakeup(events)
+    try:
+        assert Worker._sleep == events.sleep
+        events._wake.set()
+        started = time.monotonic()
+        Worker._sleep(5)
+        assert time.monotonic() - started < 1
+    finally:
+        restore()
+    assert Worker.__dict__["_sleep"] is original
@@ -0,0 +1,52 @@
+"""Strategy metrics endpoint on the API server."""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+
+from mhm.metrics import METRICS_PATH, StrategyMetrics, bot_rpc, register_endpoint
+
+testclient = pytest.importorskip("fastapi.testclient")
+
+
+def _data_provider(app: FastAPI):
+    """The bot's DataProvider, with an RPCManager holding only the API server."""
+    from freqtrade.data.dataprovider import DataProvider
+    from freqtrade.rpc import RPCManager
+
+    rpc = RPCManager.__new__(RPCManager)    # sin arrancar Telegram / uvicorn
+    rpc.registered_modules = [SimpleNamespace(name="apiserver", app=app)]
+    return DataProvider({"timeframe": "1m"}, None, rpc=rpc)
+
+
+def test_endpoint_serves_the_latest_metrics():
+    from freqtrade.rpc.api_server.api_auth import http_basic_or_jwt_token
+
+    app = FastAPI()
+    app.dependency_overrides[http_basic_or_jwt_token] = lambda: None
+    rpc = bot_rpc(_data_provider(app))
+    client = testclient.TestClient(app)
+
+    first, second = StrategyMetrics(), StrategyMetrics()
+    first.observe("populate_indicators", 0.01)
+    assert register_endpoint(rpc, first)
+    assert "populate_indicators" in client.get(METRICS_PATH).text
+
+    # /reload_config: nueva instancia de la estrategia, misma app
+    second.observe("custom_exit", 0.001)
+    assert register_endpoint(rpc, second)
+    body = client.get(METRICS_PATH).text
+    assert "custom_exit" in body and "populate_indicators" not in body
+    assert sum(getattr(route, "path", None) == METRICS_PATH for route in app.router.routes) == 1
+
+
+def test_no_api_server():
+    from freqtrade.data.dataprovider import DataProvider
+
+    assert bot_rpc(DataProvider({"timeframe": "1m"}, None)) is None
+    assert not register_endpoint(None, StrategyMetrics())
+    # RPC sin api_server (solo Telegram, p. ej.)
+    rpc = bot_rpc(_data_provider(None))
+    rpc.registered_modules = [SimpleNamespace(name="telegram")]
+    assert not register_endpoint(rpc, StrategyMetrics())
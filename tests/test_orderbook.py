@@ -0,0 +1,98 @@
+"""Order-book cache, depth stream and the exchange patch."""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mhm.orderbook import (BookReplayServer, OrderBookCache, OrderBookStream,
+                           install_order_book_cache)
+
+
+class FakeExchange:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def fetch_l2_order_book(self, pair: str, limit: int = 100) -> dict:
+        self.calls.append((pair, limit))
+        return {"symbol": pair, "bids": [[99.0, 1.0]] * limit, "asks": [[101.0, 1.0]] * limit}
+
+
+def _book(levels: int, bid: float = 100.0) -> dict:
+    return {"bids": [[bid, 1.0]] * levels, "asks": [[bid + 1, 1.0]] * levels}
+
+
+def _wait(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def book_server():
+    close = np.linspace(100.0, 101.0, 30)
+    candles = {"BTC/USDT": pd.DataFrame({
+        "date": pd.date_range("2024-11-01", periods=len(close), freq="1min", tz="UTC"),
+        "open": close, "high": close + 0.5, "low": close - 0.5, "close": close,
+        "volume": np.full(len(close), 40.0),
+    })}
+    server = BookReplayServer(candles, "1m", speed=600, port=0)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def test_stream_fills_cache(book_server):
+    cache = OrderBookCache(ttl=5.0)
+    books = OrderBookStream(f"ws://127.0.0.1:{book_server.port}", cache)
+    books.watch(["BTC/USDT", "ETH/USDT"])
+    books.start()
+    try:
+        assert _wait(lambda: cache.get("BTC/USDT", 20) is not None)
+    finally:
+        books.stop()
+
+    book = cache.get("BTC/USDT", 20)
+    assert len(book["bids"]) == len(book["asks"]) == 20
+    assert book["bids"][0][0] < book["asks"][0][0]
+    assert 99.0 < book["bids"][0][0] < 102.0
+    assert cache.get("BTC/USDT", 21) is None        # más niveles de los que da el stream
+    assert cache.get("ETH/USDT", 1) is None         # sin velas en el replay
+
+
+def test_install_answers_within_ttl_and_restores():
+    exchange = FakeExchange()
+    cache = OrderBookCache(ttl=0.2)
+    restore = install_order_book_cache(exchange, cache)
+
+    cache.put("BTC/USDT", _book(20), 20)
+    assert exchange.fetch_l2_order_book("BTC/USDT", 1) is cache.get("BTC/USDT", 1)
+    assert exchange.calls == []
+
+    # Demasiado superficial: check_depth_of_market pide 1000 niveles
+    deep = exchange.fetch_l2_order_book("BTC/USDT", 1000)
+    assert exchange.calls == [("BTC/USDT", 1000)]
+    assert exchange.fetch_l2_order_book("BTC/USDT", 1000) is deep
+    assert len(exchange.calls) == 1
+
+    # Libro caducado: vuelve a REST
+    time.sleep(0.25)
+    exchange.fetch_l2_order_book("BTC/USDT", 1)
+    assert exchange.calls[-1] == ("BTC/USDT", 1)
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    restore()
+    assert "fetch_l2_order_book" not in vars(exchange)
+    exchange.fetch_l2_order_book("BTC/USDT", 1)
+    assert len(exchange.calls) == 3
@@ -0,0 +1,54 @@
+"""Forked analysis workers and what happens when one of them dies."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mhm.parallel import FORK_AVAILABLE, ParallelAnalyzer, shard_of
+
+pytestmark = pytest.mark.skipif(not FORK_AVAILABLE, reason="needs the fork start method")
+
+PAIRS = ["BTC/USDT", "ETH/USDT", "ADA/USDT"]
+
+
+class DoublingStrategy:
+    dp = SimpleNamespace(runmode="dry_run")
+
+    def analyze_ticker(self, dataframe, metadata):
+        return dataframe.assign(double=dataframe["close"] * 2)
+
+
+def _frames():
+    return {pair: pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=50, freq="1min", tz="UTC"),
+        "close": np.arange(50, dtype=np.float64) + i,
+    }) for i, pair in enumerate(PAIRS)}
+
+
+def test_workers_analyze_every_pair():
+    analyzer = ParallelAnalyzer(DoublingStrategy(), 2)
+    analyzer.start()
+    try:
+        frames = _frames()
+        results = analyzer.analyze(frames, {})
+        assert sorted(results) == sorted(PAIRS)
+        for pair, frame in frames.items():
+            np.testing.assert_array_equal(results[pair]["double"], frame["close"] * 2)
+            pd.testing.assert_series_equal(results[pair]["date"], frame["date"])
+    finally:
+        analyzer.close()
+
+
+def test_dead_worker_stops_the_pool_for_good():
+    analyzer = ParallelAnalyzer(DoublingStrategy(), 2)
+    assert analyzer.analyze(_frames(), {}) == {}       # sin start: en serie
+    analyzer.start()
+    proc, _ = analyzer._procs[shard_of(PAIRS[0], 2)]
+    proc.terminate()
+    proc.join()
+
+    assert analyzer.analyze(_frames(), {}) == {}
+    assert not analyzer.running
+    assert analyzer.analyze(_frames(), {}) == {}
@@ -0,0 +1,53 @@
+"""Shared indicator registry."""
+
+import numpy as np
+import pandas as pd
+import talib.abstract as ta
+
+import freqtrade.vendor.qtpylib.indicators as qtpylib
+
+from mhm.registry import IndicatorRegistry, indicator
+
+
+def _candles(rows: int = 300) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows)))
+    return pd.DataFrame({
+        "date": pd.date_range("2024-11-01", periods=rows, freq="1min", tz="UTC"),
+        "open": close, "high": close * 1.001, "low": close * 0.999, "close": close,
+        "volume": rng.uniform(1, 10, rows),
+    })
+
+
+class Owner:
+    pass
+
+
+def test_functions_match_talib_abstract():
+    frame = _candles()
+    shared = IndicatorRegistry().functions("BTC/USDT", "1m")
+
+    pd.testing.assert_series_equal(shared.RSI(frame), ta.RSI(frame), check_names=False)
+    pd.testing.assert_frame_equal(shared.MACD(frame), ta.MACD(frame))
+    bollinger = qtpylib.bollinger_bands(qtpylib.typical_price(frame), window=20, stds=2)
+    np.testing.assert_array_equal(shared.BOLLINGER_TP(frame, window=20, stds=2)["mid"],
+                                  bollinger["mid"])
+
+
+def test_outputs_shared_between_owners():
+    registry = IndicatorRegistry()
+    first, second = Owner(), Owner()
+    registry.acquire(first, "1m", [indicator("RSI", "rsi")])
+    registry.acquire(second, "1m", [indicator("RSI", "rsi_14", timeperiod=14)])
+    frame = _candles()
+
+    registry.populate(frame.copy(), "BTC/USDT", "1m", [indicator("RSI", "rsi")])
+    rsi = registry.functions("BTC/USDT", "1m").RSI(frame, timeperiod=14)
+    assert (registry.computations, registry.hits) == (1, 1)
+    np.testing.assert_array_equal(rsi, ta.RSI(frame))
+
+    # Con un solo dueño no se guarda nada
+    registry.release(second)
+    registry.populate(frame.copy(), "BTC/USDT", "1m", [indicator("RSI", "rsi")])
+    registry.populate(frame.copy(), "BTC/USDT", "1m", [indicator("RSI", "rsi")])
+    assert (registry.computations, registry.hits) == (3, 1)
@@ -0,0 +1,119 @@
+"""Incremental higher-timeframe bars and the resampling DataProvider."""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mhm.bench import synthetic_ohlcv
+from mhm.resample import Resampler, ResampledDataProvider, resample_ohlcv
+
+TIMEFRAMES = ("15m", "1h")
+
+
+@pytest.fixture(scope="module")
+def candles() -> pd.DataFrame:
+    return synthetic_ohlcv("BTC/USDT", days=2, seed=3)
+
+
+def _pandas_bars(candles: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    rule = timeframe.replace("m", "min")
+    bars = candles.resample(rule, on="date").agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+    return bars.reset_index()
+
+
+class FakeProvider:
+    """The bot's dp: the 1m candles up to the current one, nothing else resampled."""
+
+    runmode = "backtest"
+
+    def __init__(self, candles: pd.DataFrame) -> None:
+        self.candles = candles
+        self.rows = len(candles)
+
+    def get_pair_dataframe(self, pair, timeframe=None, candle_type=""):
+        if timeframe == "1m":
+            return self.candles.iloc[:self.rows]
+        return pd.DataFrame({"from": ["exchange"]})
+
+
+@pytest.mark.parametrize("timeframe", TIMEFRAMES)
+def test_resample_matches_pandas(candles, timeframe):
+    bars = resample_ohlcv(candles, timeframe)
+    expected = _pandas_bars(candles, timeframe)
+    np.testing.assert_array_equal(bars["date"].to_numpy(), expected["date"].to_numpy())
+    np.testing.assert_allclose(bars[["open", "high", "low", "close", "volume"]].to_numpy(),
+                               expected[["open", "high", "low", "close", "volume"]].to_numpy())
+
+
+def test_incremental_updates_match_one_pass(candles):
+    # Cortes dentro de una barra, justo en su cierre y de una sola vela
+    cuts = [0, 7, 15, 16, 59, 60, 61, 500, 501, 1439, len(candles) - 5]
+    resampler = Resampler("1m", TIMEFRAMES)
+    for start, stop in zip(cuts, cuts[1:]):
+        # Solapadas como las ventanas del bot: solo cuentan las velas nuevas
+        assert resampler.update("BTC/USDT", candles.iloc[max(start - 3, 0):stop]) == stop - start
+    assert resampler.update("BTC/USDT", candles.iloc[:cuts[-1]]) == 0
+
+    head = candles.iloc[:cuts[-1]]
+    for timeframe in TIMEFRAMES:
+        full = resample_ohlcv(head, timeframe)
+        # La última barra sigue abierta: 5 velas de 1m faltan para cerrarla
+        pd.testing.assert_frame_equal(resampler.dataframe("BTC/USDT", timeframe), full.iloc[:-1])
+        pd.testing.assert_frame_equal(
+            resampler.dataframe("BTC/USDT", timeframe, include_open=True), full)
+
+
+def test_bar_closes_with_its_last_base_candle(candles):
+    resampler = Resampler("1m", ["15m"], max_bars=3)
+    resampler.update("BTC/USDT", candles.iloc[:14])
+    assert resampler.dataframe("BTC/USDT", "15m").empty
+    resampler.update("BTC/USDT", candles.iloc[:15])
+    assert len(resampler.dataframe("BTC/USDT", "15m")) == 1
+
+    resampler.update("BTC/USDT", candles.iloc[:150])
+    bars = resampler.dataframe("BTC/USDT", "15m")
+    pd.testing.assert_frame_equal(bars, resample_ohlcv(candles.iloc[:150], "15m").iloc[-3:]
+                                  .reset_index(drop=True))
+
+
+def test_until_only_returns_bars_closed_by_then(candles):
+    resampler = Resampler("1m", ["15m"])
+    resampler.update("BTC/USDT", candles)
+    dates = candles["date"]
+    # La vela de las 00:14 cierra la barra de las 00:00; la de las 00:13 no
+    assert len(resampler.dataframe("BTC/USDT", "15m", until=dates.iat[13].value)) == 0
+    assert len(resampler.dataframe("BTC/USDT", "15m", until=dates.iat[14].value)) == 1
+    assert len(resampler.dataframe("BTC/USDT", "15m", until=dates.iat[44].value)) == 3
+
+
+def test_provider_serves_closed_bars_up_to_the_current_candle(candles):
+    dp = FakeProvider(candles)
+    dp.rows = 600
+    history = candles.iloc[:500]
+    wrapped = ResampledDataProvider(dp, "1m", ["15m"], history=lambda pair: history)
+
+    bars = wrapped.get_pair_dataframe("BTC/USDT", "15m")
+    pd.testing.assert_frame_equal(bars, resample_ohlcv(candles.iloc[:600], "15m"))
+    # Sin remuestrear: al dp del bot
+    assert wrapped.get_pair_dataframe("BTC/USDT", "4h")["from"].iat[0] == "exchange"
+    assert wrapped.runmode == "backtest"
+
+    # Backtest: el dp devuelve las velas hasta la actual, las barras se cortan igual
+    dp.rows = 580
+    bars = wrapped.get_pair_dataframe("BTC/USDT", "15m")
+    pd.testing.assert_frame_equal(bars, resample_ohlcv(candles.iloc[:585], "15m").iloc[:-1])
+
+
+def test_provider_pickles(candles):
+    # Hyperopt envía la estrategia, dp incluido, a los workers
+    wrapped = ResampledDataProvider(FakeProvider(candles), "1m", ["15m"])
+    wrapped.get_pair_dataframe("BTC/USDT", "15m")
+    copy = pickle.loads(pickle.dumps(wrapped))
+    assert copy.runmode == "backtest"
+    pd.testing.assert_frame_equal(copy.get_pair_dataframe("BTC/USDT", "15m"),
+                                  wrapped.get_pair_dataframe("BTC/USDT", "15m"))
+    with pytest.raises(AttributeError):
+        copy.__missing_dunder__
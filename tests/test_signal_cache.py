@@ -0,0 +1,41 @@
+"""Reused entry signals give the trades of a full run."""
+
+import pandas as pd
+
+from mhm.backtest import run
+from mhm.signal_cache import SignalCache
+
+
+class CountingCache(SignalCache):
+    def __init__(self, directory) -> None:
+        super().__init__(directory)
+        self.reused = 0
+
+    def load(self, key: str):
+        pairs = super().load(key)
+        self.reused += pairs is not None
+        return pairs
+
+
+def test_exit_change_reuses_signals_with_identical_trades(backtest_config, tmp_path):
+    cache = CountingCache(tmp_path)
+    first, _ = run(backtest_config, signal_cache=cache)
+    assert cache.reused == 0
+    pd.testing.assert_frame_equal(run(backtest_config, signal_cache=cache)[0], first)
+    assert cache.reused == 1
+
+    # Solo cambia la salida: mismas señales, y los trades de una ejecución completa
+    tighter = {**backtest_config, "stoploss": -0.002}
+    reused, reused_rejected = run(tighter, signal_cache=cache)
+    assert cache.reused == 2
+    full, full_rejected = run(tighter)
+    pd.testing.assert_frame_equal(reused, full)
+    assert reused_rejected == full_rejected
+    assert not reused.equals(first)
+
+
+def test_entry_change_misses(backtest_config, tmp_path):
+    cache = CountingCache(tmp_path)
+    run(backtest_config, signal_cache=cache)
+    run({**backtest_config, "timerange": "20240112-20240124"}, signal_cache=cache)
+    assert cache.reused == 0
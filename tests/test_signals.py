@@ -0,0 +1,122 @@
+"""Entry-condition bitmask vs the pandas conditions it replaced."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mhm.signals import (BITS, ENTRY_CONDITIONS, condition, entries, entry_mask, indicator_bank,
+                         only_missing, required_bits, volume_bank_column)
+
+ROWS = 600
+WARMUP = 40
+RSI_MIN = 60
+VOLUME_MULT = 2.0
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, ROWS)))
+
+    def noisy(scale: float, warmup: int = WARMUP, offset: float = 0.0) -> np.ndarray:
+        values = close + offset + rng.normal(0, scale, ROWS)
+        values[:warmup] = np.nan
+        return values
+
+    volume = rng.exponential(5.0, ROWS)
+    volume[rng.random(ROWS) < 0.1] = 2 * volume.max()
+    volume[100:112] = 0.0           # sin volumen: pct_change da 0/0 e inf
+    volume[300] = 0.0
+    rsi = rng.uniform(30, 90, ROWS)
+    rsi[:14] = np.nan
+    macd = rng.normal(0, 1, ROWS)
+    macd[:33] = np.nan
+    usdt = rng.normal(0, 1, ROWS)
+    usdt[:200] = np.nan
+    return pd.DataFrame({
+        "date": pd.date_range("2024-11-01", periods=ROWS, freq="1min", tz="UTC"),
+        "close": close, "volume": volume,
+        "ema_fast": noisy(0.2, 30, 0.2), "ema_mid": noisy(0.2, 120),
+        "ema_slow": noisy(0.2, 360, -0.2),
+        "rsi": rsi, "macd": macd, "macdsignal": rng.normal(0, 1, ROWS),
+        "ema_fast_15m_15m": noisy(0.3), "ema_mid_15m_15m": noisy(0.3),
+        "usdt_sma7_diff_1d": usdt,
+    })
+
+
+def pandas_conditions(dataframe: pd.DataFrame, with_15m: bool = True) -> dict:
+    """The conditions of the original populate_entry_trend."""
+    conditions = {
+        "ema_stack": (dataframe["ema_fast"] > dataframe["ema_mid"])
+        & (dataframe["ema_mid"] > dataframe["ema_slow"]),
+        "volume": dataframe["volume"] > dataframe["volume"].rolling(30).mean() * VOLUME_MULT,
+        "direction_15m": (dataframe["ema_fast_15m_15m"] > dataframe["ema_mid_15m_15m"]
+                          if with_15m else pd.Series(True, index=dataframe.index)),
+        "rsi": dataframe["rsi"] > RSI_MIN,
+        "macd": dataframe["macd"] > dataframe["macdsignal"],
+        "volume_roc": dataframe["volume"].pct_change(5) > 0,
+        "usdt": dataframe["usdt_sma7_diff_1d"] < 0,
+    }
+    return {name: cond.to_numpy(dtype=bool) for name, cond in conditions.items()}
+
+
+@pytest.mark.parametrize("use_usdt", [False, True])
+def test_mask_matches_pandas_conditions(frame, use_usdt):
+    mask = entry_mask(frame, RSI_MIN, VOLUME_MULT,
+                      usdt_column="usdt_sma7_diff_1d" if use_usdt else None)
+    expected = pandas_conditions(frame)
+    for name in ENTRY_CONDITIONS:
+        if name == "usdt" and not use_usdt:
+            assert not condition(mask, name).any()
+            continue
+        np.testing.assert_array_equal(condition(mask, name), expected[name], err_msg=name)
+
+    names = [name for name in ENTRY_CONDITIONS if name != "usdt" or use_usdt]
+    entry = np.logical_and.reduce([expected[name] for name in names])
+    assert entry.any()
+    np.testing.assert_array_equal(entries(mask, required_bits(use_usdt)), entry)
+    others = np.logical_and.reduce([expected[name] for name in names if name != "volume"])
+    np.testing.assert_array_equal(only_missing(mask, "volume", required_bits(use_usdt)),
+                                  others & ~expected["volume"])
+
+
+def test_warmup_rows_have_no_entries(frame):
+    mask = entry_mask(frame, RSI_MIN, VOLUME_MULT)
+    # NaN en las EMAs / RSI / MACD y media de volumen incompleta: bits sin activar
+    assert not condition(mask, "ema_stack")[:360].any()
+    assert not condition(mask, "rsi")[:14].any()
+    assert not condition(mask, "volume")[:29].any()
+    assert not entries(mask, required_bits())[:360].any()
+
+
+def test_volume_roc_at_zero_volume(frame):
+    mask = entry_mask(frame, RSI_MIN, VOLUME_MULT)
+    roc = condition(mask, "volume_roc")
+    assert not roc[:5].any()
+    assert not roc[105:112].any()       # 0 -> 0: pct_change NaN
+    assert roc[112] == (frame["volume"].iat[112] > 0)   # 0 -> >0: pct_change inf
+    assert not roc[300]                 # >0 -> 0: no crece
+    assert roc[305]                     # 0 -> >0
+    np.testing.assert_array_equal(roc, pandas_conditions(frame)["volume_roc"])
+
+
+def test_without_15m_columns(frame):
+    frame = frame.drop(columns=["ema_fast_15m_15m", "ema_mid_15m_15m"])
+    mask = entry_mask(frame, RSI_MIN, VOLUME_MULT)
+    assert condition(mask, "direction_15m").all()
+    expected = pandas_conditions(frame, with_15m=False)
+    entry = np.logical_and.reduce([expected[name] for name in ENTRY_CONDITIONS if name != "usdt"])
+    np.testing.assert_array_equal(entries(mask, required_bits()), entry)
+
+
+def test_bank_columns_give_the_same_mask(frame):
+    bank = indicator_bank(frame, (30,), (30,))
+    frame = pd.concat([frame, bank], axis=1)
+    np.testing.assert_array_equal(
+        entry_mask(frame, RSI_MIN, VOLUME_MULT, volume_mean_column=volume_bank_column(30)),
+        entry_mask(frame, RSI_MIN, VOLUME_MULT))
+
+
+def test_required_bits():
+    assert required_bits() == sum(BITS.values()) - BITS["usdt"]
+    assert required_bits(True) == sum(BITS.values())
@@ -0,0 +1,73 @@
+"""Warm-restart snapshots: candles and streaming indicator state."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from freqtrade.enums import CandleType
+
+from mhm.snapshot import CandleSnapshot, supported
+from mhm.streaming import StreamingIndicators
+
+ROWS = 1000
+
+
+class FakeExchange:
+    def __init__(self) -> None:
+        self._klines = {}
+        self._pairs_last_refresh_time = {}
+
+    def ohlcv_candle_limit(self, timeframe: str, candle_type) -> int:
+        return 1000
+
+
+def _candles(rows: int = ROWS) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows)))
+    # velas hasta el minuto actual, para que el hueco quepa en una llamada
+    end = pd.Timestamp.now(tz="UTC").floor("1min")
+    return pd.DataFrame({
+        "date": pd.date_range(end=end, periods=rows, freq="1min", tz="UTC").as_unit("ms"),
+        "open": close, "high": close * 1.001, "low": close * 0.999, "close": close,
+        "volume": rng.uniform(1, 10, rows),
+    })
+
+
+def test_candles_and_indicator_state_round_trip(tmp_path):
+    frame = _candles()
+    exchange = FakeExchange()
+    exchange._klines[("BTC/USDT", "1m", CandleType.SPOT)] = frame.iloc[:-10].copy()
+    streaming = StreamingIndicators()
+    streaming.populate(frame.iloc[:-10].copy(), "BTC/USDT")
+
+    snapshot = CandleSnapshot(tmp_path, "binance_spot", 60)
+    assert snapshot.save(exchange, streaming.export()) == 1
+
+    restarted, resumed = FakeExchange(), StreamingIndicators()
+    restore = CandleSnapshot(tmp_path, "binance_spot", 60)
+    assert restore.restore(restarted) == (1, 0)
+    restored = restarted._klines[("BTC/USDT", "1m", CandleType.SPOT)]
+    np.testing.assert_array_equal(restored["close"], frame["close"].iloc[:-10])
+    assert resumed.load(restore.indicators) == 1
+
+    # Ventana más corta que la guardada: sin el estado se re-sembraría sobre 500 velas
+    window = frame.iloc[-500:].reset_index(drop=True)
+    expected = streaming.populate(window.copy(), "BTC/USDT")[list(streaming.columns)]
+    out = resumed.populate(window.copy(), "BTC/USDT")[list(resumed.columns)]
+    pd.testing.assert_frame_equal(out, expected, check_exact=True)
+
+
+def test_indicator_state_needs_same_periods(tmp_path):
+    streaming = StreamingIndicators()
+    streaming.populate(_candles(), "BTC/USDT")
+    other = StreamingIndicators(ema_periods=(60, 120, 360))
+    assert other.load(streaming.export()) == 0
+
+
+def test_unsupported_exchange():
+    assert supported(FakeExchange())
+    assert not supported(SimpleNamespace(ohlcv_candle_limit=lambda *args: 1000))
+    exchange = FakeExchange()
+    exchange._klines["BTC/USDT"] = None
+    assert not supported(exchange)
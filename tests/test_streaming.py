@@ -0,0 +1,68 @@
+"""Streaming indicator state vs talib's batch functions."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import talib
+
+from mhm.streaming import InsufficientHistory, MomentumStreams, StreamingIndicators
+
+ROWS = 1500
+SEED_ROWS = 600
+
+
+def _candles(rows: int = ROWS, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows)))
+    close[200:220] = close[199]       # tramo plano: RSI con ganancias y pérdidas nulas
+    spread = np.abs(rng.normal(0, 0.001, rows)) * close
+    return pd.DataFrame({
+        "date": pd.date_range("2024-11-01", periods=rows, freq="1min", tz="UTC"),
+        "open": close,
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": rng.uniform(1, 10, rows),
+    })
+
+
+def _batch(frame: pd.DataFrame) -> np.ndarray:
+    high, low, close = (frame[col].to_numpy() for col in ("high", "low", "close"))
+    columns = [talib.EMA(close, timeperiod=period) for period in (30, 120, 360)]
+    columns.append(talib.ATR(high, low, close, timeperiod=100))
+    columns.append(talib.RSI(close, timeperiod=14))
+    columns.extend(talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9))
+    return np.column_stack(columns)
+
+
+def test_updates_track_batch_indicators():
+    frame = _candles()
+    head = frame.iloc[:SEED_ROWS]
+    streams, values = MomentumStreams.open_and_fill(
+        head["high"].to_numpy(), head["low"].to_numpy(), head["close"].to_numpy())
+    rows = [streams.update(h, l, c) for h, l, c in
+            frame[["high", "low", "close"]].iloc[SEED_ROWS:].itertuples(index=False)]
+    streamed = np.vstack((values, np.array(rows)))
+
+    np.testing.assert_allclose(streamed, _batch(frame), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_populate_feeds_only_new_candles():
+    frame = _candles()
+    engine = StreamingIndicators()
+    assert engine.populate(frame.iloc[:SEED_ROWS].copy(), "BTC/USDT") is not None
+    # ventana deslizante como en dry/live: mismo tamaño, velas nuevas al final
+    window = frame.iloc[100:SEED_ROWS + 100].copy()
+    out = engine.populate(window, "BTC/USDT")
+
+    expected = _batch(frame)[100:SEED_ROWS + 100]
+    np.testing.assert_allclose(out[list(engine.columns)].to_numpy(), expected,
+                               rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_short_history_falls_back_to_batch():
+    frame = _candles(rows=300)
+    assert StreamingIndicators().populate(frame, "BTC/USDT") is None
+    with pytest.raises(InsufficientHistory):
+        MomentumStreams.open_and_fill(frame["high"].to_numpy(), frame["low"].to_numpy(),
+                                      frame["close"].to_numpy())
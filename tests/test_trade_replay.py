@@ -0,0 +1,136 @@
+"""Streamed trades files, candles built from them and trade-level exits."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from freqtrade.data.converter import trades_list_to_df, trades_to_ohlcv
+from freqtrade.data.history import get_datahandler
+from freqtrade.enums import TradingMode
+
+from mhm.backtest import ExitModel, PairArrays
+from mhm.trade_replay import TradeCursor, build_candles, find_trade_exit, iter_trades, trades_file
+
+PAIR = "BTC/USDT"
+START_MS = 1704067200000        # 2024-01-01 00:00 UTC
+MINUTE_MS = 60_000
+
+
+@pytest.fixture(scope="module")
+def trades() -> list:
+    # Un trade cada 1-9 s durante 2 h: ningún minuto sin trades
+    rng = np.random.default_rng(5)
+    gaps = rng.integers(1000, 9000, 1500)
+    dates = START_MS + np.cumsum(gaps)
+    prices = 42000 * np.exp(np.cumsum(rng.normal(0, 0.0005, len(dates))))
+    amounts = rng.uniform(0.001, 0.5, len(dates))
+    return [[int(date), str(i), None, "buy" if i % 2 else "sell", float(price), float(amount),
+             float(price * amount)]
+            for i, (date, price, amount) in enumerate(zip(dates, prices, amounts))]
+
+
+@pytest.fixture(scope="module", params=["json", "jsongz"])
+def trades_path(request, trades, tmp_path_factory):
+    datadir = tmp_path_factory.mktemp(request.param)
+    get_datahandler(datadir, request.param).trades_store(PAIR, trades_list_to_df(trades),
+                                                          TradingMode.SPOT)
+    return trades_file(datadir, PAIR, request.param)
+
+
+def _columns(trades: list):
+    return (np.array([t[0] for t in trades]), np.array([t[4] for t in trades]),
+            np.array([t[5] for t in trades]))
+
+
+def _joined(chunks):
+    chunks = list(chunks)
+    return tuple(np.concatenate([chunk[i] for chunk in chunks]) for i in range(3))
+
+
+@pytest.mark.parametrize("chunk_bytes", [16, 100, 4096, 1 << 20])
+def test_iter_trades_reads_every_trade(trades_path, trades, chunk_bytes):
+    # 16 bytes: menos de una fila por bloque
+    for got, expected in zip(_joined(iter_trades(trades_path, chunk_bytes=chunk_bytes)),
+                             _columns(trades)):
+        np.testing.assert_array_equal(got, expected)
+
+
+def test_iter_trades_cuts_at_start_and_stop(trades_path, trades):
+    dates, prices, amounts = _columns(trades)
+    start, stop = int(dates[100]), int(dates[900])
+    got = _joined(iter_trades(trades_path, start, stop, chunk_bytes=500))
+    keep = (dates >= start) & (dates < stop)
+    assert keep.sum() == 800
+    for column, expected in zip(got, (dates[keep], prices[keep], amounts[keep])):
+        np.testing.assert_array_equal(column, expected)
+
+    # La lectura se detiene en el primer trade pasado stop_ms
+    chunks = iter_trades(trades_path, stop_ms=int(dates[10]), chunk_bytes=100)
+    assert sum(len(chunk[0]) for chunk in chunks) == 10
+
+
+def test_build_candles_matches_freqtrade(trades_path, trades):
+    candles = build_candles(iter_trades(trades_path, chunk_bytes=300), "1m", PAIR)
+    expected = trades_to_ohlcv(trades_list_to_df(trades), "1m").reset_index(drop=True)
+    pd.testing.assert_frame_equal(candles, expected, check_dtype=False, check_index_type=False)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Trade-level exits
+# ────────────────────────────────────────────────────────────────────────────────
+
+MODEL = ExitModel(tp_mult=2.0, trail_mult=1.0, stoploss=-0.1)
+
+
+def _candles(rows: int = 10) -> PairArrays:
+    return PairArrays(
+        pair=PAIR,
+        dates=(START_MS + np.arange(rows) * MINUTE_MS).astype("datetime64[ms]")
+        .astype("datetime64[ns]"),
+        open=np.full(rows, 100.0), high=np.full(rows, 100.0), low=np.full(rows, 100.0),
+        atr=np.full(rows, 1.0), entries=np.arange(rows), price_ticks=pd.Series(dtype=float),
+    )
+
+
+def _cursor(prices, offsets_s, chunk: int = 1) -> TradeCursor:
+    """Trades at ``START_MS + offset``, delivered ``chunk`` at a time."""
+    dates = START_MS + np.asarray(offsets_s) * 1000
+    prices = np.asarray(prices, dtype=float)
+    amounts = np.ones(len(dates))
+    return TradeCursor(iter([(dates[i:i + chunk], prices[i:i + chunk], amounts[i:i + chunk])
+                             for i in range(0, len(dates), chunk)]))
+
+
+def test_exit_at_the_trade_crossing_the_take_profit():
+    # Por debajo del trailing (101) hasta el trade que cruza el take-profit (100 + 2 ATR)
+    cursor = _cursor([100.5, 100.8, 102.3, 103.0], [10, 70, 130, 140])
+    exit_, date = find_trade_exit(cursor, _candles(), 0, MODEL, stop_rate=90.0)
+    assert (exit_.index, exit_.rate, exit_.reason, exit_.tag) == (2, 102.3, "custom_exit",
+                                                                   "atr_tp")
+    assert date == np.datetime64(START_MS + 130_000, "ms")
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 10])
+def test_trailing_keeps_the_maximum_across_blocks(chunk):
+    # Máximo 101.5 (pasa el trailing en 101) y luego cae por debajo
+    cursor = _cursor([100.2, 101.5, 101.2, 100.9, 100.5], [5, 65, 125, 185, 245], chunk)
+    exit_, date = find_trade_exit(cursor, _candles(), 0, MODEL, stop_rate=90.0)
+    assert (exit_.index, exit_.rate, exit_.tag) == (3, 100.9, "atr_trail")
+    assert date == np.datetime64(START_MS + 185_000, "ms")
+
+
+def test_stop_and_forward_only_cursor():
+    cursor = _cursor([100.0, 89.5, 100.0, 100.4, 102.5], [5, 20, 190, 250, 330])
+    exit_, _ = find_trade_exit(cursor, _candles(), 0, MODEL, stop_rate=90.0)
+    assert (exit_.index, exit_.rate, exit_.reason) == (0, 89.5, "stop_loss")
+
+    # Siguiente trade en la vela 3: los trades anteriores se saltan, no se releen
+    exit_, _ = find_trade_exit(cursor, _candles(), 3, MODEL, stop_rate=90.0)
+    assert (exit_.index, exit_.rate, exit_.tag) == (5, 102.5, "atr_tp")
+
+
+def test_force_exit_at_the_last_trade():
+    cursor = _cursor([100.1, 100.3], [5, 65])
+    exit_, date = find_trade_exit(cursor, _candles(), 0, MODEL, stop_rate=90.0)
+    assert (exit_.index, exit_.rate, exit_.reason) == (9, 100.3, "force_exit")
+    assert date == np.datetime64(START_MS + 65_000, "ms")
@@ -40,7 +40,9 @@ freqtrade backtesting -s MultiHorizonMomentum -p BTC/USDT,ETH/USDT --fee 0.1 --t
 freqtrade backtesting -s MultiHorizonMomentum -p BTC/USDT,ETH/USDT --fee 0 --timeframe 1m
 """
 
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
 import numpy as np
@@ -49,14 +51,34 @@ from pandas import DataFrame
 
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
+from freqtrade.enums import RunMode
+from freqtrade.exchange import timeframe_to_minutes
 from freqtrade.persistence import Trade
-from freqtrade.strategy import IStrategy, merge_informative_pair
+from freqtrade.strategy import CategoricalParameter, DecimalParameter, IntParameter, IStrategy
+
+from mhm.compact import CompactLiveFrames
+from mhm.events import BINANCE_STREAM_URL, CandleEvents, ExitWatch, install_wakeup
+from mhm.exits import ExitLevelCache
+from mhm.features import EMA_WARMUP_FACTOR, FeatureCache
+from mhm.informative import InformativeCache
+from mhm.market import CsvSource, DataProviderSource, MarketLayer
+from mhm.metrics import StrategyMetrics, bot_rpc, register_endpoint, timed
+from mhm.orderbook import OrderBookCache, OrderBookStream, install_order_book_cache
+from mhm.parallel import FORK_AVAILABLE, ParallelAnalyzer
+from mhm.registry import REGISTRY, Indicator, indicator
+from mhm.resample import ResampledDataProvider, history_loader
+from mhm.signals import (EMA_COLUMNS, ENTRY_MASK_COLUMN, ema_bank_column, entries, entry_mask,
+                         indicator_bank, required_bits, volume_bank_column)
+from mhm.snapshot import CandleSnapshot, supported as snapshot_supported
+from mhm.streaming import StreamingIndicators
+
+logger = logging.getLogger(__name__)
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Strategy
 # ────────────────────────────────────────────────────────────────────────────────
 
-class MultiHorizonMomentum(IStrategy):
+class MultiHorizonMomentum(CompactLiveFrames, IStrategy):
     """Daily EMA(5/21/63) trend-following with ATR exits."""
 
     INTERFACE_VERSION = 3
@@ -79,6 +101,328 @@ class MultiHorizonMomentum(IStrategy):
     # Configuration flags
     # ---------------------------------------------------------------------
     USE_USDT_FILTER: bool = False  # ojo: CRYPTOCAP:USDT.D no existe a 1m
+    # USDT dominance daily candles (mhm.market): "dp" (pair USDT.D, 1d, as before) or a
+    # CSV file relative to user_data_dir (date,close,...). Loaded and computed once per
+    # loop for all pairs; older than USDT_MAX_AGE_HOURS after its close = no entries
+    USDT_DOMINANCE_SOURCE: str = "dp"
+    USDT_MAX_AGE_HOURS: int = 48
+
+    # Entry filters (v7 BREAKEVEN: RSI 55 -> 60, volume 1.7x -> 2.0x), hyperopt space "buy"
+    ENTRY_RSI_MIN = IntParameter(50, 70, default=60, space="buy")      # RSI momentum threshold
+    ENTRY_VOLUME_MULT = DecimalParameter(1.5, 3.0, default=2.0, decimals=1,
+                                         space="buy")                   # volume vs. rolling mean
+    ENTRY_VOLUME_WINDOW = CategoricalParameter([20, 30, 45, 60], default=30,
+                                               space="buy")             # candles of that mean
+    # EMA stack periods (startup_candle_count covers the slowest). Hyperopt of these or
+    # of ENTRY_VOLUME_WINDOW adds one column per candidate (mhm.signals.indicator_bank)
+    EMA_FAST_PERIOD = CategoricalParameter([15, 20, 30, 45], default=30, space="buy")
+    EMA_MID_PERIOD = CategoricalParameter([60, 90, 120, 180], default=120, space="buy")
+    EMA_SLOW_PERIOD = CategoricalParameter([240, 300, 360], default=360, space="buy")
+
+    # Dry/live only: advance per-pair recursive indicator state by the new candles
+    # instead of recomputing every indicator over the whole dataframe.
+    # Backtests and hyperopt always use the batch path.
+    USE_STREAMING_INDICATORS: bool = True
+
+    # Batch indicators (same columns as _populate_base_indicators), computed through
+    # mhm.registry: shared with other strategies analyzing the same candles in this
+    # process, e.g. RSI / MACD with SampleStrategy in backtesting --strategy-list.
+    # Default EMA periods; _indicators swaps in the loaded EMA_*_PERIOD values
+    INDICATORS = (
+        indicator("EMA", "ema_fast", timeperiod=30),
+        indicator("EMA", "ema_mid", timeperiod=120),
+        indicator("EMA", "ema_slow", timeperiod=360),
+        indicator("ATR", "atr100", timeperiod=100),
+        indicator("RSI", "rsi", timeperiod=14),
+        indicator("MACD", {"macd": "macd", "macdsignal": "macdsignal", "macdhist": "macdhist"}),
+    )
+
+    # Backtest / hyperopt only: reuse indicator columns stored in
+    # user_data/cache/features while candles and indicator code are unchanged.
+    # Size bound of the cache directory in MB (0 disables it).
+    FEATURE_CACHE_MB: int = 512
+
+    # Pure ATR exits (multiples of ATR(100) from the entry price), hyperopt space "sell"
+    ATR_TP_MULT = DecimalParameter(2.5, 5.0, default=3.5, decimals=1, space="sell")   # take-profit
+    ATR_SL_MULT: float = 2.0     # stop-loss (custom_stoploss is not enabled)
+    # trailing, once max_rate went past it
+    ATR_TRAIL_MULT = DecimalParameter(1.0, 2.5, default=1.5, decimals=1, space="sell")
+
+    # False: levels follow the ATR of the last analyzed candle (v7 behaviour).
+    # True: levels are frozen per trade at the ATR of its signal candle.
+    FIX_EXIT_LEVELS_AT_ENTRY: bool = False
+
+    # Dry/live only: analyze the whitelist in N forked worker processes (0 = serial).
+    # Worth it from a few dozen pairs on; each pair stays on the same worker.
+    PARALLEL_ANALYSIS_WORKERS: int = 0
+
+    # Dry/live only: keep only the columns below, indicators in float32, and (with
+    # USE_STREAMING_INDICATORS) analyze just the last startup_candle_count candles once warm
+    COMPACT_LIVE_FRAMES: bool = False
+    LIVE_FRAME_COLUMNS: Tuple[str, ...] = (
+        "ema_fast", "ema_mid", "ema_slow", "atr100", "rsi", "macd", "macdsignal",
+        "ema_fast_15m_15m", "ema_mid_15m_15m", "usdt_sma7_1d", "usdt_sma7_diff_1d",
+        ENTRY_MASK_COLUMN,
+    )
+    LIVE_FRAME_EXACT_COLUMNS: Tuple[str, ...] = ("atr100",)   # ATR snapshot de custom_exit
+
+    # Dry/live only: entry funnel counters + callback timings on the API server
+    # (GET /api/v1/metrics, Prometheus format)
+    METRICS_ENABLED: bool = True
+
+    # Dry/live only: wake the bot loop on candle close and on exit-level crossings
+    # from the exchange kline stream (mhm.events), and analyze just the pairs whose
+    # candle closed. process_throttle_secs becomes the fallback - raise it (e.g. 60)
+    EVENT_DRIVEN: bool = False
+    EVENT_STREAM_URL: str = BINANCE_STREAM_URL
+
+    # Dry/live only: answer the order-book reads of entry/exit pricing, dry-run fills and
+    # check_depth_of_market with books at most this many seconds old (mhm.orderbook),
+    # kept current from the exchange depth stream ("" = REST reads only, each cached
+    # for the TTL; the Binance stream is only followed on binance spot). 0 disables
+    ORDER_BOOK_TTL: float = 0.0
+    ORDER_BOOK_STREAM_URL: str = BINANCE_STREAM_URL
+
+    # Informative timeframes built from the 1m candles (mhm.resample) instead of
+    # separate downloads / exchange fetches, e.g. ("15m",). Seeded from the local
+    # 1m data: download enough 1m history for the 15m startup candles
+    RESAMPLED_TIMEFRAMES: Tuple[str, ...] = ()
+
+    # Dry/live only: snapshot the exchange candle cache (1m + 15m) to
+    # user_data/cache/snapshots every N minutes and at shutdown; a restart restores
+    # it and only fetches the candles since (mhm.snapshot). 0 disables
+    WARM_RESTART_SNAPSHOT_MINUTES: int = 15
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        self._streaming = StreamingIndicators(ema_periods=self._ema_periods())
+        self._informative_15m = InformativeCache("15m", self._populate_informative_15m)
+        self._market = MarketLayer()
+        # config["timeframe"] overrides the class timeframe once the strategy is loaded
+        REGISTRY.acquire(self, config.get("timeframe") or self.timeframe, self.INDICATORS)
+        self._features = None
+        if self.FEATURE_CACHE_MB and config.get("user_data_dir"):
+            self._features = FeatureCache(Path(config["user_data_dir"]) / "cache" / "features",
+                                          self.FEATURE_CACHE_MB * 1024 * 1024)
+        self._exit_levels = ExitLevelCache(
+            self.ATR_TP_MULT.value, self.ATR_SL_MULT, self.ATR_TRAIL_MULT.value,
+            timeframe_to_minutes(self.timeframe), fixed_at_entry=self.FIX_EXIT_LEVELS_AT_ENTRY,
+        )
+        self._metrics = None
+        self._parallel = None
+        self._parallel_results: Dict[str, DataFrame] = {}
+        self._parallel_seen: Dict[str, pd.Timestamp] = {}
+        self._events = None
+        self._exit_watch = None
+        self._restore_sleep = None
+        self._snapshot = None
+        self._order_books = None
+        self._book_stream = None
+        self._restore_fetch = None
+
+    def bot_start(self, **kwargs) -> None:
+        if self.USE_USDT_FILTER:
+            self._market.register(
+                "usdt", "1d", self._usdt_dominance_source(), self._usdt_dominance_indicators,
+                ("usdt_sma7", "usdt_sma7_diff"), max_age=timedelta(hours=self.USDT_MAX_AGE_HOURS),
+            )
+        if self.RESAMPLED_TIMEFRAMES and self.dp is not None:
+            live = self.dp.runmode in (RunMode.DRY_RUN, RunMode.LIVE)
+            self.dp = ResampledDataProvider(
+                self.dp, self.timeframe, self.RESAMPLED_TIMEFRAMES,
+                history=history_loader(self.config, self.dp, self.timeframe,
+                                       self.RESAMPLED_TIMEFRAMES),
+                # en vivo, tantas velas como daría el exchange
+                max_bars=self.startup_candle_count + 1000 if live else None,
+            )
+        if self.METRICS_ENABLED and self.dp and self.dp.runmode in (RunMode.DRY_RUN, RunMode.LIVE):
+            self._metrics = StrategyMetrics()
+            if not register_endpoint(bot_rpc(self.dp), self._metrics):
+                logger.info("api_server disabled - strategy metrics are not exposed")
+        if self._use_parallel():
+            # Fork de los workers aquí, antes de los hilos de la estrategia (streams); los de
+            # freqtrade (api_server, Telegram) ya corren, los workers no los tocan
+            self._parallel = ParallelAnalyzer(self, self.PARALLEL_ANALYSIS_WORKERS, ("15m",))
+            if self._metrics is not None:
+                # Los tiempos de populate_* se miden en los workers
+                self._parallel.report = self._metrics.drain_timings
+                self._parallel.on_report = self._metrics.merge_timings
+            self._parallel.receive = self._market.install
+            self._parallel.start()
+        if self.EVENT_DRIVEN and self.dp and self.dp.runmode in (RunMode.DRY_RUN, RunMode.LIVE):
+            # Sin custom_stoploss el stop ATR no cierra nada: no despertar por él
+            self._exit_watch = ExitWatch(stoploss=self.use_custom_stoploss)
+            self._events = CandleEvents(self.EVENT_STREAM_URL, self.timeframe,
+                                        on_price=self._exit_watch.hit)
+            self._events.watch(self.dp.current_whitelist())
+            self._events.start()
+            self._restore_sleep = install_wakeup(self._events)
+            throttle = self.config.get("internals", {}).get("process_throttle_secs", 5)
+            if throttle < 30:
+                logger.info("Event-driven loop: process_throttle_secs is %ss - raise it so the "
+                            "bot waits for candle events", throttle)
+        if (self.WARM_RESTART_SNAPSHOT_MINUTES and self.dp
+                and self.dp.runmode in (RunMode.DRY_RUN, RunMode.LIVE)):
+            self._restore_snapshot()
+        if self.ORDER_BOOK_TTL > 0 and self.dp and self.dp.runmode in (RunMode.DRY_RUN,
+                                                                        RunMode.LIVE):
+            self._order_books = OrderBookCache(self.ORDER_BOOK_TTL)
+            self._restore_fetch = install_order_book_cache(self.dp._exchange, self._order_books)
+            if self._book_stream_url():
+                self._book_stream = OrderBookStream(self.ORDER_BOOK_STREAM_URL, self._order_books)
+                self._book_stream.watch(self.dp.current_whitelist())
+                self._book_stream.start()
+
+    def _book_stream_url(self) -> str:
+        """Depth stream to follow: the Binance format only fits binance spot."""
+        url = self.ORDER_BOOK_STREAM_URL
+        if url == BINANCE_STREAM_URL and (
+                self.config["exchange"]["name"].lower() != "binance"
+                or self.config.get("trading_mode", "spot") != "spot"):
+            logger.info("Order-book cache: no depth stream for %s %s, REST reads only",
+                        self.config["exchange"]["name"], self.config.get("trading_mode", "spot"))
+            return ""
+        return url
+
+    # ------------------------------------------------------------------
+    # Warm-restart snapshots (dry/live)
+    # ------------------------------------------------------------------
+    def _restore_snapshot(self) -> None:
+        if not snapshot_supported(self.dp._exchange):
+            logger.warning("Warm-restart snapshots: this freqtrade version keeps its candle cache "
+                           "differently - starting cold, without snapshots")
+            return
+        exchange = self.config["exchange"]["name"]
+        self._snapshot = CandleSnapshot(
+            Path(self.config["user_data_dir"]) / "cache" / "snapshots",
+            f"{exchange}_{self.config.get('trading_mode', 'spot')}",
+            self.WARM_RESTART_SNAPSHOT_MINUTES * 60,
+        )
+        age = self._snapshot.age
+        restored, stale = self._snapshot.restore(self.dp._exchange)
+        if restored or stale:
+            logger.info("Candle snapshot (%.0f min old): %d frame(s) restored, %d too old to "
+                        "backfill in one call - downloaded in full", age / 60, restored, stale)
+        if self._snapshot.indicators and self._use_streaming() and self._parallel is None:
+            pairs = self._streaming.load(self._snapshot.indicators)
+            if pairs:
+                logger.info("Candle snapshot: streaming indicator state of %d pair(s) resumed",
+                            pairs)
+        self._snapshot.indicators = {}
+
+    def _save_snapshot(self) -> None:
+        # Con workers el estado de los indicadores vive en otros procesos
+        indicators = (self._streaming.export()
+                      if self._use_streaming() and self._parallel is None else None)
+        try:
+            self._snapshot.save(self.dp._exchange, indicators)
+        except OSError as exc:
+            logger.warning("Could not write the candle snapshot: %s", exc)
+
+    def bot_loop_start(self, current_time: datetime, **kwargs) -> None:
+        if self._snapshot is not None and self._snapshot.due():
+            self._save_snapshot()
+        if self._book_stream is not None:
+            self._book_stream.watch(self.dp.current_whitelist())
+
+    # ------------------------------------------------------------------
+    # Candle-close events (dry/live)
+    # ------------------------------------------------------------------
+    def _event_pairs(self, pairs: List[str]) -> List[str]:
+        """Pairs with a streamed candle close the bot has the candles for."""
+        self._events.watch(pairs)
+        candle_type = self.config.get("candle_type_def", "spot")
+        ready, late = [], []
+        for pair in self._events.due(pairs):
+            closed = self._events.last_closed(pair)
+            candles = self.dp.ohlcv(pair, self.timeframe, copy=False, candle_type=candle_type)
+            if (closed is not None and
+                    (candles.empty or candles["date"].iat[-1].timestamp() * 1000 < closed)):
+                late.append(pair)   # el refresh de freqtrade aún no trae la vela cerrada
+            else:
+                ready.append(pair)
+        if late:
+            self._events.defer(late)
+        return ready
+
+    # ------------------------------------------------------------------
+    # Parallel analysis (dry/live)
+    # ------------------------------------------------------------------
+    def analyze(self, pairs: List[str]) -> None:
+        self._market.refresh()
+        if self._events is not None:
+            pairs = self._event_pairs(pairs)
+        if self._parallel is not None:
+            self._analyze_parallel(pairs)
+        try:
+            # freqtrade sigue haciendo el resto (validación, caché del dp) en orden de whitelist
+            super().analyze(pairs)
+        finally:
+            self._parallel_results = {}
+
+    def analyze_ticker(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        analyzed = self._parallel_results.pop(metadata.get("pair"), None)
+        if (analyzed is not None and len(analyzed) == len(dataframe)
+                and analyzed["date"].iat[-1] == dataframe["date"].iat[-1]):
+            # custom_exit corre en este proceso: el snapshot ATR se toma aquí
+            self._exit_levels.update(metadata["pair"], analyzed)
+        else:
+            analyzed = super().analyze_ticker(dataframe, metadata)
+        if self._metrics is not None:
+            self._metrics.count_entries(
+                metadata["pair"], analyzed,
+                use_usdt=self.USE_USDT_FILTER and "usdt_sma7_diff_1d" in analyzed,
+            )
+        return analyzed
+
+    def ft_bot_cleanup(self) -> None:
+        super().ft_bot_cleanup()
+        REGISTRY.release(self)
+        if self._snapshot is not None:
+            self._save_snapshot()
+            self._snapshot = None
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+        if self._events is not None:
+            self._restore_sleep()
+            self._events.stop()
+            self._events = None
+        if self._book_stream is not None:
+            self._book_stream.stop()
+            self._book_stream = None
+        if self._restore_fetch is not None:
+            self._restore_fetch()
+            self._restore_fetch = None
+
+    def _use_parallel(self) -> bool:
+        return (
+            self.PARALLEL_ANALYSIS_WORKERS > 0 and FORK_AVAILABLE and self.dp is not None
+            and self.dp.runmode in (RunMode.DRY_RUN, RunMode.LIVE)
+        )
+
+    def _analyze_parallel(self, pairs: List[str]) -> None:
+        """Analyze the pairs with a new candle in the worker processes."""
+        candle_type = self.config.get("candle_type_def", "spot")
+        frames: Dict[str, DataFrame] = {}
+        informative: Dict[Tuple[str, str], DataFrame] = {}
+        for pair in pairs:
+            dataframe = self.dp.ohlcv(pair, self.timeframe, candle_type=candle_type)
+            if self.compact_live():
+                dataframe = self.live_frame(pair, dataframe)
+            if dataframe.empty or self._parallel_seen.get(pair) == dataframe["date"].iat[-1]:
+                continue
+            frames[pair] = dataframe
+            informative[(pair, "15m")] = self.dp.get_pair_dataframe(pair=pair, timeframe="15m")
+        if not frames:
+            return
+        self._parallel_results = self._parallel.analyze(frames, informative,
+                                                        shared=self._market.snapshot())
+        if not self._parallel.running:
+            # Workers caídos: análisis en serie (y sin copiar frames) el resto de la sesión
+            self._parallel = None
+        for pair in self._parallel_results:
+            self._parallel_seen[pair] = frames[pair]["date"].iat[-1]
 
     # ------------------------------------------------------------------
     # Informative pairs
@@ -86,101 +430,197 @@ class MultiHorizonMomentum(IStrategy):
     def informative_pairs(self) -> List[Tuple[str, str]]:
         """Request 15m timeframe for directional filter.
         
-        USDT dominance filter is disabled for 1m trading.
+        USDT dominance comes from mhm.market, off by default for 1m trading.
         """
         pairs: List[Tuple[str, str]] = []
         
-        # Marco superior 15m para dirección
-        if self.dp and self.dp.current_whitelist():
+        # Marco superior 15m para dirección (salvo que se derive de las velas 1m)
+        if self.dp and self.dp.current_whitelist() and "15m" not in self.RESAMPLED_TIMEFRAMES:
             for pair in self.dp.current_whitelist():
                 pairs.append((pair, "15m"))
         
-        if self.USE_USDT_FILTER:
+        if self.USE_USDT_FILTER and self.USDT_DOMINANCE_SOURCE == "dp":
             pairs.append(("USDT.D", "1d"))  # TradingView / CryptoCap ticker
         return pairs
 
     # ------------------------------------------------------------------
     # Indicator calculation
     # ------------------------------------------------------------------
+    @timed("populate_indicators")
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # EMA stack
-        dataframe["ema_fast"] = ta.EMA(dataframe, timeperiod=30)   # 30 min
-        dataframe["ema_mid"] = ta.EMA(dataframe, timeperiod=120)  # 2  h
-        dataframe["ema_slow"] = ta.EMA(dataframe, timeperiod=360) # 6  h
+        bank = self._indicator_bank()
+        # Con banco (hyperopt) las columnas base se quedan con los periodos por defecto:
+        # los valores de los parámetros cambian en cada epoch, las entradas leen el banco
+        ema_periods = self._ema_periods() if bank is None else self._default_ema_periods()
+
+        streamed = None
+        if self._use_streaming() and metadata:
+            if self._streaming.indicator_kwargs.get("ema_periods") != ema_periods:
+                self._streaming = StreamingIndicators(ema_periods=ema_periods)
+            streamed = self._streaming.populate(dataframe, metadata["pair"])
+
+        indicators = self._indicators(ema_periods)
+        if streamed is not None:
+            dataframe = streamed
+        elif self._use_feature_cache() and metadata:
+            # Warm-up de 20x la EMA lenta: la cola recalculada converge al histórico (FeatureCache
+            # solo la acepta si reproduce las filas cacheadas)
+            dataframe = self._features.populate(
+                dataframe, metadata["pair"], self.timeframe, self._populate_base_indicators,
+                self._streaming.columns, warmup=EMA_WARMUP_FACTOR * max(ema_periods),
+                ema_periods=ema_periods,
+            )
+            REGISTRY.publish(dataframe, metadata["pair"], self.timeframe, indicators)
+        elif metadata:
+            dataframe = REGISTRY.populate(dataframe, metadata["pair"], self.timeframe, indicators)
+        else:
+            dataframe = self._populate_base_indicators(dataframe, ema_periods)
 
-        # ATR for risk management
-        dataframe["atr100"] = ta.ATR(dataframe, timeperiod=100)
-        
-        # RSI for momentum confirmation
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
-        
-        # MACD for trend strength
-        macd = ta.MACD(dataframe)
-        dataframe["macd"] = macd["macd"]
-        dataframe["macdsignal"] = macd["macdsignal"]
-        dataframe["macdhist"] = macd["macdhist"]
+        if bank is not None:
+            dataframe = pd.concat([dataframe, indicator_bank(dataframe, *bank)], axis=1)
 
         # EMAs 15m para filtro direccional
         if self.dp and metadata:
+            pair = metadata["pair"]
             try:
-                informative_15m = self.dp.get_pair_dataframe(pair=metadata["pair"], timeframe="15m")
-                informative_15m["ema_fast_15m"] = ta.EMA(informative_15m, timeperiod=30)
-                informative_15m["ema_mid_15m"] = ta.EMA(informative_15m, timeperiod=120)
-                dataframe = merge_informative_pair(
-                    dataframe, informative_15m, self.timeframe, "15m", ffill=True
+                # Solo se recalcula/mergea cuando cierra una vela 15m
+                dataframe = self._informative_15m.merge(
+                    dataframe, pair, self.timeframe,
+                    lambda: self.dp.get_pair_dataframe(pair=pair, timeframe="15m"),
                 )
             except Exception:
                 # En caso de que falten datos 15m
                 pass
 
-        # Merge USDT dominance if available
-        if self.USE_USDT_FILTER and self.dp:
-            try:
-                informative = self.dp.get_pair_dataframe(pair="USDT.D", timeframe="1d")
-                informative["usdt_sma7"] = ta.SMA(informative, timeperiod=7)
-                dataframe = merge_informative_pair(dataframe, informative, self.timeframe, "1d", ffill=True)
-            except Exception:
-                # In case data is missing – disable filter for this run
-                self.USE_USDT_FILTER = False
+        # USDT dominance: serie compartida por todos los pares (NaN si falta o está vieja)
+        if self.USE_USDT_FILTER and "usdt" in self._market:
+            dataframe = self._market.merge(dataframe, "usdt", self.timeframe)
+
+        # ATR snapshot for custom_exit / custom_stoploss (una vez por vela analizada)
+        if metadata:
+            self._exit_levels.update(metadata["pair"], dataframe)
 
         return dataframe
 
-    # ------------------------------------------------------------------
-    # Entry logic
-    # ------------------------------------------------------------------
-    def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        cond_ema = (
-            (dataframe["ema_fast"] > dataframe["ema_mid"]) &
-            (dataframe["ema_mid"] > dataframe["ema_slow"])
+    def _usdt_dominance_source(self):
+        if self.USDT_DOMINANCE_SOURCE == "dp":
+            return DataProviderSource(lambda: self.dp, "USDT.D", "1d")
+        return CsvSource(Path(self.config.get("user_data_dir", ".")) / self.USDT_DOMINANCE_SOURCE)
+
+    @staticmethod
+    def _usdt_dominance_indicators(informative: DataFrame) -> DataFrame:
+        sma = ta.SMA(informative, timeperiod=7)
+        return DataFrame({"usdt_sma7": sma, "usdt_sma7_diff": sma.diff()})
+
+    def _use_streaming(self) -> bool:
+        return (
+            self.USE_STREAMING_INDICATORS and self.dp is not None
+            and self.dp.runmode in (RunMode.DRY_RUN, RunMode.LIVE)
         )
 
-        # Filtro de liquidez ultra selectivo (solo trades premium)
-        cond_volume = dataframe['volume'] > dataframe['volume'].rolling(30).mean() * 2.0
+    def live_rows_stateful(self) -> bool:
+        # Recortar filas solo con el estado de los indicadores streaming
+        return self._use_streaming()
 
-        # Filtro direccional 15m (evita operar contra micro-tendencia)
-        cond_dir = True  # Default en caso de que no haya datos 15m
-        if "ema_fast_15m_15m" in dataframe.columns and "ema_mid_15m_15m" in dataframe.columns:
-            cond_dir = dataframe["ema_fast_15m_15m"] > dataframe["ema_mid_15m_15m"]
+    def _use_feature_cache(self) -> bool:
+        return (
+            self._features is not None and self.dp is not None
+            and self.dp.runmode in (RunMode.BACKTEST, RunMode.HYPEROPT)
+        )
 
-        # RSI momentum filter (solo comprar en momentum alcista)
-        cond_rsi = dataframe["rsi"] > 60  # Ultra selectivo para máxima precisión
+    def _populate_informative_15m(self, informative_15m: DataFrame, pair: str) -> DataFrame:
+        if self._use_feature_cache():
+            return self._features.populate(
+                informative_15m, pair, "15m", self._informative_15m_indicators,
+                ("ema_fast_15m", "ema_mid_15m"), warmup=20 * 120,
+            )
+        return self._informative_15m_indicators(informative_15m)
+
+    @staticmethod
+    def _informative_15m_indicators(informative_15m: DataFrame) -> DataFrame:
+        informative_15m["ema_fast_15m"] = ta.EMA(informative_15m, timeperiod=30)
+        informative_15m["ema_mid_15m"] = ta.EMA(informative_15m, timeperiod=120)
+        return informative_15m
+
+    def _ema_periods(self) -> Tuple[int, int, int]:
+        return self.EMA_FAST_PERIOD.value, self.EMA_MID_PERIOD.value, self.EMA_SLOW_PERIOD.value
+
+    def _default_ema_periods(self) -> Tuple[int, int, int]:
+        """EMA periods of INDICATORS."""
+        return tuple(dict(item.params)["timeperiod"] for item in self.INDICATORS[:3])
+
+    def _indicators(self, ema_periods: Tuple[int, int, int]) -> Tuple[Indicator, ...]:
+        """INDICATORS with the EMA stack on ``ema_periods``."""
+        if ema_periods == self._default_ema_periods():
+            return self.INDICATORS
+        return tuple(indicator("EMA", column, timeperiod=period)
+                     for column, period in zip(EMA_COLUMNS, ema_periods)) + self.INDICATORS[3:]
+
+    def _indicator_bank(self) -> Optional[Tuple[List[int], List[int]]]:
+        """
+        EMA periods and volume windows to precompute for every epoch while hyperopt
+        optimizes any of them (``.range`` then lists every candidate), else None.
+        """
+        emas = (self.EMA_FAST_PERIOD, self.EMA_MID_PERIOD, self.EMA_SLOW_PERIOD)
+        if not any(param.can_optimize() for param in emas + (self.ENTRY_VOLUME_WINDOW,)):
+            return None
+        return (sorted({period for param in emas for period in param.range}),
+                sorted(self.ENTRY_VOLUME_WINDOW.range))
+
+    @staticmethod
+    def _populate_base_indicators(dataframe: DataFrame, ema_periods: Tuple[int, int, int]
+                                  ) -> DataFrame:
+        """Batch (talib) path - same columns as ``StreamingIndicators``."""
+        # EMA stack (por defecto 30 min / 2 h / 6 h)
+        fast, mid, slow = ema_periods
+        dataframe["ema_fast"] = ta.EMA(dataframe, timeperiod=fast)
+        dataframe["ema_mid"] = ta.EMA(dataframe, timeperiod=mid)
+        dataframe["ema_slow"] = ta.EMA(dataframe, timeperiod=slow)
 
-        # MACD trend strength filter (MACD por encima de señal)
-        cond_macd = dataframe["macd"] > dataframe["macdsignal"]
+        # ATR for risk management
+        dataframe["atr100"] = ta.ATR(dataframe, timeperiod=100)
+        
+        # RSI for momentum confirmation
+        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
         
-        # Volume rate of change (liquidez dinámica)
-        cond_volume_roc = dataframe['volume'].pct_change(5) > 0  # volumen creciente últimos 5min
+        # MACD for trend strength
+        macd = ta.MACD(dataframe)
+        dataframe["macd"] = macd["macd"]
+        dataframe["macdsignal"] = macd["macdsignal"]
+        dataframe["macdhist"] = macd["macdhist"]
 
-        # Optional USDT dominance filter: 7‑day SMA trending **down**
-        if self.USE_USDT_FILTER and "usdt_sma7_1d" in dataframe:
-            cond_usdt = dataframe["usdt_sma7_1d"].diff() < 0  # today lower than yesterday
-            entry_condition = cond_ema & cond_usdt & cond_volume & cond_dir & cond_rsi & cond_macd & cond_volume_roc
-        else:
-            entry_condition = cond_ema & cond_volume & cond_dir & cond_rsi & cond_macd & cond_volume_roc
+        return dataframe
 
-        dataframe.loc[entry_condition, "enter_long"] = 1
+    # ------------------------------------------------------------------
+    # Entry logic
+    # ------------------------------------------------------------------
+    @timed("populate_entry_trend")
+    def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        mask, required = self.entry_conditions(dataframe)
+        dataframe[ENTRY_MASK_COLUMN] = mask
+
+        dataframe.loc[entries(mask, required), "enter_long"] = 1
         return dataframe
 
+    def entry_conditions(self, dataframe: DataFrame) -> Tuple[np.ndarray, int]:
+        """Entry condition bits with the current parameter values, and the bits required."""
+        # Todas las condiciones en una pasada, un bit por condición (ver mhm.signals):
+        # EMA stack, volumen > ENTRY_VOLUME_MULT x media ENTRY_VOLUME_WINDOW, filtro 15m,
+        # RSI > ENTRY_RSI_MIN, MACD > señal, volumen creciente 5 velas y, opcional,
+        # USDT dominance SMA7 bajando
+        use_usdt = self.USE_USDT_FILTER and "usdt_sma7_diff_1d" in dataframe
+        window = self.ENTRY_VOLUME_WINDOW.value
+        # Columnas del banco de hyperopt si existen (ver _indicator_bank)
+        ema_columns = tuple(ema_bank_column(period) for period in self._ema_periods())
+        if not all(column in dataframe for column in ema_columns):
+            ema_columns = EMA_COLUMNS
+        volume_column = volume_bank_column(window)
+        mask = entry_mask(dataframe, self.ENTRY_RSI_MIN.value, self.ENTRY_VOLUME_MULT.value,
+                          usdt_column="usdt_sma7_diff_1d" if use_usdt else None,
+                          ema_columns=ema_columns, volume_window=window,
+                          volume_mean_column=volume_column if volume_column in dataframe else None)
+        return mask, required_bits(use_usdt)
+
     # ------------------------------------------------------------------
     # Exit logic - fallback if custom_exit didn't fire yet
     # ------------------------------------------------------------------
@@ -193,53 +633,63 @@ class MultiHorizonMomentum(IStrategy):
     # ------------------------------------------------------------------
     # Custom stoploss based on ATR(14)
     # ------------------------------------------------------------------
+    @timed("custom_stoploss")
     def custom_stoploss(self, pair: str, trade: Trade, current_time: datetime,
                         current_rate: float, current_profit: float, **kwargs):
         """Hard SL at 0.8 ATR(100) below entry price - optimized for fees."""
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-        if dataframe is None or len(dataframe) == 0:
+        levels = self._trade_exit_levels(pair, trade, current_time)
+        if levels is None:
             return 1  # keep existing SL
-        atr = dataframe["atr100"].iloc[-1]
-        if atr == 0:
-            return 1
         # Price distance to entry
         distance = (trade.open_rate - current_rate)
         # SL dinámico a 2.0x ATR (margen realista para market noise)
-        sl_atr = 2.0 * atr
-        if distance >= sl_atr:
+        if distance >= levels.stop_distance:
             return 0.01  # triggers immediate SL exit
         return 1  # no update
 
     # ------------------------------------------------------------------
     # Custom exit for ATR take-profit and trailing
     # ------------------------------------------------------------------
+    @timed("custom_exit")
     def custom_exit(self, pair: str, trade: Trade, current_time: datetime,
                     current_rate: float, current_profit: float, **kwargs):
         """Take profit at 2 ATR(100) OR trail stop at 1 ATR once in profit."""
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-        if dataframe is None or len(dataframe) == 0:
+        levels = self._trade_exit_levels(pair, trade, current_time)
+        if levels is None:
             return None
 
-        atr = dataframe["atr100"].iloc[-1]
-        if atr == 0:
-            return None
-
-        entry = trade.open_rate
-        tp_price = entry + 3.5 * atr  # 3.5x ATR más conservador y alcanzable
-        sl_trail = entry + 1.5 * atr  # 1.5x ATR trailing
-
-        # Take-profit hit
-        if current_rate >= tp_price:
+        # Take-profit hit (3.5x ATR más conservador y alcanzable)
+        if current_rate >= levels.take_profit:
             return {
                 "exit_tag": "atr_tp",
                 "exit_type": "exit_signal",
             }
 
-        # Trailing: price went 1 ATR in our favour, but drops back below SL trail
-        if trade.max_rate is not None and trade.max_rate >= sl_trail and current_rate < sl_trail:
+        # Trailing: price went 1.5 ATR in our favour, but drops back below SL trail
+        if trade.max_rate is not None and trade.max_rate >= levels.trail and current_rate < levels.trail:
             return {
                 "exit_tag": "atr_trail",
                 "exit_type": "exit_signal",
             }
 
         return None
+
+    def confirm_trade_exit(self, pair: str, trade: Trade, order_type: str, amount: float,
+                           rate: float, time_in_force: str, exit_reason: str,
+                           current_time: datetime, **kwargs) -> bool:
+        self._exit_levels.drop_trade(trade.id)
+        if self._exit_watch is not None:
+            self._exit_watch.drop(trade.id)
+        return True
+
+    def _trade_exit_levels(self, pair: str, trade: Trade, current_time: datetime):
+        """TP / SL / trailing levels shared by custom_exit and custom_stoploss."""
+        # Los multiplicadores cambian por epoch en hyperopt
+        self._exit_levels.set_multipliers(self.ATR_TP_MULT.value, self.ATR_SL_MULT,
+                                          self.ATR_TRAIL_MULT.value)
+        levels = self._exit_levels.levels(pair, trade.id, trade.open_rate, trade.open_date_utc,
+                                          current_time)
+        if levels is not None and self._exit_watch is not None:
+            # El stream despierta al bot cuando el precio cruza estos niveles
+            self._exit_watch.update(pair, trade.id, trade.open_rate, trade.max_rate, levels)
+        return levels
@@ -16,8 +16,11 @@ from freqtrade.strategy import (BooleanParameter, CategoricalParameter, DecimalP
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
+from mhm.compact import CompactLiveFrames
+from mhm.registry import REGISTRY, indicator
 
-class SampleStrategy(IStrategy):
+
+class SampleStrategy(CompactLiveFrames, IStrategy):
     """
     This is a sample strategy to inspire you.
     More information in https://www.freqtrade.io/en/latest/strategy-customization/
@@ -73,6 +76,25 @@ class SampleStrategy(IStrategy):
     # Number of candles the strategy requires before producing valid signals
     startup_candle_count: int = 30
 
+    # Dry/live: analyze only the last startup_candle_count candles and keep just the
+    # columns read by the entry/exit signals (float32) in the analyzed dataframe
+    COMPACT_LIVE_FRAMES: bool = False
+
+    # Indicators populate_indicators computes through mhm.registry (shared.X below), kept
+    # while other strategies analyze the same candles in this process (e.g. --strategy-list)
+    INDICATORS = (
+        indicator("ADX", "adx"),
+        indicator("RSI", "rsi"),
+        indicator("STOCHF", {"fastd": "fastd", "fastk": "fastk"}),
+        indicator("MACD", {"macd": "macd", "macdsignal": "macdsignal", "macdhist": "macdhist"}),
+        indicator("MFI", "mfi"),
+        indicator("BOLLINGER_TP", {"lower": "bb_lowerband", "mid": "bb_middleband",
+                                   "upper": "bb_upperband"}, window=20, stds=2),
+        indicator("SAR", "sar"),
+        indicator("TEMA", "tema", timeperiod=9),
+        indicator("HT_SINE", {"sine": "htsine", "leadsine": "htleadsine"}),
+    )
+
     # Optional order type mapping.
     order_types = {
         'entry': 'limit',
@@ -87,6 +109,15 @@ class SampleStrategy(IStrategy):
         'exit': 'GTC'
     }
 
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        # config["timeframe"] overrides the class timeframe once the strategy is loaded
+        REGISTRY.acquire(self, config.get("timeframe") or self.timeframe, self.INDICATORS)
+
+    def ft_bot_cleanup(self) -> None:
+        super().ft_bot_cleanup()
+        REGISTRY.release(self)
+
     @property
     def plot_config(self):
         """
@@ -131,11 +162,15 @@ class SampleStrategy(IStrategy):
         :return: a Dataframe with all mandatory indicators for the strategies
         """
 
+        # Same calls as talib.abstract, answered through mhm.registry: indicators also
+        # computed by another strategy on these candles (see INDICATORS) are reused.
+        shared = REGISTRY.functions(metadata['pair'], self.timeframe)
+
         # Momentum Indicators
         # ------------------------------------
 
         # ADX
-        dataframe['adx'] = ta.ADX(dataframe)
+        dataframe['adx'] = shared.ADX(dataframe)
 
         # # Plus Directional Indicator / Movement
         # dataframe['plus_dm'] = ta.PLUS_DM(dataframe)
@@ -174,7 +209,7 @@ class SampleStrategy(IStrategy):
         # dataframe['cci'] = ta.CCI(dataframe)
 
         # RSI
-        dataframe['rsi'] = ta.RSI(dataframe)
+        dataframe['rsi'] = shared.RSI(dataframe)
 
         # # Inverse Fisher transform on RSI: values [-1.0, 1.0] (https://goo.gl/2JGGoy)
         # rsi = 0.1 * (dataframe['rsi'] - 50)
@@ -189,7 +224,7 @@ class SampleStrategy(IStrategy):
         # dataframe['slowk'] = stoch['slowk']
 
         # Stochastic Fast
-        stochf = ta.STOCHF(dataframe)
+        stochf = shared.STOCHF(dataframe)
         dataframe['fastd'] = stochf['fastd']
         dataframe['fastk'] = stochf['fastk']
 
@@ -201,13 +236,13 @@ class SampleStrategy(IStrategy):
         # dataframe['fastk_rsi'] = stoch_rsi['fastk']
 
         # MACD
-        macd = ta.MACD(dataframe)
+        macd = shared.MACD(dataframe)
         dataframe['macd'] = macd['macd']
         dataframe['macdsignal'] = macd['macdsignal']
         dataframe['macdhist'] = macd['macdhist']
 
         # MFI
-        dataframe['mfi'] = ta.MFI(dataframe)
+        dataframe['mfi'] = shared.MFI(dataframe)
 
         # # ROC
         # dataframe['roc'] = ta.ROC(dataframe)
@@ -216,7 +251,8 @@ class SampleStrategy(IStrategy):
         # ------------------------------------
 
         # Bollinger Bands
-        bollinger = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=2)
+        # (qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=2))
+        bollinger = shared.BOLLINGER_TP(dataframe, window=20, stds=2)
         dataframe['bb_lowerband'] = bollinger['lower']
         dataframe['bb_middleband'] = bollinger['mid']
         dataframe['bb_upperband'] = bollinger['upper']
@@ -261,15 +297,15 @@ class SampleStrategy(IStrategy):
         # dataframe['sma100'] = ta.SMA(dataframe, timeperiod=100)
 
         # Parabolic SAR
-        dataframe['sar'] = ta.SAR(dataframe)
+        dataframe['sar'] = shared.SAR(dataframe)
 
         # TEMA - Triple Exponential Moving Average
-        dataframe['tema'] = ta.TEMA(dataframe, timeperiod=9)
+        dataframe['tema'] = shared.TEMA(dataframe, timeperiod=9)
 
         # Cycle Indicator
         # ------------------------------------
         # Hilbert Transform Indicator - SineWave
-        hilbert = ta.HT_SINE(dataframe)
+        hilbert = shared.HT_SINE(dataframe)
         dataframe['htsine'] = hilbert['sine']
         dataframe['htleadsine'] = hilbert['leadsine']
 
@@ -0,0 +1,7 @@
+"""
+Support package for the MultiHorizonMomentum strategy.
+
+Lives next to the strategy files so freqtrade's strategy loader can import it
+(the strategy directory is on ``sys.path`` while strategies are loaded) without
+scanning it for ``IStrategy`` subclasses.
+"""
@@ -0,0 +1,604 @@
+"""
+Fast-path backtester
+====================
+
+Array-based re-implementation of freqtrade's backtest loop for the exit model
+``MultiHorizonMomentum`` runs with: ATR take-profit and trailing exits from
+``custom_exit``, the static ``stoploss`` as the only stop, no ROI table, no
+exit signals and one trade per pair. Entry signals still come from the
+strategy itself (``advise_all_indicators`` + ``ft_advise_signals``); only the
+trade lifecycle is simulated here, one NumPy scan per trade instead of one
+Python iteration per candle and pair.
+
+freqtrade semantics replicated:
+
+* signals are shifted by one candle - a signal on candle ``i`` enters at the
+  open of candle ``i + 1``; no entries on the last candle of the backtest;
+* ``custom_exit`` sees the candle open as ``current_rate``, ``trade.max_rate``
+  including the candle's high, and the ATR of the last closed candle; it exits
+  at the open (exit reason ``custom_exit``, since the strategy returns a dict);
+* it is checked before the stoploss, which fills at the stop price or at the
+  open when the candle gapped below it;
+* rates are rounded to the pair's price precision (the monthly tick size
+  freqtrade infers from the candles); an exit whose rounded rate lies outside
+  the candle does not fill, and the trade keeps being evaluated on the next
+  candles (the stale order itself is not modelled);
+* exits are checked on the entry candle too; a pair re-enters at the earliest
+  on the candle after an exit;
+* ``max_open_trades`` is applied in freqtrade's processing order (open trades
+  first, then the whitelist order);
+* trades still open at the end are force-exited at the open of the pair's
+  last candle.
+
+``custom_stoploss`` is not part of the model: the strategy leaves
+``use_custom_stoploss`` unset, so freqtrade never calls it either.
+``check_supported`` rejects strategies whose settings fall outside the model.
+Wallet balance is not tracked - the stake is assumed to always be available.
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.backtest -c user_data/config.json \\
+        -p BTC/USDT --timerange 20241120-20241210 --fee 0.0002 --timeframe 1m
+"""
+
+import argparse
+import heapq
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.configuration import Configuration, TimeRange
+from freqtrade.data.btanalysis.historic_precision import get_tick_size_over_time
+from freqtrade.data.converter import trim_dataframe
+from freqtrade.data.history.datahandlers import IDataHandler
+from freqtrade.enums import CandleType, ExitType, HyperoptState, RunMode
+from freqtrade.exchange import amount_to_contract_precision, price_to_precision
+from freqtrade.exchange.exchange_utils import ROUND_UP, TICK_SIZE
+from freqtrade.resolvers import StrategyResolver
+from freqtrade.optimize.hyperopt_tools import HyperoptStateContainer
+from freqtrade.strategy import IStrategy
+from freqtrade.strategy.parameters import (BaseParameter, CategoricalParameter, DecimalParameter,
+                                           IntParameter)
+
+from mhm.ohlcv_store import DATA_FORMAT, StoreDataProvider, load_data
+
+logger = logging.getLogger(__name__)
+
+# First exit-search window in candles; doubled while no exit is found
+_WINDOW = 512
+
+# Strategy attributes that only change the simulated exits, not the entries
+EXIT_ATTRIBUTES = ("ATR_TP_MULT", "ATR_SL_MULT", "ATR_TRAIL_MULT", "FIX_EXIT_LEVELS_AT_ENTRY",
+                   "stoploss")
+
+
+class ExitModel(NamedTuple):
+    tp_mult: float
+    trail_mult: float
+    stoploss: float
+    fixed_at_entry: bool = False
+
+    @classmethod
+    def from_strategy(cls, strategy: IStrategy) -> "ExitModel":
+        return cls(
+            tp_mult=strategy_value(strategy, "ATR_TP_MULT"),
+            trail_mult=strategy_value(strategy, "ATR_TRAIL_MULT"),
+            stoploss=strategy.stoploss,
+            fixed_at_entry=strategy.FIX_EXIT_LEVELS_AT_ENTRY,
+        )
+
+
+class PairArrays(NamedTuple):
+    """Analyzed candles of one pair, trimmed to the simulated candles."""
+    pair: str
+    dates: np.ndarray       # datetime64[ns], UTC
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    atr: np.ndarray         # ATR of the previous (last closed) candle
+    entries: np.ndarray     # candle indices a trade may be opened on
+    price_ticks: pd.Series  # monthly tick size inferred from the candles
+    price_precision: Optional[float] = None     # exchange fallbacks
+    amount_precision: Optional[float] = None
+    precision_mode: Optional[int] = None
+    precision_mode_price: Optional[int] = None
+
+    def pair_precision(self, index: int) -> Tuple[Optional[float], Optional[int]]:
+        """Price precision a trade opened on candle ``index`` uses (``get_pair_precision``)."""
+        tick = self.price_ticks.asof(pd.Timestamp(self.dates[index], tz="UTC"))
+        if not np.isnan(tick):
+            return float(tick), TICK_SIZE
+        return self.price_precision, self.precision_mode_price
+
+
+class _Exit(NamedTuple):
+    index: int
+    rate: float
+    reason: str
+    tag: Optional[str]
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Strategy / data
+# ────────────────────────────────────────────────────────────────────────────────
+
+def strategy_value(strategy: IStrategy, name: str) -> Any:
+    """Value of a strategy attribute - a plain constant or a hyperopt parameter."""
+    value = getattr(strategy, name)
+    return value.value if isinstance(value, BaseParameter) else value
+
+
+def set_strategy_value(strategy: IStrategy, name: str, value: Any) -> None:
+    """Set a strategy attribute; hyperopt parameters keep their object, only the value changes."""
+    current = getattr(strategy, name, None)
+    if isinstance(current, BaseParameter):
+        current.value = value
+    else:
+        setattr(strategy, name, value)
+
+
+def candidates(param: BaseParameter) -> List[Any]:
+    """Every value hyperopt may give ``param`` (what ``param.range`` lists while optimizing)."""
+    if isinstance(param, CategoricalParameter):
+        return list(param.opt_range)
+    if isinstance(param, DecimalParameter):
+        scale = 10 ** param.decimals
+        return [round(step / scale, param.decimals)
+                for step in range(int(param.low * scale), int(param.high * scale) + 1)]
+    if isinstance(param, IntParameter):
+        return list(range(param.low, param.high + 1))
+    raise ValueError(f"{type(param).__name__} has no finite set of values")
+
+
+def check_supported(strategy: IStrategy) -> None:
+    """Raise ValueError when the strategy uses features the fast path does not model."""
+    unsupported = []
+    if strategy.minimal_roi:
+        unsupported.append("minimal_roi")
+    if strategy.trailing_stop:
+        unsupported.append("trailing_stop")
+    if strategy.use_custom_stoploss:
+        unsupported.append("use_custom_stoploss")
+    if strategy.position_adjustment_enable:
+        unsupported.append("position_adjustment_enable")
+    if strategy.can_short:
+        unsupported.append("can_short")
+    if not strategy.use_exit_signal:
+        unsupported.append("use_exit_signal=False")
+    if strategy.order_types.get("stoploss_on_exchange") and not strategy.config.get("dry_run"):
+        unsupported.append("stoploss_on_exchange")
+    if not hasattr(strategy, "ATR_TP_MULT"):
+        unsupported.append("no ATR exit attributes")
+    if unsupported:
+        raise ValueError(f"Fast backtest does not model: {', '.join(unsupported)}")
+
+
+def simulated_rows(analyzed: DataFrame, timerange: TimeRange, startup_candles: int
+                   ) -> Optional[np.ndarray]:
+    """Positions of the candles ``pair_arrays`` keeps (None when fewer than two are left)."""
+    trimmed = trim_dataframe(analyzed, timerange, startup_candles=startup_candles)
+    if len(trimmed) < 2:
+        return None
+    return analyzed.index.get_indexer(trimmed.index)[1:]
+
+
+def pair_arrays(pair: str, analyzed: DataFrame, timerange: TimeRange, startup_candles: int,
+                price_ticks: Optional[pd.Series] = None, **precision) -> Optional[PairArrays]:
+    """
+    Turn an analyzed dataframe (startup candles included) into the arrays the
+    simulation runs on - the same rows freqtrade iterates over after trimming
+    the startup period and dropping the first candle for the signal shift.
+    ``price_ticks`` (``tick_sizes``) can be passed in when already computed.
+    """
+    rows = simulated_rows(analyzed, timerange, startup_candles)
+    if rows is None:
+        return None
+    prev = rows - 1
+
+    def signal(column: str) -> np.ndarray:
+        if column not in analyzed:
+            return np.zeros(len(analyzed), dtype=bool)
+        return analyzed[column].to_numpy(dtype=np.float64, na_value=0.0) == 1
+
+    if signal("exit_long")[prev].any():
+        raise ValueError(f"{pair}: exit signals are not modelled by the fast backtest")
+    enter = signal("enter_long")
+    atr = analyzed["atr100"].to_numpy(dtype=np.float64)
+
+    return PairArrays(
+        pair=pair,
+        dates=analyzed["date"].values[rows].astype("datetime64[ns]"),
+        open=analyzed["open"].to_numpy(dtype=np.float64)[rows],
+        high=analyzed["high"].to_numpy(dtype=np.float64)[rows],
+        low=analyzed["low"].to_numpy(dtype=np.float64)[rows],
+        atr=atr[prev],
+        entries=np.flatnonzero(enter[prev]),
+        price_ticks=tick_sizes(analyzed) if price_ticks is None else price_ticks,
+        **precision,
+    )
+
+
+def tick_sizes(candles: DataFrame) -> pd.Series:
+    """Monthly price precision freqtrade's backtesting infers from the candles."""
+    return get_tick_size_over_time(candles[["date", "open", "high", "low", "close"]])
+
+
+def exchange_precision(exchange, pair: str) -> Dict:
+    if exchange is None:
+        return {}
+    return {
+        "price_precision": exchange.get_precision_price(pair),
+        "amount_precision": exchange.get_precision_amount(pair),
+        "precision_mode": exchange.precisionMode,
+        "precision_mode_price": exchange.precision_mode_price,
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Simulation
+# ────────────────────────────────────────────────────────────────────────────────
+
+def find_exit(data: PairArrays, entry: int, model: ExitModel, stop_rate: float,
+              start: int, max_rate: float) -> Tuple[_Exit, float]:
+    """
+    First candle from ``start`` on which a trade opened at the open of candle
+    ``entry`` hits an exit. ``max_rate`` is ``trade.max_rate`` before ``start``;
+    its value at the exit candle is returned alongside.
+    """
+    open_rate = data.open[entry]
+    atr_fixed = data.atr[entry]     # signal candle
+    width, end = _WINDOW, len(data.open)
+
+    while start < end:
+        stop = min(end, start + width)
+        opens = data.open[start:stop]
+        highs = data.high[start:stop]
+        rates = np.maximum.accumulate(np.maximum(highs, max_rate))
+        atr = np.full(stop - start, atr_fixed) if model.fixed_at_entry else data.atr[start:stop]
+
+        take_profit = open_rate + model.tp_mult * atr
+        trail = open_rate + model.trail_mult * atr
+        # NaN ATR compares False everywhere, zero ATR means "no levels" (ExitLevelCache)
+        hit_tp = (atr != 0) & (opens >= take_profit)
+        hit_trail = (atr != 0) & (rates >= trail) & (opens < trail)
+        hit_custom = hit_tp | hit_trail
+        hit_stop = data.low[start:stop] <= stop_rate
+
+        hits = np.flatnonzero(hit_custom | hit_stop)
+        if hits.size:
+            idx = int(hits[0])
+            if hit_custom[idx]:
+                tag = "atr_tp" if hit_tp[idx] else "atr_trail"
+                exit_ = _Exit(start + idx, float(opens[idx]), ExitType.CUSTOM_EXIT.value, tag)
+            else:
+                rate = stop_rate if stop_rate <= highs[idx] else float(opens[idx])
+                exit_ = _Exit(start + idx, rate, ExitType.STOP_LOSS.value, None)
+            return exit_, float(rates[idx])
+
+        max_rate = rates[-1]
+        start, width = stop, width * 2
+
+    return _Exit(end - 1, float(data.open[end - 1]), ExitType.FORCE_EXIT.value, None), max_rate
+
+
+def simulate(pairs: List[PairArrays], model: ExitModel, stake_amount: float, fee: float,
+             max_open_trades: int = -1,
+             exits: Optional[Callable[[int, int, float], Tuple[_Exit, np.datetime64]]] = None
+             ) -> Tuple[DataFrame, int]:
+    """
+    Run the trade lifecycle over all pairs (in whitelist order).
+
+    :param exits: Finds the exit of a trade instead of the candle scan - called with
+        (pair position, entry candle, stop rate), returns the exit and its close date
+    :return: (trades dataframe, number of entries rejected for lack of a slot)
+    """
+    end_date = max(data.dates[-1] for data in pairs if len(data.dates))
+    candidates: List[Tuple[np.datetime64, int, int]] = []
+
+    def push_next(order: int, after: int) -> None:
+        data = pairs[order]
+        pos = int(np.searchsorted(data.entries, after, side="right"))
+        if pos < len(data.entries):
+            idx = int(data.entries[pos])
+            if data.dates[idx] < end_date:   # no entries on the last candle
+                heapq.heappush(candidates, (data.dates[idx], order, idx))
+
+    for order in range(len(pairs)):
+        push_next(order, -1)
+
+    open_exits: List[np.datetime64] = []
+    rejected = 0
+    trades = []
+    while candidates:
+        date, order, entry = heapq.heappop(candidates)
+        # Trades closing on this candle were processed before any entry
+        while open_exits and open_exits[0] <= date:
+            heapq.heappop(open_exits)
+        if 0 < max_open_trades <= len(open_exits):
+            rejected += 1
+            push_next(order, entry)
+            continue
+
+        data = pairs[order]
+        precision, precision_mode = data.pair_precision(entry)
+        stop_rate = price_to_precision(
+            float(data.open[entry] * (1 - abs(model.stoploss))), precision, precision_mode,
+            rounding_mode=ROUND_UP,
+        )
+        if exits is not None:
+            exit_, close_date = exits(order, entry, stop_rate)
+        else:
+            start, max_rate = entry, float(data.open[entry])
+            while True:
+                exit_, max_rate = find_exit(data, entry, model, stop_rate, start, max_rate)
+                rate = price_to_precision(exit_.rate, precision, precision_mode)
+                last = exit_.index == len(data.open) - 1
+                if last or data.low[exit_.index] <= rate <= data.high[exit_.index]:
+                    break
+                start = exit_.index + 1     # order does not fill on this candle
+            exit_ = exit_._replace(rate=rate)
+            close_date = data.dates[exit_.index]
+
+        trades.append(_trade_row(data, entry, exit_, close_date, stake_amount, fee))
+        heapq.heappush(open_exits, data.dates[exit_.index])
+        push_next(order, exit_.index)
+
+    columns = ["pair", "open_date", "close_date", "open_rate", "close_rate", "amount",
+               "stake_amount", "profit_ratio", "profit_abs", "exit_reason", "exit_tag",
+               "trade_duration"]
+    result = DataFrame(trades, columns=columns)
+    if not result.empty:
+        for col in ("open_date", "close_date"):
+            result[col] = pd.to_datetime(result[col], utc=True)
+        result = result.sort_values(["close_date", "open_date"], kind="stable")
+    return result.reset_index(drop=True), rejected
+
+
+def _trade_row(data: PairArrays, entry: int, exit_: _Exit, close_date: np.datetime64,
+               stake_amount: float, fee: float) -> tuple:
+    open_rate = float(data.open[entry])
+    amount = amount_to_contract_precision(
+        stake_amount / open_rate, data.amount_precision, data.precision_mode, None)
+    close_rate = exit_.rate
+    open_value = amount * open_rate * (1 + fee)
+    close_value = amount * close_rate * (1 - fee)
+    open_date = data.dates[entry]
+    return (
+        data.pair, open_date, close_date, open_rate, close_rate, amount, amount * open_rate,
+        round(close_value / open_value - 1, 8), close_value - open_value,
+        exit_.reason, exit_.tag,
+        int((close_date - open_date) // np.timedelta64(1, "m")),
+    )
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Metrics
+# ────────────────────────────────────────────────────────────────────────────────
+
+def summarize(trades: DataFrame) -> Dict:
+    """Headline numbers, computed the way freqtrade's backtest report does."""
+    profit = trades["profit_abs"]
+    wins = int((profit > 0).sum())
+    losses = int((profit < 0).sum())
+    gross_loss = -profit[profit < 0].sum()
+    return {
+        "trades": len(trades),
+        "wins": wins,
+        "draws": len(trades) - wins - losses,
+        "losses": losses,
+        "winrate": wins / len(trades) if len(trades) else 0.0,
+        "profit_total_abs": float(profit.sum()),
+        "profit_mean": float(trades["profit_ratio"].mean()) if len(trades) else 0.0,
+        "profit_factor": float(profit[profit > 0].sum() / gross_loss) if gross_loss else 0.0,
+    }
+
+
+def exit_reason_summary(trades: DataFrame, key: str = "exit_reason") -> DataFrame:
+    grouped = trades.groupby(key, dropna=False)
+    return DataFrame({
+        "trades": grouped.size(),
+        "wins": grouped["profit_abs"].apply(lambda p: int((p > 0).sum())),
+        "avg_profit_pct": grouped["profit_ratio"].mean() * 100,
+        "profit_abs": grouped["profit_abs"].sum(),
+    }).sort_values("trades", ascending=False)
+
+
+def print_report(trades: DataFrame, rejected: int, currency: str) -> None:
+    summary = summarize(trades)
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(exit_reason_summary(trades).to_string())
+        print()
+        print(exit_reason_summary(trades, "exit_tag").to_string())
+        print()
+    print(f"Trades          : {summary['trades']} ({summary['wins']} W / "
+          f"{summary['draws']} D / {summary['losses']} L)")
+    print(f"Win rate        : {summary['winrate']:.1%}")
+    print(f"Profit factor   : {summary['profit_factor']:.2f}")
+    print(f"Total profit    : {summary['profit_total_abs']:.4f} {currency}")
+    print(f"Rejected entries: {rejected}")
+
+
+def compare_with_freqtrade(trades: DataFrame, result_file: str, strategy: str) -> DataFrame:
+    """Trades that differ from a freqtrade backtest result (empty when they match)."""
+    from freqtrade.data.btanalysis import load_backtest_data
+
+    reference = load_backtest_data(result_file, strategy)
+    keys = ["pair", "open_date"]
+    cols = ["close_date", "open_rate", "close_rate", "exit_reason", "profit_ratio"]
+    merged = trades[keys + cols].merge(
+        reference[keys + cols], on=keys, how="outer", suffixes=("", "_ft"), indicator=True)
+    differs = merged["_merge"] != "both"
+    for col in cols:
+        if col in ("open_rate", "close_rate", "profit_ratio"):
+            differs |= ~np.isclose(merged[col], merged[f"{col}_ft"], rtol=1e-6, atol=1e-8)
+        else:
+            differs |= merged[col] != merged[f"{col}_ft"]
+    return merged[differs]
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Runner
+# ────────────────────────────────────────────────────────────────────────────────
+
+def load_indicators(config: dict, strategy: IStrategy, startup_candles: Optional[int] = None,
+                    params: Optional[Dict[str, Any]] = None, optimized: Sequence[str] = (),
+                    data: Optional[Dict[str, DataFrame]] = None,
+                    data_handler: Optional[IDataHandler] = None
+                    ) -> Tuple[Dict[str, DataFrame], TimeRange]:
+    """
+    Load candles and run ``populate_indicators`` as ``freqtrade backtesting`` does.
+
+    :param startup_candles: Candles loaded before the timerange (default: the strategy's)
+    :param params: Attribute values to use over the strategy's (and its parameter file)
+    :param optimized: Hyperopt parameters that change between the runs sharing these
+        indicators - calculated as ``freqtrade hyperopt`` does, where ``can_optimize()``
+        holds and ``.range`` lists every candidate
+    :param data: Candles per pair to analyze instead of the stored ones (startup included)
+    :param data_handler: Handler to read the stored candles (and informative pairs) through
+    """
+    timerange = TimeRange.parse_timerange(config.get("timerange"))
+    if startup_candles is None:
+        startup_candles = strategy.startup_candle_count
+    if data is None:
+        data = load_data(
+            datadir=config["datadir"],
+            pairs=config["exchange"]["pair_whitelist"],
+            timeframe=config["timeframe"],
+            timerange=timerange,
+            startup_candles=startup_candles,
+            fail_without_data=True,
+            data_format=config["dataformat_ohlcv"],
+            data_handler=data_handler,
+            candle_type=config.get("candle_type_def", CandleType.SPOT),
+        )
+    strategy.dp = StoreDataProvider(config, None, data_handler=data_handler)
+    strategy.ft_bot_start()
+    for name, value in (params or {}).items():
+        set_strategy_value(strategy, name, value)
+    if not optimized:
+        return strategy.advise_all_indicators(data), timerange
+
+    for name in optimized:
+        param = getattr(strategy, name)
+        if isinstance(param, BaseParameter):
+            param.in_space = True
+    HyperoptStateContainer.set_state(HyperoptState.INDICATORS)
+    try:
+        return strategy.advise_all_indicators(data), timerange
+    finally:
+        HyperoptStateContainer.set_state(HyperoptState.OPTIMIZE)
+
+
+def analyze(config: dict, strategy: IStrategy, data: Optional[Dict[str, DataFrame]] = None,
+            data_handler: Optional[IDataHandler] = None) -> Tuple[Dict[str, DataFrame], TimeRange]:
+    """
+    Indicators plus entry / exit signals, per pair (``data``, ``data_handler``:
+    see ``load_indicators``).
+    """
+    preprocessed, timerange = load_indicators(config, strategy, data=data,
+                                              data_handler=data_handler)
+    analyzed = {
+        pair: strategy.ft_advise_signals(df, {"pair": pair}) for pair, df in preprocessed.items()
+    }
+    return analyzed, timerange
+
+
+def run(config: dict, exchange=None, signal_cache=None,
+        data_handler: Optional[IDataHandler] = None) -> Tuple[DataFrame, int]:
+    """
+    Fast backtest of ``config["strategy"]`` over ``config["timerange"]``.
+    ``exchange`` (optional) supplies the amount precision (and the price
+    precision for months without candles); without it amounts are not rounded.
+    With a ``signal_cache`` (``mhm.signal_cache.SignalCache``) a run that only
+    changes exit settings reuses the entries of an earlier run. ``data_handler``
+    reads the candles instead of the handler of ``dataformat_ohlcv``.
+    """
+    if not isinstance(config["stake_amount"], (int, float)):
+        raise ValueError("Fast backtest needs a fixed stake_amount")
+    strategy = StrategyResolver.load_strategy(config)
+    check_supported(strategy)
+
+    pairs = None
+    if signal_cache is not None:
+        strategy.ft_load_hyper_params()     # valores del fichero de parámetros, en la clave
+        key = signal_cache.key(config, strategy)
+        pairs = signal_cache.load(key)
+        logger.info("Entry signals %s (%s)", "reused" if pairs is not None else "computed", key)
+    if pairs is None:
+        analyzed, timerange = analyze(config, strategy, data_handler=data_handler)
+        pairs = []
+        for pair, df in analyzed.items():
+            arrays = pair_arrays(pair, df, timerange, strategy.startup_candle_count)
+            if arrays is not None:
+                pairs.append(arrays)
+        if signal_cache is not None and pairs:
+            signal_cache.store(key, pairs)
+    if not pairs:
+        raise ValueError("No data left after adjusting for startup candles.")
+    pairs = [data._replace(**exchange_precision(exchange, data.pair)) for data in pairs]
+
+    return simulate(pairs, ExitModel.from_strategy(strategy), float(config["stake_amount"]),
+                    float(config["fee"]), int(config.get("max_open_trades", -1)))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fast backtest for MultiHorizonMomentum")
+    parser.add_argument("-c", "--config", default="user_data/config.json")
+    parser.add_argument("-s", "--strategy", default="MultiHorizonMomentum")
+    parser.add_argument("-p", "--pairs", nargs="+")
+    parser.add_argument("--timerange")
+    parser.add_argument("--timeframe")
+    parser.add_argument("--fee", type=float)
+    parser.add_argument("--max-open-trades", type=int)
+    parser.add_argument("--data-format", choices=["json", "jsongz", "feather", "parquet",
+                                                  DATA_FORMAT],
+                        help="Candle storage format (default: dataformat_ohlcv from the config)")
+    parser.add_argument("--exchange-precision", action="store_true",
+                        help="Load exchange markets to round rates / amounts like freqtrade")
+    parser.add_argument("--compare", metavar="RESULT",
+                        help="freqtrade backtest result (.zip / .json) to compare trades with")
+    parser.add_argument("--reuse-signals", action="store_true",
+                        help="Keep the entry signals in user_data/cache/signals and reuse them "
+                             "while only exit settings change")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cli = {"config": [args.config], "strategy": args.strategy, "timerange": args.timerange,
+           "timeframe": args.timeframe, "fee": args.fee, "pairs": args.pairs,
+           "max_open_trades": args.max_open_trades}
+    config = Configuration({k: v for k, v in cli.items() if v is not None},
+                           RunMode.BACKTEST).get_config()
+    if args.data_format:
+        config["dataformat_ohlcv"] = args.data_format
+
+    exchange = None
+    if args.exchange_precision or config.get("fee") is None:
+        from freqtrade.resolvers import ExchangeResolver
+        exchange = ExchangeResolver.load_exchange(config, load_leverage_tiers=False)
+        if config.get("fee") is None:
+            pair = config["exchange"]["pair_whitelist"][0]
+            config["fee"] = exchange.get_fee(symbol=pair, taker_or_maker="maker")
+        if not args.exchange_precision:
+            exchange = None
+
+    signal_cache = None
+    if args.reuse_signals:
+        from mhm.signal_cache import SignalCache
+        signal_cache = SignalCache(Path(config["user_data_dir"]) / "cache" / "signals")
+
+    trades, rejected = run(config, exchange, signal_cache)
+    print_report(trades, rejected, config["stake_currency"])
+
+    if args.compare:
+        diff = compare_with_freqtrade(trades, args.compare, args.strategy)
+        print(f"Trades differing from {args.compare}: {len(diff)}")
+        if len(diff):
+            print(diff.head(20).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Hot-path benchmarks
+===================
+
+Reproducible, offline benchmark of the strategy callbacks on seeded synthetic
+1m candles (no exchange, no downloaded data):
+
+* ``synthetic_ohlcv`` - random-walk candles per pair with volatility regimes,
+  trending stretches and volume bursts, so every indicator and entry branch
+  gets exercised. The same seed, pair and length always give the same candles.
+* Per strategy and stage - ``populate_indicators``, ``populate_entry_trend``,
+  ``populate_exit_trend`` and, when the strategy overrides them,
+  ``custom_exit`` / ``custom_stoploss`` - throughput (candles or calls per
+  second, best of ``--repeat`` runs) and peak traced memory (one separate run
+  under ``tracemalloc``, so the timings are not slowed down by it).
+* ``--save`` stores the results as a baseline; later runs are compared against
+  it and every stage slower (or heavier) than ``--threshold`` is reported as a
+  regression - the command then exits with status 1.
+
+Pairs are generated, measured and dropped one at a time, so a full-scale run
+(1 year x 100 pairs) only holds one pair in memory. Feature caching is off: the
+stages always compute.
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.bench --days 365 --pairs 100 --save
+    PYTHONPATH=user_data/strategies python -m mhm.bench --days 365 --pairs 100
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.data.dataprovider import DataProvider
+from freqtrade.enums import RunMode
+from freqtrade.resolvers import StrategyResolver
+from freqtrade.strategy import IStrategy
+
+from mhm.resample import resample_ohlcv
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = STRATEGY_DIR.parent / "benchmarks" / "baseline.json"
+DEFAULT_STRATEGIES = ("MultiHorizonMomentum", "SampleStrategy")
+
+MINUTES_PER_DAY = 1440
+
+# Stages faster than this in total (no-op callbacks) are timer noise, never regressions
+MIN_SECONDS = 0.01
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Synthetic candles
+# ────────────────────────────────────────────────────────────────────────────────
+
+def synthetic_ohlcv(pair: str, days: int, seed: int,
+                    start: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)) -> DataFrame:
+    """
+    Seeded 1m candles in freqtrade's layout (``date`` in ms, UTC).
+
+    :param pair: Part of the seed, so every pair gets its own path
+    :param days: Length of the series
+    :param seed: Benchmark seed
+    """
+    rng = np.random.default_rng([seed, zlib.crc32(pair.encode())])
+    n = days * MINUTES_PER_DAY
+
+    # Volatility regimes (days-long cycles) and trending stretches of 12h
+    phase = np.arange(n) * (2 * np.pi / (MINUTES_PER_DAY * rng.uniform(3, 30)))
+    sigma = 0.0008 * (1 + 0.6 * np.sin(phase + rng.uniform(0, 2 * np.pi)))
+    drift = np.repeat(rng.normal(0, 0.00006, n // 720 + 1), 720)[:n]
+    returns = rng.standard_t(4, n) * sigma * 0.7 + drift
+
+    close = rng.uniform(0.5, 50000) * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([close[0] / np.exp(returns[0])], close[:-1]))
+    wick = np.abs(rng.normal(0, 0.5, (2, n))) * sigma
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    burst = 1 + 4 * (np.abs(returns) > 2.5 * sigma)
+    volume = rng.lognormal(np.log(rng.uniform(1, 1000)), 0.6, n) * burst
+
+    dates = pd.date_range(start, periods=n, freq="1min").as_unit("ms")
+    return DataFrame({"date": dates, "open": open_, "high": high, "low": low,
+                      "close": close, "volume": volume})
+
+
+class _BenchDataProvider(DataProvider):
+    """Serves the synthetic informative candles of the pair being measured."""
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config, None)
+        self.frames: Dict[Tuple[str, str], DataFrame] = {}
+
+    def historic_ohlcv(self, pair: str, timeframe: str, candle_type: str = "") -> DataFrame:
+        return self.frames.get((pair, str(timeframe)), DataFrame()).copy()
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Measurement
+# ────────────────────────────────────────────────────────────────────────────────
+
+class _Stage:
+    __slots__ = ("units", "seconds", "peak_bytes")
+
+    def __init__(self) -> None:
+        self.units = 0
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+
+def _measure(stage: _Stage, run: Callable[[], Any], prepare: Callable[[], Any],
+             units: int, repeat: int) -> Any:
+    """Best of ``repeat`` timed runs, then one traced run for the memory peak."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        args = prepare()
+        start = time.perf_counter()
+        result = run(*args)
+        best = min(best, time.perf_counter() - start)
+
+    args = prepare()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stage.units += units
+    stage.seconds += best
+    stage.peak_bytes = max(stage.peak_bytes, peak)
+    return result
+
+
+def load_strategy(name: str) -> IStrategy:
+    config = {
+        "strategy": name, "strategy_path": str(STRATEGY_DIR), "runmode": RunMode.BACKTEST,
+        "user_data_dir": STRATEGY_DIR.parent,
+        "timeframe": "1m", "stake_currency": "USDT", "stake_amount": 100, "dry_run": True,
+        "candle_type_def": "spot", "trading_mode": "spot", "margin_mode": "",
+        "exchange": {"name": "binance", "pair_whitelist": []}, "pairlists": [],
+    }
+    strategy = StrategyResolver.load_strategy(config)
+    strategy.dp = _BenchDataProvider(config)
+    if getattr(strategy, "_features", None) is not None:
+        strategy._features = None   # measure the indicators, not the on-disk cache
+    return strategy
+
+
+def _overrides(strategy: IStrategy, method: str) -> bool:
+    return getattr(type(strategy), method) is not getattr(IStrategy, method)
+
+
+def _exit_calls(strategy: IStrategy, method: str, pair: str, analyzed: DataFrame,
+                calls: int) -> Tuple[Callable[[], Any], int]:
+    """One open trade walked over the last ``calls`` closed candles of ``analyzed``."""
+    calls = min(calls, len(analyzed) - 1)
+    rows = analyzed.iloc[-calls:]
+    open_row = analyzed.iloc[-calls - 1]
+    step = timedelta(minutes=1)
+    trade = SimpleNamespace(id=1, pair=pair, open_rate=float(open_row["close"]),
+                            open_date_utc=open_row["date"].to_pydatetime() + step,
+                            max_rate=float(open_row["close"]), is_short=False)
+    times = [date + step for date in rows["date"].dt.to_pydatetime()]
+    rates = rows["close"].tolist()
+    max_rates = np.maximum.accumulate(rows["high"].to_numpy()).tolist()
+    callback = getattr(strategy, method)
+
+    def run() -> None:
+        for current_time, rate, max_rate in zip(times, rates, max_rates):
+            trade.max_rate = max_rate
+            callback(pair=pair, trade=trade, current_time=current_time, current_rate=rate,
+                     current_profit=rate / trade.open_rate - 1, after_fill=False)
+    return run, calls
+
+
+def bench_strategy(name: str, pairs: List[str], days: int, seed: int, repeat: int,
+                   exit_calls: int) -> Dict[str, _Stage]:
+    strategy = load_strategy(name)
+    stages: Dict[str, _Stage] = {}
+
+    def stage(key: str) -> _Stage:
+        return stages.setdefault(key, _Stage())
+
+    for pair in pairs:
+        candles = synthetic_ohlcv(pair, days, seed)
+        strategy.dp.frames = {(pair, "15m"): resample_ohlcv(candles, "15m")}
+        metadata = {"pair": pair}
+        rows = len(candles)
+
+        indicators = _measure(stage("populate_indicators"),
+                              lambda df: strategy.populate_indicators(df, metadata),
+                              lambda: (candles.copy(),), rows, repeat)
+        analyzed = _measure(stage("populate_entry_trend"),
+                            lambda df: strategy.populate_entry_trend(df, metadata),
+                            lambda: (indicators.copy(),), rows, repeat)
+        _measure(stage("populate_exit_trend"),
+                 lambda df: strategy.populate_exit_trend(df, metadata),
+                 lambda: (analyzed.copy(),), rows, repeat)
+
+        for method in ("custom_exit", "custom_stoploss"):
+            if _overrides(strategy, method):
+                run, calls = _exit_calls(strategy, method, pair, analyzed, exit_calls)
+                _measure(stage(method), run, lambda: (), calls, repeat)
+        logger.info("%s %s: %d candles", name, pair, rows)
+    return stages
+
+
+def run_benchmarks(strategies: List[str], n_pairs: int, days: int, seed: int, repeat: int,
+                   exit_calls: int) -> Dict[str, Any]:
+    pairs = [f"SYN{i:03d}/USDT" for i in range(n_pairs)]
+    results = {}
+    for name in strategies:
+        for stage_name, stage in bench_strategy(name, pairs, days, seed, repeat,
+                                                exit_calls).items():
+            results[f"{name}/{stage_name}"] = {
+                "units": stage.units,
+                "seconds": round(stage.seconds, 6),
+                "per_second": round(stage.units / stage.seconds, 1) if stage.seconds else None,
+                "peak_mb": round(stage.peak_bytes / 2 ** 20, 2),
+            }
+    return {"workload": {"days": days, "pairs": n_pairs, "seed": seed, "exit_calls": exit_calls},
+            "environment": _environment(), "results": results}
+
+
+def _environment() -> Dict[str, str]:
+    import freqtrade
+    import talib
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "talib": talib.__version__,
+            "freqtrade": freqtrade.__version__, "machine": platform.machine(),
+            "processor": platform.processor() or platform.machine(),
+            "recorded": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Baselines
+# ────────────────────────────────────────────────────────────────────────────────
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> DataFrame:
+    """One row per stage; ``regression`` names what got worse beyond ``threshold``."""
+    rows = []
+    for key, now in current["results"].items():
+        before = baseline["results"].get(key)
+        if before is None or not now["per_second"] or not before["per_second"]:
+            rows.append({"stage": key, "per_second": now["per_second"],
+                         "peak_mb": now["peak_mb"], "regression": "new"})
+            continue
+        slower = before["per_second"] / now["per_second"] - 1
+        if max(now["seconds"], before["seconds"]) < MIN_SECONDS:
+            slower = 0.0
+        heavier = now["peak_mb"] / before["peak_mb"] - 1 if before["peak_mb"] else 0.0
+        worse = [label for label, delta in (("time", slower), ("memory", heavier))
+                 if delta > threshold]
+        rows.append({"stage": key, "per_second": now["per_second"],
+                     "baseline_per_second": before["per_second"], "slower_pct": 100 * slower,
+                     "peak_mb": now["peak_mb"], "baseline_peak_mb": before["peak_mb"],
+                     "regression": ",".join(worse)})
+    return DataFrame(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Strategy hot-path benchmarks")
+    parser.add_argument("-s", "--strategies", nargs="+", default=list(DEFAULT_STRATEGIES))
+    parser.add_argument("--pairs", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best kept)")
+    parser.add_argument("--exit-calls", type=int, default=2000,
+                        help="custom_exit / custom_stoploss calls per pair")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed slowdown / memory growth before a stage is reported")
+    parser.add_argument("--output", type=Path, help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    baseline = None
+    if not args.save and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        workload = {"days": args.days, "pairs": args.pairs, "seed": args.seed,
+                    "exit_calls": args.exit_calls}
+        if baseline["workload"] != workload:
+            parser.error(f"{args.baseline} was recorded for {baseline['workload']}, "
+                         f"not {workload}")
+
+    current = run_benchmarks(args.strategies, args.pairs, args.days, args.seed, args.repeat,
+                             args.exit_calls)
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+
+    with pd.option_context("display.width", 200, "display.max_columns", 30):
+        if baseline is None:
+            print(DataFrame(current["results"]).T.to_string())
+        else:
+            report = compare(current, baseline, args.threshold)
+            print(report.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+            regressions = report[~report["regression"].isin(["", "new"])]
+            if not regressions.empty:
+                print(f"\n{len(regressions)} stage(s) regressed beyond "
+                      f"{args.threshold:.0%} against {args.baseline} "
+                      f"(recorded {baseline['environment'].get('recorded')})")
+                return 1
+            print(f"\nNo regression beyond {args.threshold:.0%} against {args.baseline}")
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=2))
+        print(f"\nBaseline stored in {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
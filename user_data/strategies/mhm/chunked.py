@@ -0,0 +1,313 @@
+"""
+Chunked backtests
+=================
+
+``mhm.backtest`` analyzes every pair over the whole timerange in one process;
+over months of 1m candles nearly all of that time is ``populate_indicators`` /
+``populate_entry_trend``. ``run_chunked`` splits the timerange into chunks and
+analyzes them in a process pool:
+
+* each chunk loads its candles with ``warmup`` candles before its start
+  (default: ``default_warmup``, 20 x the slowest EMA period) and returns the
+  arrays the simulation runs on (``PairArrays``); the first chunk loads the
+  strategy's ``startup_candle_count``, like a single run;
+* the chunks are concatenated per pair and simulated in one pass, so trades
+  crossing a chunk boundary, ``max_open_trades`` and the last-candle force
+  exit behave exactly as in a single run. The simulation is a small share of
+  the time, so the run scales with the analysis.
+
+What can differ from ``mhm.backtest`` are the indicators on the first candles
+of a later chunk, which see ``warmup`` candles of history instead of everything
+before them. Recursive EMAs converge slowly: with the default warm-up they
+match the single run to float precision (the bound ``mhm.features`` uses), a
+shorter ``--warmup`` (e.g. ``startup_candle_count``) trades that for less
+work per chunk.
+
+Walk-forward (``--walk-forward TRAIN TEST``, in days): test windows of TEST
+days, each preceded by a TRAIN-day window. With ``--grid`` the best variant
+on the train window (``mhm.sweep``) is backtested on the test window; without
+it the strategy runs as is. Windows are independent backtests (open trades are
+closed at the window end, indicators start from ``startup_candle_count``
+candles as in ``mhm.backtest``), run in parallel, reported one row per window.
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.chunked -c user_data/config.json \\
+        -p BTC/USDT ETH/USDT --timerange 20240101-20250101 --fee 0.0002 --timeframe 1m \\
+        --chunk-days 30 -j 8
+    PYTHONPATH=user_data/strategies python -m mhm.chunked -c user_data/config.json \\
+        -p BTC/USDT --timerange 20240101-20250101 --fee 0.0002 --timeframe 1m \\
+        --walk-forward 60 30 --grid ENTRY_RSI_MIN=55,60 ENTRY_VOLUME_MULT=1.7,2.0
+"""
+
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.configuration import Configuration, TimeRange
+from freqtrade.enums import RunMode
+from freqtrade.exchange import timeframe_to_seconds
+from freqtrade.resolvers import StrategyResolver
+
+from mhm.backtest import (ExitModel, PairArrays, check_supported, exchange_precision,
+                          load_indicators, pair_arrays, print_report, set_strategy_value,
+                          simulate, strategy_value, summarize)
+from mhm.features import EMA_WARMUP_FACTOR
+from mhm.ohlcv_store import DATA_FORMAT
+from mhm.sweep import parse_grid, sweep
+
+logger = logging.getLogger(__name__)
+
+
+def split_timerange(timerange: TimeRange, timeframe: str, chunks: Optional[int] = None,
+                    chunk_days: Optional[float] = None) -> List[TimeRange]:
+    """
+    Consecutive, non-overlapping timeranges covering ``timerange`` (both ends
+    needed), split at candle boundaries into ``chunks`` parts or parts of
+    ``chunk_days``.
+    """
+    if timerange.starttype != "date" or timerange.stoptype != "date":
+        raise ValueError("Chunked backtests need a timerange with a start and an end")
+    candle = timeframe_to_seconds(timeframe)
+    start, stop = timerange.startts, timerange.stopts
+    if chunk_days:
+        step = int(chunk_days * 86400)
+    else:
+        step = -(-(stop - start) // max(chunks or 1, 1))
+    step = max(candle, step // candle * candle)
+
+    begins = list(range(start, stop, step))
+    # Las paradas son inclusivas: cada chunk acaba una vela antes del siguiente,
+    # el último en la parada del timerange
+    ends = [begin - candle for begin in begins[1:]] + [stop]
+    return [TimeRange("date", "date", begin, end) for begin, end in zip(begins, ends)]
+
+
+def _timerange_arg(timerange: TimeRange) -> str:
+    return f"{timerange.startts}-{timerange.stopts}"
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Workers
+# ────────────────────────────────────────────────────────────────────────────────
+
+def default_warmup(strategy) -> int:
+    """
+    ``EMA_WARMUP_FACTOR`` x the slowest of the strategy's ``EMA_*_PERIOD`` values,
+    and at least its ``startup_candle_count``.
+    """
+    periods = [strategy_value(strategy, name) for name in dir(type(strategy))
+               if name.startswith("EMA_") and name.endswith("_PERIOD")]
+    return max([strategy.startup_candle_count]
+               + [EMA_WARMUP_FACTOR * int(period) for period in periods])
+
+
+def _load_strategy(config: dict, params: Optional[Dict[str, Any]]):
+    strategy = StrategyResolver.load_strategy(config)
+    strategy.ft_load_hyper_params()
+    for name, value in (params or {}).items():
+        set_strategy_value(strategy, name, value)
+    return strategy
+
+
+def analyze_chunk(config: dict, timerange: TimeRange, warmup: int, first: bool,
+                  params: Optional[Dict[str, Any]] = None) -> Dict[str, PairArrays]:
+    """
+    Simulation arrays of every pair over ``timerange``, from candles loaded
+    ``warmup`` candles earlier. ``first``: the chunk opening the backtest, whose
+    first candle is dropped for the signal shift like in a single run (later
+    chunks take the signal of that candle from their warm-up).
+    """
+    config = {**config, "timerange": _timerange_arg(timerange)}
+    strategy = _load_strategy(config, params)
+    # ft_bot_start vuelve a cargar el fichero de parámetros: params van después
+    indicators, timerange = load_indicators(config, strategy, startup_candles=warmup,
+                                            params=params)
+    arrays = {}
+    for pair, df in indicators.items():
+        analyzed = strategy.ft_advise_signals(df, {"pair": pair})
+        data = pair_arrays(pair, analyzed, timerange, warmup if first else warmup - 1)
+        if data is not None:
+            arrays[pair] = data
+    return arrays
+
+
+def concat_arrays(parts: List[PairArrays]) -> PairArrays:
+    """One pair's chunks (in time order) as a single ``PairArrays``."""
+    offsets = np.cumsum([0] + [len(part.dates) for part in parts[:-1]])
+    ticks = pd.concat([part.price_ticks for part in parts])
+    return parts[0]._replace(
+        dates=np.concatenate([part.dates for part in parts]),
+        open=np.concatenate([part.open for part in parts]),
+        high=np.concatenate([part.high for part in parts]),
+        low=np.concatenate([part.low for part in parts]),
+        atr=np.concatenate([part.atr for part in parts]),
+        entries=np.concatenate([part.entries + offset for part, offset in zip(parts, offsets)]),
+        # Monthly maximum of significant digits = minimum tick over the chunks' candles
+        price_ticks=ticks.groupby(level=0).min().sort_index(),
+    )
+
+
+def _pool(workers: int, jobs: int) -> Optional[ProcessPoolExecutor]:
+    workers = min(workers or os.cpu_count() or 1, jobs)
+    return ProcessPoolExecutor(workers) if workers > 1 else None
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Runners
+# ────────────────────────────────────────────────────────────────────────────────
+
+def run_chunked(config: dict, chunks: Optional[int] = None, chunk_days: Optional[float] = None,
+                warmup: Optional[int] = None, workers: Optional[int] = None, exchange=None,
+                params: Optional[Dict[str, Any]] = None) -> Tuple[DataFrame, int]:
+    """
+    ``mhm.backtest.run`` with the analysis split over ``chunks`` (or
+    ``chunk_days``-long) parts of the timerange in ``workers`` processes.
+    """
+    if not isinstance(config["stake_amount"], (int, float)):
+        raise ValueError("Fast backtest needs a fixed stake_amount")
+    strategy = _load_strategy(config, params)
+    check_supported(strategy)
+    warmup = default_warmup(strategy) if warmup is None else warmup
+    ranges = split_timerange(TimeRange.parse_timerange(config.get("timerange")),
+                             config["timeframe"], chunks, chunk_days)
+    # El primer chunk arranca como una ejecución única: con startup_candle_count
+    jobs = [(config, timerange, strategy.startup_candle_count if i == 0 else warmup, i == 0,
+             params) for i, timerange in enumerate(ranges)]
+    logger.info("%d chunk(s) of %s, %d warm-up candles", len(ranges),
+                timedelta(seconds=ranges[0].stopts - ranges[0].startts), warmup)
+
+    pool = _pool(workers, len(jobs))
+    if pool is None:
+        results = [analyze_chunk(*job) for job in jobs]
+    else:
+        with pool:
+            results = list(pool.map(analyze_chunk, *zip(*jobs)))
+
+    pairs = []
+    for pair in config["exchange"]["pair_whitelist"]:
+        parts = [result[pair] for result in results if pair in result]
+        if parts:
+            data = concat_arrays(parts)
+            pairs.append(data._replace(**exchange_precision(exchange, pair)))
+    if not pairs:
+        raise ValueError("No data left after adjusting for startup candles.")
+
+    return simulate(pairs, ExitModel.from_strategy(strategy), float(config["stake_amount"]),
+                    float(config["fee"]), int(config.get("max_open_trades", -1)))
+
+
+def walk_forward_windows(timerange: TimeRange, train_days: float, test_days: float
+                         ) -> List[Tuple[Optional[TimeRange], TimeRange]]:
+    """(train, test) timeranges; test windows tile ``timerange`` after the first train window."""
+    if timerange.starttype != "date" or timerange.stoptype != "date":
+        raise ValueError("Walk-forward needs a timerange with a start and an end")
+    train, test = int(train_days * 86400), int(test_days * 86400)
+    windows = []
+    begin = timerange.startts + train
+    while begin < timerange.stopts:
+        end = begin + test
+        # Timerange stops are inclusive: stop just short of the next window
+        train_range = TimeRange("date", "date", begin - train, begin - 1) if train else None
+        stop = timerange.stopts if end >= timerange.stopts else end - 1
+        windows.append((train_range, TimeRange("date", "date", begin, stop)))
+        begin = end
+    return windows
+
+
+def _walk_window(config: dict, train: Optional[TimeRange], test: TimeRange,
+                 grid: Optional[Dict[str, List[Any]]]) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    if grid and train is not None:
+        table = sweep({**config, "timerange": _timerange_arg(train)}, grid, workers=1)
+        # Por columna: una fila mezcla int y float y pandas la pasa entera a float64
+        params = {name: table[name].iloc[0] for name in grid}
+        params = {name: value.item() if isinstance(value, np.generic) else value
+                  for name, value in params.items()}
+    trades, rejected = run_chunked({**config, "timerange": _timerange_arg(test)}, chunks=1,
+                                   workers=1, params=params)
+    return {
+        "test_start": test.startdt, "test_end": test.stopdt, **params,
+        **summarize(trades), "rejected": rejected,
+    }
+
+
+def walk_forward(config: dict, train_days: float, test_days: float,
+                 grid: Optional[Dict[str, List[Any]]] = None,
+                 workers: Optional[int] = None) -> DataFrame:
+    """One row per test window: the parameters picked on its train window and the results."""
+    windows = walk_forward_windows(TimeRange.parse_timerange(config.get("timerange")),
+                                   train_days, test_days)
+    if not windows:
+        raise ValueError("Timerange too short for one train + test window")
+    jobs = [(config, train, test, grid) for train, test in windows]
+    pool = _pool(workers, len(jobs))
+    if pool is None:
+        rows = [_walk_window(*job) for job in jobs]
+    else:
+        with pool:
+            rows = list(pool.map(_walk_window, *zip(*jobs)))
+    return DataFrame(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Chunked / walk-forward fast backtests")
+    parser.add_argument("-c", "--config", default="user_data/config.json")
+    parser.add_argument("-s", "--strategy", default="MultiHorizonMomentum")
+    parser.add_argument("-p", "--pairs", nargs="+")
+    parser.add_argument("--timerange", required=True)
+    parser.add_argument("--timeframe")
+    parser.add_argument("--fee", type=float)
+    parser.add_argument("--max-open-trades", type=int)
+    parser.add_argument("--data-format", choices=["json", "jsongz", "feather", "parquet",
+                                                  DATA_FORMAT],
+                        help="Candle storage format (default: dataformat_ohlcv from the config)")
+    parser.add_argument("--chunks", type=int, help="Number of chunks (default: one per worker)")
+    parser.add_argument("--chunk-days", type=float, help="Chunk length in days")
+    parser.add_argument("--warmup", type=int,
+                        help="Candles loaded before each chunk after the first (default: 20 x "
+                             "the slowest EMA period; e.g. 400 for less work per chunk)")
+    parser.add_argument("-j", "--workers", type=int, help="Processes (default: all cores)")
+    parser.add_argument("--walk-forward", nargs=2, type=float, metavar=("TRAIN", "TEST"),
+                        help="Walk-forward windows, in days")
+    parser.add_argument("--grid", nargs="+", metavar="NAME=V1,V2",
+                        help="Walk-forward: variants to pick the best of on each train window")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cli = {"config": [args.config], "strategy": args.strategy, "timerange": args.timerange,
+           "timeframe": args.timeframe, "fee": args.fee, "pairs": args.pairs,
+           "max_open_trades": args.max_open_trades}
+    config = Configuration({k: v for k, v in cli.items() if v is not None},
+                           RunMode.BACKTEST).get_config()
+    if args.data_format:
+        config["dataformat_ohlcv"] = args.data_format
+    if config.get("fee") is None:
+        parser.error("--fee is required (or set 'fee' in the config)")
+    if args.grid and not args.walk_forward:
+        parser.error("--grid needs --walk-forward")
+
+    if args.walk_forward:
+        table = walk_forward(config, *args.walk_forward,
+                             grid=parse_grid(args.grid) if args.grid else None,
+                             workers=args.workers)
+        with pd.option_context("display.width", 200, "display.max_columns", 30):
+            print(table.to_string(float_format=lambda v: f"{v:.4f}"))
+        print(f"Total profit    : {table['profit_total_abs'].sum():.4f} "
+              f"{config['stake_currency']} over {int(table['trades'].sum())} trades")
+        return
+
+    chunks = args.chunks or (None if args.chunk_days else (args.workers or os.cpu_count()))
+    trades, rejected = run_chunked(config, chunks, args.chunk_days, args.warmup, args.workers)
+    print_report(trades, rejected, config["stake_currency"])
+
+
+if __name__ == "__main__":
+    main()
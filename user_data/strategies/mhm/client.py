@@ -0,0 +1,97 @@
+"""
+Backtest service client
+=======================
+
+Sends jobs to a running ``mhm.service`` over its unix socket and prints the
+report. Only the standard library is imported, so it starts in a few tens of
+milliseconds and also runs outside the container.
+
+Protocol: one JSON request per connection, one line; the service answers with
+JSON lines (``queued``, then ``done`` or ``error``)::
+
+    {"op": "backtest", "job": {"engine": "freqtrade", "strategy": "MultiHorizonMomentum",
+                               "pairs": ["BTC/USDT"], "timerange": "20241120-20241210",
+                               "fee": 0.0002, "timeframe": "1m"}}
+    {"op": "status"}
+    {"op": "shutdown"}
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.client backtest \\
+        -p BTC/USDT --timerange 20241120-20241210 --fee 0.0002 --timeframe 1m
+    PYTHONPATH=user_data/strategies python -m mhm.client status
+"""
+
+import argparse
+import json
+import socket
+import sys
+from typing import Iterator, List, Optional
+
+SOCKET_PATH = "user_data/cache/backtest.sock"
+
+ENGINES = ("freqtrade", "fast")
+
+
+def request(message: dict, path: str = SOCKET_PATH) -> Iterator[dict]:
+    """Send ``message`` to the service at ``path``; yields its answers."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        with sock.makefile("rb") as answers:
+            for line in answers:
+                yield json.loads(line)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backtest service client")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backtest = commands.add_parser("backtest", help="Queue a backtest and print its report")
+    backtest.add_argument("-c", "--config", nargs="+",
+                          help="Config file(s), as seen by the service (default: its own)")
+    backtest.add_argument("-s", "--strategy", default="MultiHorizonMomentum")
+    backtest.add_argument("-p", "--pairs", nargs="+")
+    backtest.add_argument("--timerange")
+    backtest.add_argument("--timeframe")
+    backtest.add_argument("--fee", type=float)
+    backtest.add_argument("--max-open-trades", type=int)
+    backtest.add_argument("--engine", choices=ENGINES, default="freqtrade",
+                          help="freqtrade backtesting, or the fast backtester (mhm.backtest)")
+    backtest.add_argument("--exchange-precision", action="store_true",
+                          help="fast engine: round rates / amounts like freqtrade")
+
+    commands.add_parser("status", help="Queue, resident candles and strategies")
+    commands.add_parser("shutdown", help="Stop the service once the queued jobs are done")
+    args = parser.parse_args(argv)
+
+    if args.command == "backtest":
+        job = {"engine": args.engine, "config": args.config, "strategy": args.strategy,
+               "pairs": args.pairs, "timerange": args.timerange, "timeframe": args.timeframe,
+               "fee": args.fee, "max_open_trades": args.max_open_trades,
+               "exchange_precision": args.exchange_precision}
+        message = {"op": "backtest", "job": {k: v for k, v in job.items() if v is not None}}
+    else:
+        message = {"op": args.command}
+
+    try:
+        for answer in request(message, args.socket):
+            event = answer.get("event")
+            if event == "queued" and answer["position"]:
+                print(f"Queued behind {answer['position']} job(s)", file=sys.stderr, flush=True)
+            elif event == "done":
+                print(answer["output"], end="")
+                for warning in answer.get("warnings", []):
+                    print(f"Warning: {warning}", file=sys.stderr)
+                print(f"Done in {answer['seconds']:.2f} s", file=sys.stderr)
+            elif event == "error":
+                sys.exit(f"Backtest failed: {answer['error']}")
+            elif event != "queued":
+                print(json.dumps(answer, indent=2))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.exit(f"No backtest service listening on {args.socket} (start it with mhm.service)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Compact live dataframes
+=======================
+
+In dry/live freqtrade analyzes the whole candle window it holds for a pair
+(exchange candle limit + startup candles, ~1400 rows on Binance), and caches
+the analyzed dataframe with every column the strategy created, in float64.
+``CompactLiveFrames`` bounds that per pair:
+
+* Rows: only while the strategy carries its indicator state from one call to
+  the next (``live_rows_stateful``, e.g. the streaming indicators of
+  ``mhm.streaming``). Once a pair has been analyzed, only the trailing
+  ``startup_candle_count`` candles are analyzed; the first analysis of a pair,
+  and the first after a gap longer than the window, still get the full window,
+  so the state warms up on all available history and then carries it forward.
+  Per-pair caches sized after the analyzed frame (stream outputs, 15m merge,
+  ATR snapshot) shrink with it. Without such state the full window is kept:
+  indicators recomputed over fewer candles would give different values (the
+  long EMAs would be re-seeded on a shorter history).
+* Columns: the cached frame keeps the candles, the signal columns and
+  ``LIVE_FRAME_COLUMNS`` (by default every column name quoted in
+  ``populate_entry_trend`` / ``populate_exit_trend``); helpers such as
+  ``macdhist`` or the merged 15m candles are dropped.
+* Dtypes: kept indicator columns are stored as float32, except
+  ``LIVE_FRAME_EXACT_COLUMNS`` (read back by callbacks). Prices stay float64:
+  freqtrade checks the analyzed last close against the candle data bit for bit.
+"""
+
+import ast
+import inspect
+import logging
+import textwrap
+from typing import Callable, Dict, Iterable, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.enums import CandleType, RunMode
+from freqtrade.exceptions import StrategyError
+
+logger = logging.getLogger(__name__)
+
+CANDLE_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+SIGNAL_COLUMNS = ("enter_long", "exit_long", "enter_short", "exit_short", "enter_tag", "exit_tag")
+
+
+def referenced_columns(*methods: Callable) -> Set[str]:
+    """String literals used in ``methods`` - a superset of the column names they read."""
+    names: Set[str] = set()
+    for method in methods:
+        try:
+            tree = ast.parse(textwrap.dedent(inspect.getsource(method)))
+        except (OSError, TypeError, SyntaxError):
+            continue
+        names.update(node.value for node in ast.walk(tree)
+                     if isinstance(node, ast.Constant) and isinstance(node.value, str))
+    return names
+
+
+def compact_frame(dataframe: DataFrame, keep: Iterable[str],
+                  exact: Iterable[str] = ()) -> DataFrame:
+    """Candles, signals and ``keep`` columns only; float64 indicators as float32
+    unless listed in ``exact``."""
+    exact = set(exact)
+    keep = set(keep) | exact
+    columns = [col for col in dataframe.columns
+               if col in CANDLE_COLUMNS or col in SIGNAL_COLUMNS or col in keep]
+    compact = dataframe[columns]
+    downcast = {col: np.float32 for col in columns
+                if col not in CANDLE_COLUMNS and col not in exact
+                and compact[col].dtype == np.float64}
+    return compact.astype(downcast) if downcast else compact
+
+
+def live_window(dataframe: DataFrame, last_analyzed: Optional[pd.Timestamp],
+                window: int) -> DataFrame:
+    """
+    Trailing ``window`` candles of ``dataframe`` when they still reach back to
+    ``last_analyzed``; otherwise (first analysis, longer gap) the whole frame.
+    """
+    if last_analyzed is None or len(dataframe) <= window:
+        return dataframe
+    dates = dataframe["date"]
+    pos = int(dates.searchsorted(last_analyzed))
+    if pos >= len(dates) or dates.iat[pos] != last_analyzed or pos < len(dates) - window:
+        return dataframe
+    return dataframe.iloc[-window:].reset_index(drop=True)
+
+
+class CompactLiveFrames:
+    """
+    ``IStrategy`` mixin (list it before ``IStrategy``). Off unless
+    ``COMPACT_LIVE_FRAMES`` is set; never active in backtesting / hyperopt.
+    """
+
+    COMPACT_LIVE_FRAMES: bool = False
+    # Extra columns kept in the analyzed frame (None: names quoted in populate_*_trend)
+    LIVE_FRAME_COLUMNS: Optional[Sequence[str]] = None
+    # Kept columns that stay float64
+    LIVE_FRAME_EXACT_COLUMNS: Sequence[str] = ()
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        self._live_last_analyzed: Dict[str, pd.Timestamp] = {}
+        self._live_columns: Optional[Set[str]] = None
+
+    def compact_live(self) -> bool:
+        return (
+            self.COMPACT_LIVE_FRAMES and self.dp is not None
+            and self.dp.runmode in (RunMode.DRY_RUN, RunMode.LIVE)
+        )
+
+    def live_rows_stateful(self) -> bool:
+        """True while the indicators carry state across calls, so rows can be trimmed."""
+        return False
+
+    def live_frame(self, pair: str, dataframe: DataFrame) -> DataFrame:
+        """Candles of ``pair`` to analyze this loop (see ``live_window``)."""
+        if not self.live_rows_stateful():
+            return dataframe
+        return live_window(dataframe, self._live_last_analyzed.get(pair),
+                           max(self.startup_candle_count, 1))
+
+    def live_columns(self) -> Set[str]:
+        if self._live_columns is None:
+            if self.LIVE_FRAME_COLUMNS is not None:
+                self._live_columns = set(self.LIVE_FRAME_COLUMNS)
+            else:
+                self._live_columns = referenced_columns(type(self).populate_entry_trend,
+                                                        type(self).populate_exit_trend)
+        return self._live_columns
+
+    def analyze_pair(self, pair: str) -> None:
+        # Same as IStrategy.analyze_pair, on the trimmed window
+        if not self.compact_live():
+            return super().analyze_pair(pair)
+        dataframe = self.dp.ohlcv(
+            pair, self.timeframe, candle_type=self.config.get("candle_type_def", CandleType.SPOT)
+        )
+        if not isinstance(dataframe, DataFrame) or dataframe.empty:
+            logger.warning("Empty candle (OHLCV) data for pair %s", pair)
+            return
+        dataframe = self.live_frame(pair, dataframe)
+        try:
+            dataframe = self._analyze_ticker_internal(dataframe, {"pair": pair})
+        except StrategyError as error:
+            logger.warning(f"Unable to analyze candle (OHLCV) data for pair {pair}: {error}")
+            return
+        if dataframe.empty:
+            logger.warning("Empty dataframe for pair %s", pair)
+            return
+        self._live_last_analyzed[pair] = dataframe["date"].iat[-1]
+
+    def analyze_ticker(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        dataframe = super().analyze_ticker(dataframe, metadata)
+        if self.compact_live():
+            dataframe = compact_frame(dataframe, self.live_columns(),
+                                      self.LIVE_FRAME_EXACT_COLUMNS)
+        return dataframe
@@ -0,0 +1,566 @@
+"""
+Candle-close events
+===================
+
+With ``internals.process_throttle_secs: 5`` the bot loop wakes twelve times
+per 1m candle, while the entry signals only change when a candle closes and
+the exits only fire when the price crosses a level. ``CandleEvents`` listens
+to the exchange kline stream (Binance format) on its own asyncio loop, in a
+daemon thread, and wakes the bot loop:
+
+* when a candle closes - the loop then analyzes just the pairs whose candle
+  closed (``due``), right after the close instead of up to
+  ``process_throttle_secs`` later;
+* on a price update that crosses the take-profit, stop or trailing level of
+  an open trade (``ExitWatch``) - freqtrade's own exit checks then run on
+  that loop, with the rate it fetches itself.
+
+The wake-up replaces freqtrade's ``Worker._sleep`` with a wait on the event
+(``install_wakeup``), so ``process_throttle_secs`` becomes the fallback
+period for when the stream is down - raise it (e.g. to 60). Pairs the stream
+has not closed a candle for in two candle lengths are analyzed on every loop,
+as without events.
+
+``ReplayServer`` serves stored candles with the same protocol, for tests and
+for running the bot against history (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.events replay \\
+        --datadir user_data/data/binance -p BTC/USDT ETH/USDT --speed 60
+    PYTHONPATH=user_data/strategies python -m mhm.events watch \\
+        --url ws://127.0.0.1:8765 -p BTC/USDT ETH/USDT
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from pandas import DataFrame
+
+from freqtrade.exchange import timeframe_to_msecs
+
+from mhm.exits import ExitLevels
+
+logger = logging.getLogger(__name__)
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream"
+
+# Reconnect back-off in seconds: first delay, doubled up to the second
+RECONNECT_DELAY = (1.0, 30.0)
+
+
+class KlineEvent(NamedTuple):
+    pair: str
+    open_time: int      # ms since epoch
+    close: float        # last price while the candle is open
+    closed: bool
+
+
+def symbol_of(pair: str) -> str:
+    """Exchange symbol of a ccxt pair (``BTC/USDT`` -> ``BTCUSDT``)."""
+    return pair.split(":")[0].replace("/", "").upper()
+
+
+def stream_name(pair: str, timeframe: str) -> str:
+    return f"{symbol_of(pair).lower()}@kline_{timeframe}"
+
+
+def parse_kline(message: dict, pairs: Dict[str, str]) -> Optional[KlineEvent]:
+    """
+    Kline event of a stream message, raw or wrapped in a combined-stream envelope.
+
+    :param pairs: Subscribed pairs by exchange symbol
+    """
+    data = message.get("data", message)
+    if not isinstance(data, dict) or data.get("e") != "kline":
+        return None
+    kline = data["k"]
+    pair = pairs.get(kline["s"])
+    if pair is None:
+        return None
+    return KlineEvent(pair, int(kline["t"]), float(kline["c"]), bool(kline["x"]))
+
+
+def kline_message(pair: str, timeframe: str, open_time: int, open_: float, high: float,
+                  low: float, close: float, volume: float, closed: bool) -> str:
+    """Combined-stream kline message, as sent by Binance."""
+    symbol = symbol_of(pair)
+    return json.dumps({
+        "stream": stream_name(pair, timeframe),
+        "data": {
+            "e": "kline", "E": int(time.time() * 1000), "s": symbol,
+            "k": {
+                "t": open_time, "T": open_time + timeframe_to_msecs(timeframe) - 1,
+                "s": symbol, "i": timeframe, "o": repr(open_), "h": repr(high),
+                "l": repr(low), "c": repr(close), "v": repr(volume), "x": closed,
+            },
+        },
+    })
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Open-trade exit levels
+# ────────────────────────────────────────────────────────────────────────────────
+
+class _Watched:
+    __slots__ = ("open_rate", "high", "levels", "woke")
+
+    def __init__(self, open_rate: float, high: float, levels: ExitLevels) -> None:
+        self.open_rate = open_rate
+        self.high = high
+        self.levels = levels
+        self.woke = float("-inf")
+
+
+class ExitWatch:
+    """
+    Exit levels of the open trades (``ExitLevelCache.levels``), checked against
+    streamed prices. Updated from the bot thread, read from the stream thread.
+
+    :param min_interval: Seconds between two wake-ups for the same trade (a level
+        stays crossed until freqtrade has placed the exit)
+    :param stoploss: Also wake up on the stop level; only worth it with
+        ``use_custom_stoploss``, freqtrade does nothing with the wake-up otherwise
+    """
+
+    def __init__(self, min_interval: float = 1.0, stoploss: bool = False) -> None:
+        self.min_interval = min_interval
+        self.stoploss = stoploss
+        self._lock = threading.Lock()
+        self._trades: Dict[str, Dict[int, _Watched]] = {}
+
+    def update(self, pair: str, trade_id: int, open_rate: float, max_rate: Optional[float],
+               levels: ExitLevels) -> None:
+        high = max(open_rate, max_rate or open_rate)
+        with self._lock:
+            trades = self._trades.setdefault(pair, {})
+            watched = trades.get(trade_id)
+            if watched is None:
+                trades[trade_id] = _Watched(open_rate, high, levels)
+            else:
+                watched.high = max(watched.high, high)
+                watched.levels = levels
+
+    def drop(self, trade_id: int) -> None:
+        with self._lock:
+            for trades in self._trades.values():
+                trades.pop(trade_id, None)
+
+    def hit(self, pair: str, price: float) -> bool:
+        """
+        True when ``price`` crosses a level of an open ``pair`` trade that
+        freqtrade acts on (``custom_exit``, and ``custom_stoploss`` if enabled).
+        """
+        now = time.monotonic()
+        hit = False
+        with self._lock:
+            for watched in self._trades.get(pair, {}).values():
+                watched.high = max(watched.high, price)
+                levels = watched.levels
+                if (price >= levels.take_profit
+                        or watched.high >= levels.trail > price
+                        or self.stoploss and watched.open_rate - price >= levels.stop_distance):
+                    if now - watched.woke >= self.min_interval:
+                        watched.woke = now
+                        hit = True
+        return hit
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Stream listener
+# ────────────────────────────────────────────────────────────────────────────────
+
+class StreamListener:
+    """
+    Client of an exchange's combined websocket streams (Binance format), one
+    stream per pair, on its own asyncio loop in a daemon thread; reconnects with
+    back-off until ``stop``. Subclasses name the stream of a pair (``stream``)
+    and handle its messages (``_handle``, on the stream thread).
+
+    :param url: Websocket endpoint (Binance combined streams, or a replay server)
+    """
+
+    label = "Stream"
+    thread_name = "mhm-stream"
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._lock = threading.Lock()
+        self._pairs: Dict[str, str] = {}            # symbol -> pair
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._ws = None
+        self.connected = False
+
+    def stream(self, pair: str) -> str:
+        raise NotImplementedError
+
+    # ------------------------------------------------------------------
+    # Bot thread
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._run()),
+                                            name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._shutdown)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def watch(self, pairs: Iterable[str]) -> None:
+        """Follow exactly ``pairs`` (the current whitelist)."""
+        wanted = {symbol_of(pair): pair for pair in pairs}
+        with self._lock:
+            if wanted == self._pairs:
+                return
+            added = [pair for symbol, pair in wanted.items() if symbol not in self._pairs]
+            removed = [pair for symbol, pair in self._pairs.items() if symbol not in wanted]
+            self._pairs = wanted
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(self._resubscribe(added, removed)))
+
+    # ------------------------------------------------------------------
+    # Stream thread
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import WebSocketException
+
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        delay = RECONNECT_DELAY[0]
+        while not self._stopped.is_set():
+            try:
+                async with connect(self.url, ping_interval=20, max_queue=None) as ws:
+                    self._ws = ws
+                    await self._subscribe(ws, "SUBSCRIBE", list(self._pairs.values()))
+                    self.connected = True
+                    delay = RECONNECT_DELAY[0]
+                    logger.info("%s connected: %s", self.label, self.url)
+                    async for raw in ws:
+                        self._handle(raw)
+                    if not self._stopped.is_set():
+                        logger.warning("%s closed by %s", self.label, self.url)
+            except (OSError, WebSocketException, asyncio.TimeoutError) as exc:
+                logger.warning("%s %s: %s", self.label, self.url, exc)
+            finally:
+                self._ws = None
+                self.connected = False
+            if self._stopped.is_set():
+                break
+            try:
+                await asyncio.wait_for(self._stopped.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, RECONNECT_DELAY[1])
+
+    def _shutdown(self) -> None:
+        self._stopped.set()
+        if self._ws is not None:
+            asyncio.ensure_future(self._ws.close())
+
+    async def _subscribe(self, ws, method: str, pairs: List[str]) -> None:
+        if pairs:
+            await ws.send(json.dumps({
+                "method": method, "id": int(time.time() * 1000),
+                "params": [self.stream(pair) for pair in pairs],
+            }))
+
+    async def _resubscribe(self, added: List[str], removed: List[str]) -> None:
+        ws = self._ws
+        if ws is None:
+            return      # subscribed on (re)connect
+        await self._subscribe(ws, "UNSUBSCRIBE", removed)
+        await self._subscribe(ws, "SUBSCRIBE", added)
+
+    def _handle(self, raw) -> None:
+        raise NotImplementedError
+
+
+class CandleEvents(StreamListener):
+    """
+    Kline stream listener.
+
+    :param url: Websocket endpoint (Binance combined streams, or ``ReplayServer``)
+    :param timeframe: Candle timeframe to subscribe to
+    :param on_price: Called with (pair, price) on every kline update; the bot loop
+        is woken when it returns True
+    :param on_close: Called with each closed-candle ``KlineEvent``
+    """
+
+    label = "Candle stream"
+    thread_name = "mhm-candle-events"
+
+    def __init__(self, url: str, timeframe: str,
+                 on_price: Optional[Callable[[str, float], bool]] = None,
+                 on_close: Optional[Callable[[KlineEvent], None]] = None) -> None:
+        super().__init__(url)
+        self.timeframe = timeframe
+        self.on_price = on_price
+        self.on_close = on_close
+        self._candle_secs = timeframe_to_msecs(timeframe) / 1000
+        self._wake = threading.Event()
+        self._closed: Dict[str, int] = {}           # pair -> open time of its last closed candle
+        self._arrived: Dict[str, float] = {}        # pair -> monotonic time of that close
+        self._pending: Set[str] = set()
+
+    def stream(self, pair: str) -> str:
+        return stream_name(pair, self.timeframe)
+
+    # ------------------------------------------------------------------
+    # Bot thread
+    # ------------------------------------------------------------------
+    def stop(self) -> None:
+        super().stop()
+        self._wake.set()
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep up to ``seconds``, less when an event comes in (``Worker._sleep``)."""
+        if self._wake.wait(seconds):
+            self._wake.clear()
+
+    def due(self, pairs: Iterable[str]) -> List[str]:
+        """
+        Pairs of ``pairs`` to analyze now: those with a candle closed since the last
+        call, and those the stream has not closed a candle for in two candle lengths.
+        """
+        stale = time.monotonic() - 2 * self._candle_secs
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            if not self.connected:
+                return list(pairs)
+            return [pair for pair in pairs
+                    if pair in pending or self._arrived.get(pair, stale) <= stale]
+
+    def defer(self, pairs: Iterable[str], delay: float = 0.5) -> None:
+        """
+        Give ``pairs`` back to ``due`` and wake the loop again after ``delay`` -
+        for closes the bot's own candle refresh has not caught up with yet. Given up
+        one candle length after the close (the pair is then stale).
+        """
+        limit = time.monotonic() - self._candle_secs
+        with self._lock:
+            retry = {pair for pair in pairs if self._arrived.get(pair, limit) > limit}
+            self._pending |= retry
+        if retry and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.call_later, delay, self._wake.set)
+
+    def last_closed(self, pair: str) -> Optional[int]:
+        """Open time (ms) of the last closed candle streamed for ``pair``."""
+        return self._closed.get(pair)
+
+    # ------------------------------------------------------------------
+    # Stream thread
+    # ------------------------------------------------------------------
+    def _handle(self, raw) -> None:
+        try:
+            event = parse_kline(json.loads(raw), self._pairs)
+        except (ValueError, KeyError, TypeError):
+            return
+        if event is None:
+            return
+        if self.on_price is not None and self.on_price(event.pair, event.close):
+            self._wake.set()
+        if not event.closed:
+            return
+        with self._lock:
+            if event.open_time <= self._closed.get(event.pair, -1):
+                return
+            self._closed[event.pair] = event.open_time
+            self._arrived[event.pair] = time.monotonic()
+            self._pending.add(event.pair)
+        self._wake.set()
+        if self.on_close is not None:
+            self.on_close(event)
+
+
+def install_wakeup(events: CandleEvents) -> Callable[[], None]:
+    """Let ``events`` cut the bot loop's throttle sleep short; returns the undo."""
+    from freqtrade.worker import Worker
+
+    original = Worker.__dict__["_sleep"]
+    Worker._sleep = staticmethod(events.sleep)
+
+    def restore() -> None:
+        Worker._sleep = original
+    return restore
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Replay server
+# ────────────────────────────────────────────────────────────────────────────────
+
+class ReplayServer:
+    """
+    Serves stored candles as a Binance kline stream.
+
+    Each connection replays from the first candle, for the streams it subscribed
+    to: ``ticks`` updates of the open candle along open -> low / high -> close,
+    then the closed candle. A candle lasts ``timeframe / speed`` seconds.
+
+    :param candles: OHLCV dataframe per pair
+    """
+
+    def __init__(self, candles: Dict[str, DataFrame], timeframe: str, speed: float = 60.0,
+                 ticks: int = 4, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self.timeframe = timeframe
+        self.speed = speed
+        self.ticks = ticks
+        self.host = host
+        self.port = port
+        self._timeline: Dict[int, List[tuple]] = {}
+        for pair, frame in candles.items():
+            dates = frame["date"].map(lambda date: int(date.timestamp() * 1000))
+            for row in zip(dates, frame["open"], frame["high"], frame["low"],
+                           frame["close"], frame["volume"]):
+                self._timeline.setdefault(int(row[0]), []).append((pair,) + tuple(map(float, row[1:])))
+        self._server = None
+
+    async def start(self) -> None:
+        from websockets.asyncio.server import serve
+        self._server = await serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]     # port 0: picked by the OS
+        logger.info("Replaying %d candles on ws://%s:%d", len(self._timeline), self.host,
+                    self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handler(self, ws) -> None:
+        streams: Set[str] = set()
+        subscribed = asyncio.Event()
+
+        async def read() -> None:
+            async for raw in ws:
+                try:
+                    request = json.loads(raw)
+                    params = set(request.get("params") or [])
+                except (ValueError, AttributeError, TypeError):
+                    continue
+                if request.get("method") == "SUBSCRIBE":
+                    streams.update(params)
+                    subscribed.set()
+                elif request.get("method") == "UNSUBSCRIBE":
+                    streams.difference_update(params)
+                await ws.send(json.dumps({"result": None, "id": request.get("id")}))
+
+        reader = asyncio.ensure_future(read())
+        try:
+            await subscribed.wait()
+            step = timeframe_to_msecs(self.timeframe) / 1000 / self.speed / (self.ticks + 1)
+            for open_time in sorted(self._timeline):
+                rows = self._timeline[open_time]
+                for tick in range(self.ticks + 1):
+                    for pair, open_, high, low, close, volume in rows:
+                        if self.stream(pair) in streams:
+                            await ws.send(self._tick(pair, open_time, open_, high, low, close,
+                                                     volume, tick))
+                    await asyncio.sleep(step)
+            await ws.close()
+        finally:
+            reader.cancel()
+
+    def stream(self, pair: str) -> str:
+        return stream_name(pair, self.timeframe)
+
+    def _tick(self, pair: str, open_time: int, open_: float, high: float, low: float,
+              close: float, volume: float, tick: int) -> str:
+        if tick >= self.ticks:
+            return kline_message(pair, self.timeframe, open_time, open_, high, low, close,
+                                 volume, True)
+        price, seen_high, seen_low = self._price(open_, high, low, close, tick)
+        return kline_message(pair, self.timeframe, open_time, open_, seen_high, seen_low, price,
+                             volume * tick / self.ticks, False)
+
+    def _price(self, open_: float, high: float, low: float, close: float, tick: int
+               ) -> Tuple[float, float, float]:
+        """Price at update ``tick`` of a candle, with the high and low seen up to it."""
+        if tick >= self.ticks:
+            return close, high, low
+        # Velas alcistas: primero el mínimo, luego el máximo (y al revés)
+        path = (open_, low, high, close) if close >= open_ else (open_, high, low, close)
+        price = path[min(tick * len(path) // self.ticks, len(path) - 1)]
+        seen = path[:path.index(price) + 1]
+        return price, max(seen), min(seen)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Candle-close events")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser("replay", help="Serve stored candles as a kline stream")
+    replay.add_argument("--datadir", default="user_data/data/binance")
+    replay.add_argument("--data-format", default="json")
+    replay.add_argument("-p", "--pairs", nargs="+", required=True)
+    replay.add_argument("--timeframe", default="1m")
+    replay.add_argument("--timerange")
+    replay.add_argument("--speed", type=float, default=60.0,
+                        help="Replay speed-up (60: one 1m candle per second)")
+    replay.add_argument("--ticks", type=int, default=4, help="Open-candle updates per candle")
+    replay.add_argument("--host", default="127.0.0.1")
+    replay.add_argument("--port", type=int, default=8765)
+
+    watch = commands.add_parser("watch", help="Print the closed candles of a kline stream")
+    watch.add_argument("--url", default=BINANCE_STREAM_URL)
+    watch.add_argument("-p", "--pairs", nargs="+", required=True)
+    watch.add_argument("--timeframe", default="1m")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "replay":
+        from freqtrade.configuration import TimeRange
+        from mhm.ohlcv_store import load_data
+
+        candles = load_data(Path(args.datadir), args.timeframe, args.pairs,
+                            data_format=args.data_format,
+                            timerange=TimeRange.parse_timerange(args.timerange))
+        server = ReplayServer(candles, args.timeframe, args.speed, args.ticks, args.host,
+                              args.port)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    candle_ms = timeframe_to_msecs(args.timeframe)
+
+    def on_close(event: KlineEvent) -> None:
+        lag = time.time() * 1000 - event.open_time - candle_ms
+        print(f"{event.pair:<16} {event.open_time}  close={event.close:<12g} +{lag:.0f} ms",
+              flush=True)
+
+    events = CandleEvents(args.url, args.timeframe, on_close=on_close)
+    events.watch(args.pairs)
+    events.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        events.stop()
+
+
+if __name__ == "__main__":
+    main()
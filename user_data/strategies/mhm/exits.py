@@ -0,0 +1,147 @@
+"""
+ATR exit-level cache
+====================
+
+``custom_exit`` and ``custom_stoploss`` run for every open trade on every
+candle (every loop in dry/live). Both only need the ATR of the last analyzed
+candle and the TP / SL / trailing levels derived from it, so instead of
+slicing the analyzed dataframe in each call this module keeps:
+
+* a per-pair ATR snapshot (dates + values), refreshed once per analysis from
+  ``populate_indicators``;
+* per-pair, per-trade exit levels, built on first use for the current candle
+  and shared by both callbacks until the next candle.
+
+The callbacks only see closed candles: at ``current_time`` that is the last
+candle whose close (date + timeframe) is not after ``current_time``, which is
+where freqtrade's analyzed dataframe ends in both backtesting and dry/live.
+
+With ``fixed_at_entry`` the levels are instead computed once per trade from
+the ATR of its signal candle (the last closed candle when it was opened), and
+kept until the trade exits.
+
+The multipliers may change between calls (hyperopt parameters, see
+``set_multipliers``); levels built with other multipliers are dropped.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+from pandas import DataFrame
+
+
+class ExitLevels(NamedTuple):
+    """Exit triggers of one trade for one candle."""
+    atr: float
+    take_profit: float      # exit when current_rate >= take_profit
+    trail: float            # exit when max_rate reached it and current_rate fell back below
+    stop_distance: float    # exit when open_rate - current_rate >= stop_distance
+
+
+class _AtrSnapshot:
+    __slots__ = ("dates", "atr", "index", "levels")
+
+    def __init__(self, dates: np.ndarray, atr: np.ndarray) -> None:
+        self.dates = dates
+        self.atr = atr
+        self.index = -1                               # candle the levels below belong to
+        self.levels: Dict[int, ExitLevels] = {}
+
+
+class ExitLevelCache:
+    """
+    :param tp_mult: Take-profit distance in ATRs above the entry
+    :param sl_mult: Stop distance in ATRs below the entry
+    :param trail_mult: Trailing level in ATRs above the entry
+    :param timeframe_minutes: Candle length of the snapshotted dataframes
+    :param fixed_at_entry: Freeze each trade's levels at the ATR of its signal candle
+    """
+
+    def __init__(self, tp_mult: float, sl_mult: float, trail_mult: float,
+                 timeframe_minutes: int, fixed_at_entry: bool = False) -> None:
+        self.tp_mult = tp_mult
+        self.sl_mult = sl_mult
+        self.trail_mult = trail_mult
+        self.fixed_at_entry = fixed_at_entry
+        self._candle = timedelta(minutes=timeframe_minutes)
+        self._pairs: Dict[str, _AtrSnapshot] = {}
+        self._fixed: Dict[int, ExitLevels] = {}
+
+    def update(self, pair: str, dataframe: DataFrame, column: str = "atr100") -> None:
+        """Snapshot the ATR column of a freshly analyzed dataframe."""
+        # Same unit as the lookups in _index: a mixed-unit searchsorted converts
+        # the whole date array on every call
+        self._pairs[pair] = _AtrSnapshot(
+            dataframe["date"].to_numpy(dtype="datetime64[ns]"),
+            dataframe[column].to_numpy(dtype=np.float64),
+        )
+
+    def atr(self, pair: str, current_time: datetime) -> Optional[float]:
+        """ATR of the last closed candle at ``current_time`` (None without data)."""
+        snapshot = self._pairs.get(pair)
+        if snapshot is None:
+            return None
+        idx = self._index(snapshot, current_time)
+        return None if idx < 0 else float(snapshot.atr[idx])
+
+    def levels(self, pair: str, trade_id: int, open_rate: float, open_time: datetime,
+               current_time: datetime) -> Optional[ExitLevels]:
+        """
+        Exit levels of a trade at ``current_time``. In ``fixed_at_entry`` mode
+        they come from the last closed candle at ``open_time``. Returns
+        None when there is no analyzed candle yet or the ATR is zero (callbacks
+        keep their defaults).
+        """
+        if self.fixed_at_entry:
+            levels = self._fixed.get(trade_id)
+            if levels is None:
+                atr = self.atr(pair, open_time)
+                if atr is None:
+                    return None
+                levels = self._fixed[trade_id] = self._build(open_rate, atr)
+            return levels if levels.atr != 0 else None
+
+        snapshot = self._pairs.get(pair)
+        if snapshot is None:
+            return None
+        idx = self._index(snapshot, current_time)
+        if idx < 0:
+            return None
+        if idx != snapshot.index:
+            snapshot.index = idx
+            snapshot.levels = {}
+        levels = snapshot.levels.get(trade_id)
+        if levels is None:
+            levels = snapshot.levels[trade_id] = self._build(open_rate, float(snapshot.atr[idx]))
+        return levels if levels.atr != 0 else None
+
+    def set_multipliers(self, tp_mult: float, sl_mult: float, trail_mult: float) -> None:
+        """Use other multipliers from now on (no-op when unchanged)."""
+        if (tp_mult, sl_mult, trail_mult) == (self.tp_mult, self.sl_mult, self.trail_mult):
+            return
+        self.tp_mult, self.sl_mult, self.trail_mult = tp_mult, sl_mult, trail_mult
+        self._fixed.clear()
+        for snapshot in self._pairs.values():
+            snapshot.index = -1
+            snapshot.levels = {}
+
+    def drop_trade(self, trade_id: int) -> None:
+        self._fixed.pop(trade_id, None)
+
+    def _build(self, open_rate: float, atr: float) -> ExitLevels:
+        return ExitLevels(
+            atr=atr,
+            take_profit=open_rate + self.tp_mult * atr,
+            trail=open_rate + self.trail_mult * atr,
+            stop_distance=self.sl_mult * atr,
+        )
+
+    def _index(self, snapshot: _AtrSnapshot, current_time: datetime) -> int:
+        """Last candle closed at ``current_time`` (-1 if none)."""
+        if len(snapshot.dates) == 0:
+            return -1
+        when = np.datetime64((current_time - self._candle).replace(tzinfo=None), "ns")
+        if when >= snapshot.dates[-1]:
+            return len(snapshot.dates) - 1
+        return int(np.searchsorted(snapshot.dates, when, side="right")) - 1
@@ -0,0 +1,191 @@
+"""
+On-disk indicator cache
+=======================
+
+Backtests, hyperopt and the fast backtester recompute the same indicator
+columns from the same candles on every run; only the entry thresholds change.
+``FeatureCache`` stores the computed columns per pair / timeframe in
+``user_data/cache/features`` and hands them back when the candles match.
+
+* An entry is keyed by pair, timeframe, first candle date and a hash of the
+  indicator code and parameters (``params_hash``). The first candle is part of
+  the key because recursive indicators (EMA, ATR, RSI) depend on where the
+  series starts. The entry keeps the candles it was computed from; they are
+  compared with the requested ones, so changed candles are never served stale
+  columns.
+* A run that ends earlier takes a prefix of the entry (indicators only look
+  back). A run with appended candles recomputes just the new candles plus a
+  ``warmup`` window before them: recursive indicators computed from a later
+  start converge to the full-history values bit for bit, and the extension is
+  only kept if the recomputed warm-up rows reproduce the cached ones exactly -
+  otherwise the whole range is recomputed.
+* Files are evicted least-recently-used (file mtime) once the directory
+  grows past ``max_bytes``.
+"""
+
+import hashlib
+import inspect
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import talib
+
+logger = logging.getLogger(__name__)
+
+_CANDLES = ("open", "high", "low", "close", "volume")
+
+# Warm-up candles per period of the slowest EMA: after 20 x n candles an EMA(n) started
+# later is within (1 - 2 / (n + 1)) ** (20 * n) < 1e-17 of the full-history one
+EMA_WARMUP_FACTOR = 20
+
+
+def params_hash(compute: Callable, columns: Sequence[str], **params) -> str:
+    """Hash of the indicator code, its output columns and any extra parameters."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(inspect.getsource(compute).encode())
+    digest.update(repr((list(columns), sorted(params.items()), talib.__version__)).encode())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    One ``.npy`` file per entry: a float64 matrix with one row per series -
+    the candle dates (int64 bits), the OHLCV candles, then the indicator
+    columns - loaded memory-mapped. Inputs are compared bit for bit.
+
+    :param directory: Cache directory (created on first store)
+    :param max_bytes: Size bound of the directory; least recently used entries go first
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.extends = 0
+        self.misses = 0
+
+    def populate(self, dataframe: DataFrame, pair: str, timeframe: str,
+                 compute: Callable[[DataFrame], DataFrame], columns: Sequence[str],
+                 warmup: int, **params) -> DataFrame:
+        """
+        Add ``columns`` to ``dataframe`` - from the cache where possible,
+        otherwise via ``compute`` (which adds them to the candle frame it gets).
+        ``params`` are extra keyword arguments of ``compute`` (part of the cache key).
+        """
+        columns = list(columns)
+        if dataframe.empty:
+            return compute(dataframe, **params)
+        inputs = _inputs(dataframe)
+        path = self._path(pair, timeframe, int(inputs[0, 0].view(np.int64)),
+                          params_hash(compute, columns, **params))
+
+        values = None
+        entry = self._load(path, len(columns))
+        if entry is not None:
+            values = self._reuse(entry, inputs, dataframe, compute, columns, warmup, params)
+        if values is None:
+            self.misses += 1
+            values = _compute(dataframe, compute, columns, params)
+        if entry is not None and np.shares_memory(values, entry):
+            os.utime(path)     # served from the entry - only mark it as recently used
+        else:
+            self._store(path, np.concatenate((inputs, values)))
+
+        dataframe = dataframe.drop(columns=[col for col in columns if col in dataframe.columns])
+        return pd.concat([dataframe, DataFrame(dict(zip(columns, values)), index=dataframe.index,
+                                               copy=False)], axis=1)
+
+    # ------------------------------------------------------------------
+    # Reuse / extend
+    # ------------------------------------------------------------------
+    def _reuse(self, entry: np.ndarray, inputs: np.ndarray, dataframe: DataFrame,
+               compute: Callable, columns: List[str], warmup: int,
+               params: Dict) -> Optional[np.ndarray]:
+        cached, rows = entry.shape[1], min(entry.shape[1], inputs.shape[1])
+        if not _same(entry[:_INPUTS, :rows], inputs[:, :rows]):
+            return None
+        if inputs.shape[1] <= cached:
+            self.hits += 1
+            return entry[_INPUTS:, :rows]
+
+        start = max(0, cached - warmup)
+        tail = _compute(dataframe.iloc[start:].reset_index(drop=True), compute, columns, params)
+        check = max(1, (cached - start) // 10)
+        if start > 0 and not _same(tail[:, cached - start - check:cached - start],
+                                   entry[_INPUTS:, cached - check:]):
+            return None
+        self.extends += 1
+        return np.concatenate((entry[_INPUTS:], tail[:, cached - start:]), axis=1)
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+    def _path(self, pair: str, timeframe: str, first_ms: int, key: str) -> Path:
+        pair_s = pair.replace("/", "_").replace(":", "_")
+        return self.directory / f"{pair_s}-{timeframe}-{first_ms}-{key}.npy"
+
+    @staticmethod
+    def _load(path: Path, n_columns: int) -> Optional[np.ndarray]:
+        try:
+            entry = np.load(path, mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError) as exc:
+            if path.exists():
+                logger.warning("Ignoring unreadable feature cache %s: %s", path.name, exc)
+            return None
+        if entry.ndim != 2 or entry.shape[0] != _INPUTS + n_columns or entry.dtype != np.float64:
+            return None
+        return entry
+
+    def _store(self, path: Path, matrix: np.ndarray) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            np.save(fh, matrix, allow_pickle=False)
+        os.replace(tmp, path)
+        self._evict(keep=path)
+
+    def _evict(self, keep: Path) -> None:
+        files = []
+        for entry in self.directory.glob("*.npy"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:     # evicted meanwhile by another process of the pool
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in files)
+        for _, size, entry in sorted(files, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            entry.unlink(missing_ok=True)
+            total -= size
+
+
+# date + OHLCV rows at the top of every entry
+_INPUTS = 1 + len(_CANDLES)
+
+
+def _inputs(dataframe: DataFrame) -> np.ndarray:
+    inputs = np.empty((_INPUTS, len(dataframe)), dtype=np.float64)
+    inputs[0] = dataframe["date"].dt.as_unit("ms").astype("int64").to_numpy().view(np.float64)
+    for row, col in enumerate(_CANDLES, start=1):
+        inputs[row] = dataframe[col].to_numpy(dtype=np.float64)
+    return inputs
+
+
+def _same(left: np.ndarray, right: np.ndarray) -> bool:
+    """Bitwise equality (NaN == NaN)."""
+    return np.array_equal(left.view(np.int64), right.view(np.int64))
+
+
+def _compute(dataframe: DataFrame, compute: Callable[[DataFrame], DataFrame],
+             columns: List[str], params: Dict) -> np.ndarray:
+    frame = compute(dataframe.loc[:, ["date", *_CANDLES]].copy(), **params)
+    return np.stack([frame[col].to_numpy(dtype=np.float64) for col in columns])
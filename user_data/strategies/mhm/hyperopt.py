@@ -0,0 +1,235 @@
+"""
+Fast hyperopt
+=============
+
+Random search over the hyperopt parameters of ``MultiHorizonMomentum``
+(``ENTRY_*``, ``EMA_*_PERIOD`` in space ``buy``, ``ATR_*_MULT`` in ``sell``)
+on the fast backtester. ``freqtrade hyperopt`` runs ``populate_entry_trend``
+on a copy of every pair's dataframe and its candle loop on every epoch; here
+everything that does not depend on the parameters is built once:
+
+* the indicators, with one column per candidate EMA period and volume window
+  (``mhm.signals.indicator_bank``, a 2-D block per pair);
+* the simulation arrays of each pair (candles, ATR, tick sizes).
+
+An epoch sets the parameter values, evaluates the entry mask on the columns
+they select (``entry_conditions``), takes its entry candles and simulates the
+exits (``mhm.backtest.simulate``). Epochs are drawn uniformly from each
+parameter's values with a fixed seed, without repeats, and spread over a
+process pool like ``mhm.sweep``. ``--export-params`` writes the best epoch to
+the strategy's parameter file, which freqtrade loads like a hyperopt result.
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.hyperopt -c user_data/config.json \\
+        -p BTC/USDT ETH/USDT --timerange 20241120-20241210 --fee 0.0002 --timeframe 1m \\
+        --epochs 500 --spaces buy sell
+"""
+
+import argparse
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.configuration import Configuration
+from freqtrade.enums import RunMode
+from freqtrade.optimize.hyperopt_tools import HyperoptTools
+from freqtrade.resolvers import StrategyResolver
+from freqtrade.strategy import IStrategy
+
+from mhm.backtest import (EXIT_ATTRIBUTES, ExitModel, PairArrays, candidates, check_supported,
+                          load_indicators, pair_arrays, set_strategy_value, simulate,
+                          simulated_rows, summarize)
+from mhm.ohlcv_store import DATA_FORMAT
+from mhm.signals import entries
+
+logger = logging.getLogger(__name__)
+
+SPACES = ("buy", "sell")
+
+# Per-process state, set by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def search_space(strategy: IStrategy, spaces: Sequence[str] = SPACES) -> Dict[str, List[Any]]:
+    """Values of every optimizable parameter in ``spaces``."""
+    return {name: candidates(param) for name, param in strategy.enumerate_parameters()
+            if param.optimize and param.space in spaces}
+
+
+def sample(space: Dict[str, List[Any]], epochs: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """``epochs`` distinct parameter sets (fewer when the space is smaller)."""
+    rng = np.random.default_rng(seed)
+    epochs = min(epochs, math.prod(len(values) for values in space.values()))
+    seen, todo = set(), []
+    while len(todo) < epochs:
+        params = {name: values[int(rng.integers(len(values)))] for name, values in space.items()}
+        key = tuple(params.values())
+        if key not in seen:
+            seen.add(key)
+            todo.append(params)
+    return todo
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Workers
+# ────────────────────────────────────────────────────────────────────────────────
+
+def _init_worker(config: dict, indicators: Dict[str, DataFrame],
+                 arrays: Dict[str, Tuple[PairArrays, Optional[np.ndarray]]]) -> None:
+    strategy = StrategyResolver.load_strategy(config)
+    strategy.ft_load_hyper_params()
+    _WORKER.update(strategy=strategy, config=config, indicators=indicators, arrays=arrays)
+
+
+def _run_epoch(params: Dict[str, Any]) -> Dict[str, Any]:
+    strategy = _WORKER["strategy"]
+    config = _WORKER["config"]
+    for name, value in params.items():
+        set_strategy_value(strategy, name, value)
+
+    pairs = []
+    for pair, (data, signal_rows) in _WORKER["arrays"].items():
+        if signal_rows is not None:
+            data = _with_entries(strategy, data, _WORKER["indicators"][pair], signal_rows)
+        pairs.append(data)
+
+    trades, rejected = simulate(pairs, ExitModel.from_strategy(strategy),
+                                float(config["stake_amount"]), float(config["fee"]),
+                                int(config.get("max_open_trades", -1)))
+    return {**params, **summarize(trades), "rejected": rejected}
+
+
+def _with_entries(strategy: IStrategy, data: PairArrays, indicators: DataFrame,
+                  signal_rows: np.ndarray) -> PairArrays:
+    mask, required = strategy.entry_conditions(indicators)
+    return data._replace(entries=np.flatnonzero(entries(mask, required)[signal_rows]))
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Runner
+# ────────────────────────────────────────────────────────────────────────────────
+
+def hyperopt(config: dict, epochs: int, spaces: Sequence[str] = SPACES, seed: int = 0,
+             workers: Optional[int] = None, sort_by: str = "profit_total_abs"
+             ) -> Tuple[DataFrame, IStrategy]:
+    """Evaluate ``epochs`` sampled parameter sets; one row per epoch, best first."""
+    strategy = StrategyResolver.load_strategy(config)
+    check_supported(strategy)
+    if not hasattr(strategy, "entry_conditions"):
+        raise ValueError(f"{type(strategy).__name__} has no entry_conditions - use mhm.sweep")
+    strategy.ft_load_hyper_params()
+    space = search_space(strategy, spaces)
+    if not space:
+        raise ValueError(f"No optimizable parameters in spaces {', '.join(spaces)}")
+
+    # El banco de indicadores cubre todos los valores de los parámetros optimizados
+    indicators, timerange = load_indicators(config, strategy, optimized=list(space))
+    arrays = {}
+    for pair, df in indicators.items():
+        rows = simulated_rows(df, timerange, strategy.startup_candle_count)
+        if rows is not None:
+            arrays[pair] = (pair_arrays(pair, df, timerange, strategy.startup_candle_count),
+                            rows - 1)
+    if not arrays:
+        raise ValueError("No data left after adjusting for startup candles.")
+    if all(name in EXIT_ATTRIBUTES for name in space):
+        # Solo salidas (--spaces sell): las entradas no cambian entre epochs
+        arrays = {pair: (_with_entries(strategy, data, indicators[pair], rows), None)
+                  for pair, (data, rows) in arrays.items()}
+    init_args = (config, {pair: indicators[pair] for pair in arrays}, arrays)
+
+    todo = sample(space, epochs, seed)
+    logger.info("%d epoch(s) over %s", len(todo), ", ".join(space))
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers <= 1:
+        _init_worker(*init_args)
+        rows = [_run_epoch(params) for params in todo]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args) as pool:
+            rows = list(pool.map(_run_epoch, todo, chunksize=max(1, len(todo) // (4 * workers))))
+
+    table = DataFrame(rows).sort_values(sort_by, ascending=False, kind="stable") \
+        .reset_index(drop=True)
+    return table, strategy
+
+
+def export_params(strategy: IStrategy, params: Dict[str, Any]) -> Path:
+    """Write ``params`` to the strategy's parameter file (loaded by freqtrade on start)."""
+    details: Dict[str, Dict[str, Any]] = {}
+    for name, param in strategy.enumerate_parameters():
+        if name in params:
+            details.setdefault(param.space, {})[name] = params[name]
+    filename = Path(strategy.__file__).with_suffix(".json")
+    HyperoptTools.export_params(
+        {"params_details": details, "params_not_optimized": strategy.get_no_optimize_params()},
+        type(strategy).__name__, filename,
+    )
+    return filename
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fast hyperopt for MultiHorizonMomentum")
+    parser.add_argument("-c", "--config", default="user_data/config.json")
+    parser.add_argument("-s", "--strategy", default="MultiHorizonMomentum")
+    parser.add_argument("-p", "--pairs", nargs="+")
+    parser.add_argument("--timerange")
+    parser.add_argument("--timeframe")
+    parser.add_argument("--fee", type=float)
+    parser.add_argument("--max-open-trades", type=int)
+    parser.add_argument("--data-format", choices=["json", "jsongz", "feather", "parquet",
+                                                  DATA_FORMAT],
+                        help="Candle storage format (default: dataformat_ohlcv from the config)")
+    parser.add_argument("-e", "--epochs", type=int, default=100)
+    parser.add_argument("--spaces", nargs="+", choices=SPACES, default=list(SPACES))
+    parser.add_argument("--random-state", type=int, default=0, help="Sampling seed")
+    parser.add_argument("-j", "--workers", type=int, help="Processes (default: all cores)")
+    parser.add_argument("--sort", default="profit_total_abs")
+    parser.add_argument("--min-trades", type=int, default=1,
+                        help="Epochs with fewer trades are not considered for the best result")
+    parser.add_argument("--top", type=int, default=20, help="Epochs to print")
+    parser.add_argument("--export", metavar="CSV", help="Also write every epoch to a CSV file")
+    parser.add_argument("--export-params", action="store_true",
+                        help="Write the best epoch to the strategy's parameter file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cli = {"config": [args.config], "strategy": args.strategy, "timerange": args.timerange,
+           "timeframe": args.timeframe, "fee": args.fee, "pairs": args.pairs,
+           "max_open_trades": args.max_open_trades}
+    config = Configuration({k: v for k, v in cli.items() if v is not None},
+                           RunMode.BACKTEST).get_config()
+    if args.data_format:
+        config["dataformat_ohlcv"] = args.data_format
+    if config.get("fee") is None:
+        parser.error("--fee is required (or set 'fee' in the config)")
+
+    table, strategy = hyperopt(config, args.epochs, args.spaces, args.random_state,
+                               args.workers, args.sort)
+    with pd.option_context("display.width", 200, "display.max_columns", 30,
+                           "display.max_rows", 500):
+        print(table.head(args.top).to_string(float_format=lambda v: f"{v:.4f}"))
+    if args.export:
+        table.to_csv(args.export, index=False)
+
+    best = table[table["trades"] >= args.min_trades]
+    if best.empty:
+        print(f"No epoch with at least {args.min_trades} trade(s)")
+        return
+    params = {name: best[name].iloc[0] for name in search_space(strategy, args.spaces)}
+    params = {name: value.item() if isinstance(value, np.generic) else value
+              for name, value in params.items()}
+    print(f"Best epoch: {params}")
+    if args.export_params:
+        print(f"Parameters written to {export_params(strategy, params)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Informative-timeframe merge cache
+=================================
+
+``merge_informative_pair`` is only worth re-running when the informative
+timeframe closes a new candle. ``InformativeCache`` keeps, per pair, the merged
+informative columns aligned to the base candles together with the date of the
+last closed informative candle they were built from. Until the next
+informative candle can exist, new base candles simply repeat the last merged
+row - exactly what the forward-filled merge would produce for them.
+"""
+
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.exchange import timeframe_to_minutes
+from freqtrade.strategy import merge_informative_pair
+
+from mhm.streaming import resume_index
+
+
+class _PairState:
+    __slots__ = ("key", "dates", "columns")
+
+    def __init__(self, key: np.datetime64, dates: np.ndarray, columns: DataFrame) -> None:
+        self.key = key            # open date of the last closed informative candle
+        self.dates = dates        # base candle dates the merged columns are aligned to
+        self.columns = columns    # merged informative columns, one row per base candle
+
+
+class InformativeCache:
+    """
+    Per-pair cache of one informative timeframe merged into the base dataframe.
+
+    :param timeframe_inf: Informative timeframe (e.g. ``15m``)
+    :param populate: Adds the indicator columns to a raw informative dataframe of a pair
+    :param max_rows: Base candles kept per pair
+    """
+
+    def __init__(self, timeframe_inf: str, populate: Callable[[DataFrame, str], DataFrame],
+                 max_rows: int = 5000) -> None:
+        self.timeframe_inf = timeframe_inf
+        self.populate = populate
+        self.max_rows = max_rows
+        self._pairs: Dict[str, _PairState] = {}
+        self.hits = 0
+        self.refreshes = 0
+
+    def reset(self, pair: Optional[str] = None) -> None:
+        if pair is None:
+            self._pairs.clear()
+        else:
+            self._pairs.pop(pair, None)
+
+    def merge(self, dataframe: DataFrame, pair: str, timeframe: str,
+              fetch: Callable[[], DataFrame]) -> DataFrame:
+        """
+        Merge the informative columns for ``pair`` into ``dataframe`` (candles of
+        ``timeframe``).
+
+        ``fetch`` returns the raw informative dataframe (usually
+        ``dp.get_pair_dataframe``) and is only called when a new informative
+        candle may have closed since the last merge.
+        """
+        dates = dataframe["date"].values
+        state = self._pairs.get(pair)
+        # A base candle dated >= key + refresh_after may already see the next informative candle
+        refresh_after = np.timedelta64(
+            2 * timeframe_to_minutes(self.timeframe_inf) - timeframe_to_minutes(timeframe), "m")
+        if state is not None and len(dates) and dates[-1] < state.key + refresh_after:
+            overlap = resume_index(state.dates, dates)
+            if overlap is not None:
+                self.hits += 1
+                return self._extend(dataframe, pair, state, overlap)
+
+        self.refreshes += 1
+        informative = fetch()
+        if informative is None or informative.empty:
+            self._pairs.pop(pair, None)
+            raise ValueError(f"No {self.timeframe_inf} data for {pair}")
+        informative = self.populate(informative, pair)
+        key = informative["date"].values[-1]
+
+        base_columns = list(dataframe.columns)
+        dataframe = merge_informative_pair(
+            dataframe, informative, timeframe, self.timeframe_inf, ffill=True
+        )
+        merged = dataframe[[col for col in dataframe.columns if col not in base_columns]]
+        self._store(pair, key, dates, merged)
+        return dataframe
+
+    def _extend(self, dataframe: DataFrame, pair: str, state: _PairState,
+                overlap: int) -> DataFrame:
+        cached = state.columns
+        rows = np.arange(len(cached) - overlap, len(cached))
+        new_rows = len(dataframe) - overlap
+        if new_rows:
+            # Forward-fill: every new base candle still sees the same informative candle
+            rows = np.concatenate((rows, np.full(new_rows, len(cached) - 1)))
+        merged = cached.iloc[rows].reset_index(drop=True)
+
+        dataframe = pd.concat([dataframe.reset_index(drop=True), merged], axis=1)
+        self._store(pair, state.key, dataframe["date"].values, merged)
+        return dataframe
+
+    def _store(self, pair: str, key: np.datetime64, dates: np.ndarray, merged: DataFrame) -> None:
+        keep = min(len(dates), self.max_rows)
+        self._pairs[pair] = _PairState(
+            key, dates[-keep:], merged.iloc[len(merged) - keep:].reset_index(drop=True)
+        )
@@ -0,0 +1,261 @@
+"""
+Market-wide informative series
+==============================
+
+Series such as USDT dominance are the same for every pair, yet an informative
+merge done in ``populate_indicators`` loads and computes them once per pair
+and loop. ``MarketLayer`` holds them once instead:
+
+* ``refresh`` (once per bot loop) asks each series' source for its candles
+  and recomputes the indicator columns only when the candles changed. The
+  computed arrays are read-only and shared by every pair.
+* ``merge`` aligns the columns to a pair's candles the way
+  ``merge_informative_pair`` does (a candle is visible once it closed), with
+  one ``searchsorted`` per pair instead of a dataframe merge.
+* Freshness is explicit: each series has a ``max_age`` after the close of a
+  candle. Rows that only see older data (or no data at all) get NaN columns, so
+  filters built on them stay off for those rows, and ``refresh`` logs when a
+  series goes stale or missing and when it is fresh again.
+
+Sources are plain callables returning a candle dataframe (``date`` plus the
+columns the series needs): ``DataProviderSource`` for freqtrade's data
+provider, ``CsvSource`` for a local file kept up to date by other means
+(e.g. ``date,close`` rows of CRYPTOCAP:USDT.D exported from TradingView), or
+any stand-in provider.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.exchange import timeframe_to_msecs
+
+logger = logging.getLogger(__name__)
+
+Source = Callable[[], Optional[DataFrame]]
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Sources
+# ────────────────────────────────────────────────────────────────────────────────
+
+class DataProviderSource:
+    """
+    ``dp.get_pair_dataframe(pair, timeframe)``.
+
+    :param dp: Returns the current data provider (the strategy may wrap its ``dp``)
+    """
+
+    def __init__(self, dp: Callable[[], object], pair: str, timeframe: str) -> None:
+        self.dp = dp
+        self.pair = pair
+        self.timeframe = timeframe
+
+    def __call__(self) -> Optional[DataFrame]:
+        return self.dp().get_pair_dataframe(pair=self.pair, timeframe=self.timeframe)
+
+    def __repr__(self) -> str:
+        return f"dp {self.pair} {self.timeframe}"
+
+
+class CsvSource:
+    """
+    Candles from a CSV file with a ``date`` column (parsed as UTC). The file is
+    only read again when its modification time changes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._mtime: Optional[float] = None
+        self._frame: Optional[DataFrame] = None
+
+    def __call__(self) -> Optional[DataFrame]:
+        mtime = os.stat(self.path).st_mtime
+        if mtime != self._mtime:
+            frame = pd.read_csv(self.path)
+            frame["date"] = pd.to_datetime(frame["date"], utc=True)
+            self._frame = frame.sort_values("date", ignore_index=True)
+            self._mtime = mtime
+        return self._frame
+
+    def __repr__(self) -> str:
+        return str(self.path)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Layer
+# ────────────────────────────────────────────────────────────────────────────────
+
+def _ns(dates) -> np.ndarray:
+    """int64 UTC nanoseconds of a date column / array, whatever its unit."""
+    return np.asarray(pd.DatetimeIndex(dates).as_unit("ns").asi8)
+
+
+class _Series:
+    __slots__ = ("timeframe", "source", "populate", "names", "max_age", "key", "dates",
+                 "columns", "error", "stale")
+
+    def __init__(self, timeframe: str, source: Source, populate: Callable[[DataFrame], DataFrame],
+                 names: Tuple[str, ...], max_age: timedelta) -> None:
+        self.timeframe = timeframe
+        self.source = source
+        self.populate = populate
+        self.names = names
+        self.max_age = max_age
+        self.key: Optional[Tuple] = None            # (rows, last date, last close) of the candles
+        self.dates: Optional[np.ndarray] = None     # candle open dates, int64 ns
+        self.columns: Dict[str, np.ndarray] = {}    # computed columns, read-only
+        self.error: Optional[str] = None
+        self.stale: Optional[bool] = None           # last state logged by refresh
+
+    def install(self, dates: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+        for values in columns.values():
+            values.flags.writeable = False
+        dates.flags.writeable = False
+        self.dates, self.columns = dates, columns
+
+
+class MarketLayer:
+    """
+    Market-wide series computed once and merged into every pair's candles.
+
+    Series registered with ``register`` load lazily on their first ``merge``
+    (backtesting); in dry/live call ``refresh`` once per loop.
+    """
+
+    def __init__(self) -> None:
+        self._series: Dict[str, _Series] = {}
+        self._lock = threading.Lock()
+        self.computations = 0
+
+    def register(self, name: str, timeframe: str, source: Source,
+                 populate: Callable[[DataFrame], DataFrame], columns: Tuple[str, ...],
+                 max_age: timedelta = timedelta(days=2)) -> None:
+        """
+        :param timeframe: Candle timeframe of the source; suffix of the merged columns
+        :param populate: Indicator columns of the source candles (same row count)
+        :param columns: Columns ``populate`` returns - merged (as NaN) even without data
+        :param max_age: How long after a candle's close its values may still be used
+        """
+        self._series[name] = _Series(timeframe, source, populate, tuple(columns), max_age)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._series
+
+    def refresh(self, now: Optional[datetime] = None) -> None:
+        """Reload every series, recompute the changed ones and log freshness changes."""
+        now = now or datetime.now(timezone.utc)
+        for name, series in self._series.items():
+            self._load(series)
+            self._report(name, now)
+
+    def status(self, name: str, now: Optional[datetime] = None) -> Dict:
+        """Last candle date, its age at ``now`` (after its close) and whether that is stale."""
+        series = self._series[name]
+        if series.dates is None or not len(series.dates):
+            return {"last_date": None, "age": None, "stale": True, "error": series.error}
+        last = pd.Timestamp(int(series.dates[-1]), tz="UTC")
+        age = ((now or datetime.now(timezone.utc)) - last
+               - timedelta(milliseconds=timeframe_to_msecs(series.timeframe)))
+        return {"last_date": last.to_pydatetime(), "age": age,
+                "stale": age > series.max_age, "error": series.error}
+
+    def merge(self, dataframe: DataFrame, name: str, timeframe: str) -> DataFrame:
+        """
+        Add the columns of series ``name`` to ``dataframe`` (candles of
+        ``timeframe``) as ``<column>_<series timeframe>``; NaN where the last
+        visible candle is older than ``max_age`` or there is none.
+        """
+        series = self._series[name]
+        if series.key is None and series.error is None:
+            self._load(series)
+            if series.dates is None:
+                self._report(name)
+        n = len(dataframe)
+        merged = {column: np.full(n, np.nan) for column in series.names}
+        if series.dates is not None and len(series.dates) and n:
+            bar_ns = timeframe_to_msecs(series.timeframe) * 10**6
+            dates = _ns(dataframe["date"])
+            # Como merge_informative_pair: la vela informativa es visible en la vela
+            # base que cierra junto con ella
+            shift = bar_ns - timeframe_to_msecs(timeframe) * 10**6
+            idx = np.searchsorted(series.dates + shift, dates, side="right") - 1
+            valid = idx >= 0
+            idx[~valid] = 0
+            max_age_ns = int(series.max_age.total_seconds() * 10**9)
+            valid &= dates - (series.dates[idx] + bar_ns) <= max_age_ns
+            for column in series.names:
+                np.copyto(merged[column], series.columns[column][idx], where=valid)
+        suffix = series.timeframe
+        for column, values in merged.items():
+            dataframe[f"{column}_{suffix}"] = values
+        return dataframe
+
+    # ------------------------------------------------------------------
+    # Sharing with forked workers (mhm.parallel)
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, DataFrame]:
+        """Computed columns of the loaded series, one dataframe per series."""
+        frames = {}
+        for name, series in self._series.items():
+            if series.dates is not None:
+                frame = DataFrame(dict(series.columns))
+                frame.insert(0, "date", pd.to_datetime(series.dates, utc=True))
+                frames[name] = frame
+        return frames
+
+    def install(self, frames: Dict[str, DataFrame]) -> None:
+        """Take the series computed by another process (``snapshot``)."""
+        for name, frame in frames.items():
+            series = self._series.get(name)
+            if series is None:
+                continue
+            series.install(_ns(frame["date"]).copy(),
+                           {col: frame[col].to_numpy(dtype=np.float64, copy=True)
+                            for col in series.names})
+            series.key = ("installed", len(frame))
+
+    # ------------------------------------------------------------------
+    def _report(self, name: str, now: Optional[datetime] = None) -> None:
+        series = self._series[name]
+        status = self.status(name, now)
+        if status["stale"] == series.stale:
+            return
+        series.stale = status["stale"]
+        if not status["stale"]:
+            logger.info("Market series %s is fresh again (last candle %s)",
+                        name, status["last_date"])
+        elif status["last_date"] is None:
+            logger.warning("Market series %s has no data (%s): filters using it block "
+                           "every candle", name, series.error or series.source)
+        else:
+            logger.warning("Market series %s is stale: last candle %s, older than %.0fh",
+                           name, status["last_date"], series.max_age.total_seconds() / 3600)
+
+    def _load(self, series: _Series) -> None:
+        with self._lock:
+            try:
+                candles = series.source()
+            except Exception as exc:    # missing file, unknown pair...
+                series.error = repr(exc)
+                return
+            if candles is None or candles.empty:
+                series.error = "empty"
+                return
+            series.error = None
+            key = (len(candles), candles["date"].iat[-1], candles["close"].iat[-1])
+            if key == series.key:
+                return
+            columns = series.populate(candles)
+            series.install(_ns(candles["date"]).copy(),
+                           {col: columns[col].to_numpy(dtype=np.float64, copy=True)
+                            for col in series.names})
+            series.key = key
+            self.computations += 1
@@ -0,0 +1,261 @@
+"""
+Strategy metrics
+================
+
+Counters and timings for dry/live runs, served in the Prometheus text format
+by the bot's own API server (``GET /api/v1/metrics``, same credentials as the
+rest of the API - Prometheus can use ``basic_auth``).
+
+* Entry funnel, per pair: candles analyzed, candles that passed each entry
+  condition, candles where that condition was the only one missing, and
+  entry signals. Read from the ``entry_mask`` column (``mhm.signals``), only
+  for candles not counted before - one mask lookup per new candle.
+* Timing histograms of the strategy callbacks (``timed`` decorator): one
+  ``perf_counter`` pair and a bucket bisect per call.
+
+Example scrape config::
+
+    - job_name: freqtrade
+      metrics_path: /api/v1/metrics
+      basic_auth: {username: freqtrader, password: ...}
+      static_configs: [{targets: ["freqtrade:8080"]}]
+"""
+
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from mhm.signals import BITS, ENTRY_CONDITIONS, ENTRY_MASK_COLUMN, required_bits
+
+logger = logging.getLogger(__name__)
+
+METRICS_PATH = "/api/v1/metrics"
+
+# Seconds; callbacks range from microseconds (custom_exit) to a second (cold indicators)
+BUCKETS: Tuple[float, ...] = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0,
+)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)     # last slot: above the largest bucket
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def add(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.count += other.count
+
+
+class _Funnel:
+    __slots__ = ("last_date", "candles", "passed", "blocked", "signals")
+
+    def __init__(self) -> None:
+        self.last_date: Optional[pd.Timestamp] = None
+        self.candles = 0
+        self.passed = dict.fromkeys(ENTRY_CONDITIONS, 0)
+        self.blocked = dict.fromkeys(ENTRY_CONDITIONS, 0)
+        self.signals = 0
+
+
+class StrategyMetrics:
+    """Entry funnel and callback timings; safe to read from the API thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._funnels: Dict[str, _Funnel] = {}
+        self._timings: Dict[str, Histogram] = {}
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # Analysis workers: the lock may have been held by the API thread, and
+        # timings are drained back to the parent, so start from scratch
+        self._lock = threading.Lock()
+        self._timings = {}
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._timings.get(name)
+            if histogram is None:
+                histogram = self._timings[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count_entries(self, pair: str, dataframe: DataFrame, use_usdt: bool = False) -> None:
+        """Add the candles of ``dataframe`` newer than the last counted one to the funnel."""
+        if ENTRY_MASK_COLUMN not in dataframe.columns or dataframe.empty:
+            return
+        funnel = self._funnels.get(pair) or _Funnel()
+        dates = dataframe["date"]
+        start = 0
+        if funnel.last_date is not None:
+            start = int(dates.searchsorted(funnel.last_date, side="right"))
+        mask = dataframe[ENTRY_MASK_COLUMN].to_numpy()[start:]
+        if not len(mask):
+            return
+
+        required = required_bits(use_usdt)
+        values, counts = np.unique(mask & required, return_counts=True)
+        with self._lock:
+            self._funnels[pair] = funnel
+            funnel.last_date = dates.iat[-1]
+            funnel.candles += len(mask)
+            for value, count in zip(values.tolist(), counts.tolist()):
+                if value == required:
+                    funnel.signals += count
+                for name in ENTRY_CONDITIONS:
+                    bit = BITS[name]
+                    if value & bit:
+                        funnel.passed[name] += count
+                    elif bit & required and value == required & ~bit:
+                        funnel.blocked[name] += count
+
+    # ------------------------------------------------------------------
+    # Worker processes (mhm.parallel)
+    # ------------------------------------------------------------------
+    def drain_timings(self) -> Dict[str, Histogram]:
+        """Timings recorded since the last call (sent back by analysis workers)."""
+        with self._lock:
+            timings, self._timings = self._timings, {}
+        return timings
+
+    def merge_timings(self, timings: Dict[str, Histogram]) -> None:
+        with self._lock:
+            for name, histogram in timings.items():
+                self._timings.setdefault(name, Histogram()).add(histogram)
+
+    # ------------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------------
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            funnels = sorted(self._funnels.items())
+            _header(lines, "mhm_entry_candles_total", "counter", "Candles analyzed for entries")
+            for pair, funnel in funnels:
+                lines.append(f'mhm_entry_candles_total{{pair="{pair}"}} {funnel.candles}')
+            _header(lines, "mhm_entry_signals_total", "counter", "Candles with an entry signal")
+            for pair, funnel in funnels:
+                lines.append(f'mhm_entry_signals_total{{pair="{pair}"}} {funnel.signals}')
+            _header(lines, "mhm_entry_condition_passed_total", "counter",
+                    "Candles that passed an entry condition")
+            for pair, funnel in funnels:
+                for name, count in funnel.passed.items():
+                    lines.append(f'mhm_entry_condition_passed_total{{pair="{pair}",'
+                                 f'condition="{name}"}} {count}')
+            _header(lines, "mhm_entry_condition_blocked_total", "counter",
+                    "Candles where only this entry condition was missing")
+            for pair, funnel in funnels:
+                for name, count in funnel.blocked.items():
+                    lines.append(f'mhm_entry_condition_blocked_total{{pair="{pair}",'
+                                 f'condition="{name}"}} {count}')
+
+            _header(lines, "mhm_callback_seconds", "histogram", "Strategy callback duration")
+            for name, histogram in sorted(self._timings.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'mhm_callback_seconds_bucket{{callback="{name}",'
+                                 f'le="{bound}"}} {cumulative}')
+                lines.append(f'mhm_callback_seconds_bucket{{callback="{name}",le="+Inf"}} '
+                             f'{histogram.count}')
+                lines.append(f'mhm_callback_seconds_sum{{callback="{name}"}} {histogram.total!r}')
+                lines.append(f'mhm_callback_seconds_count{{callback="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+def _header(lines: List[str], name: str, kind: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def timed(name: str) -> Callable:
+    """Record the duration of a strategy method in ``self._metrics`` (when set)."""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = self._metrics
+            if metrics is None:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                metrics.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# API server endpoint
+# ────────────────────────────────────────────────────────────────────────────────
+
+# Metrics the endpoint serves, read on every request: the route outlives the strategy
+# instance (the API server is kept across /reload_config), the served metrics do not
+_served: Dict[str, StrategyMetrics] = {}
+
+
+def _render_served():
+    from fastapi.responses import PlainTextResponse
+
+    metrics = _served.get("metrics")
+    if metrics is None:
+        return PlainTextResponse("", status_code=503)
+    return PlainTextResponse(metrics.render())
+
+
+def bot_rpc(dp: Any) -> Any:
+    """
+    The ``RPCManager`` a ``DataProvider`` was built with, or None (backtesting,
+    or a freqtrade without it). DataProvider keeps it in a private ``__rpc``
+    attribute; wrappers such as ``ResampledDataProvider`` forward the lookup.
+    """
+    return getattr(dp, "_DataProvider__rpc", None)
+
+
+def register_endpoint(rpc: Any, metrics: StrategyMetrics) -> bool:
+    """
+    Serve ``metrics`` on the running freqtrade API server, in place of the metrics
+    registered before (e.g. by the strategy instance replaced on ``/reload_config``).
+
+    :param rpc: The bot's ``RPCManager`` (``bot_rpc``)
+    :return: False when the API server is not enabled
+    """
+    server = next((mod for mod in getattr(rpc, "registered_modules", [])
+                   if mod.name == "apiserver"), None)
+    if server is None:
+        return False
+
+    from fastapi import Depends
+    from freqtrade.rpc.api_server.api_auth import http_basic_or_jwt_token
+
+    _served["metrics"] = metrics
+    app = server.app
+    if any(getattr(route, "path", None) == METRICS_PATH for route in app.router.routes):
+        return True
+    app.add_api_route(METRICS_PATH, _render_served, methods=["GET"],
+                      dependencies=[Depends(http_basic_or_jwt_token)], include_in_schema=False)
+    # The web UI registers a catch-all route; ours has to be matched before it
+    app.router.routes.insert(0, app.router.routes.pop())
+    logger.info("Strategy metrics served at %s", METRICS_PATH)
+    return True
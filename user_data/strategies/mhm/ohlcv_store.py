@@ -0,0 +1,350 @@
+"""
+Memory-mapped columnar OHLCV store
+==================================
+
+Binary replacement for the ``json`` candle files. Each pair / timeframe is a
+directory (``BTC_USDT-1m.memmap/``) with one raw, fixed-width array per column::
+
+    date.i8     int64 open time in ms since epoch, ascending
+    open.f8     float64
+    high.f8     ...
+    low.f8
+    close.f8
+    volume.f8
+
+* loads are ``np.memmap`` views - no parsing, and pages are only read when
+  touched;
+* a timerange is answered by a binary search on the mapped ``date`` column,
+  so only the rows inside it are read from disk;
+* appends write the new rows at the end of each file. ``date.i8`` is written
+  last and its length is the row count, so an interrupted append leaves at most
+  a few unused bytes at the end of the value columns - they are cut off by the
+  next write.
+
+``MemmapDataHandler`` plugs the store into freqtrade's data-handler interface
+(``load_pair_history(..., data_handler=...)``). freqtrade only resolves its
+built-in formats from ``dataformat_ohlcv``, so the bot itself keeps reading
+json; ``mhm.backtest`` / ``mhm.sweep`` use the store with
+``--data-format memmap``.
+
+Convert existing data (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.ohlcv_store convert \\
+        --datadir user_data/data/binance --timeframes 1m 15m
+"""
+
+import argparse
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.candle_columns import get_candle_columns
+from freqtrade.configuration import TimeRange
+from freqtrade.data.dataprovider import DataProvider
+from freqtrade.data.history import load_data as ft_load_data
+from freqtrade.data.history import load_pair_history
+from freqtrade.data.history.datahandlers import IDataHandler, get_datahandler
+from freqtrade.enums import CandleType, TradingMode
+from freqtrade.exceptions import OperationalException
+from freqtrade.exchange import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+DATA_FORMAT = "memmap"
+_DATE = "date"
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Column files
+# ────────────────────────────────────────────────────────────────────────────────
+
+class ColumnStore:
+    """
+    Candles of one pair / timeframe, one file per column.
+
+    :param path: Store directory
+    :param columns: Value columns (without ``date``), in file order
+    """
+
+    def __init__(self, path: Path, columns: List[str]) -> None:
+        self.path = Path(path)
+        self.columns = columns
+
+    def _file(self, column: str) -> Path:
+        return self.path / (f"{column}.i8" if column == _DATE else f"{column}.f8")
+
+    def exists(self) -> bool:
+        return self._file(_DATE).exists()
+
+    def __len__(self) -> int:
+        date_file = self._file(_DATE)
+        return date_file.stat().st_size // 8 if date_file.exists() else 0
+
+    def _map(self, column: str, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=np.int64 if column == _DATE else np.float64)
+        return np.memmap(self._file(column), mode="r", shape=(rows,),
+                         dtype=np.int64 if column == _DATE else np.float64)
+
+    def dates(self) -> np.ndarray:
+        """Mapped ``date`` column (ms since epoch)."""
+        return self._map(_DATE, len(self))
+
+    def bounds(self, start_ms: Optional[int] = None, stop_ms: Optional[int] = None
+               ) -> Tuple[int, int]:
+        """Row range ``[lo, hi)`` of candles with ``start_ms <= date <= stop_ms``."""
+        dates = self.dates()
+        lo = 0 if start_ms is None else int(np.searchsorted(dates, start_ms, side="left"))
+        hi = len(dates) if stop_ms is None else int(np.searchsorted(dates, stop_ms, side="right"))
+        return lo, max(lo, hi)
+
+    def read(self, start_ms: Optional[int] = None, stop_ms: Optional[int] = None
+             ) -> Dict[str, np.ndarray]:
+        """Zero-copy views of every column, limited to ``[start_ms, stop_ms]``."""
+        rows = len(self)
+        lo, hi = self.bounds(start_ms, stop_ms)
+        return {column: self._map(column, rows)[lo:hi] for column in [_DATE, *self.columns]}
+
+    def write(self, data: DataFrame) -> None:
+        """Replace the stored candles with ``data``."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        staged = ColumnStore(tmp, self.columns)
+        staged._append_rows(_to_arrays(data, self.columns), 0)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(tmp, self.path)
+
+    def append(self, data: DataFrame) -> None:
+        """
+        Add ``data`` after the stored candles. Stored candles at or after the
+        first new date are replaced.
+        """
+        if not self.exists():
+            self.write(data)
+            return
+        arrays = _to_arrays(data, self.columns)
+        if len(arrays[_DATE]) == 0:
+            return
+        keep = int(np.searchsorted(self.dates(), arrays[_DATE][0], side="left"))
+        self._append_rows(arrays, keep)
+
+    def _append_rows(self, arrays: Dict[str, np.ndarray], keep: int) -> None:
+        # The row count (date.i8) shrinks before the values do and only grows once all
+        # values are on disk
+        self.path.mkdir(parents=True, exist_ok=True)
+        if keep < len(self):
+            os.truncate(self._file(_DATE), keep * 8)
+        for column in [*self.columns, _DATE]:
+            with open(self._file(column), "ab") as fh:
+                fh.truncate(keep * 8)
+                fh.write(arrays[column].tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+
+
+def _to_arrays(data: DataFrame, columns: List[str]) -> Dict[str, np.ndarray]:
+    data = data.sort_values(_DATE).drop_duplicates(_DATE, keep="last")
+    arrays = {_DATE: data[_DATE].dt.as_unit("ms").astype("int64").to_numpy()}
+    for column in columns:
+        arrays[column] = np.ascontiguousarray(data[column].to_numpy(dtype=np.float64))
+    return arrays
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# freqtrade data handler
+# ────────────────────────────────────────────────────────────────────────────────
+
+class MemmapDataHandler(IDataHandler):
+    """freqtrade data handler over ``ColumnStore`` directories (OHLCV only)."""
+
+    @classmethod
+    def _get_file_extension(cls) -> str:
+        return DATA_FORMAT
+
+    def store_for(self, pair: str, timeframe: str, candle_type: CandleType) -> ColumnStore:
+        path = self._pair_data_filename(self._datadir, pair, timeframe, candle_type)
+        return ColumnStore(path, get_candle_columns(candle_type)[1:])
+
+    def ohlcv_store(
+        self, pair: str, timeframe: str, data: DataFrame, candle_type: CandleType
+    ) -> None:
+        self.store_for(pair, timeframe, candle_type).write(data)
+
+    def ohlcv_append(
+        self, pair: str, timeframe: str, data: DataFrame, candle_type: CandleType
+    ) -> None:
+        self.store_for(pair, timeframe, candle_type).append(data)
+
+    def ohlcv_purge(self, pair: str, timeframe: str, candle_type: CandleType) -> bool:
+        store = self.store_for(pair, timeframe, candle_type)
+        if store.path.exists():
+            shutil.rmtree(store.path)
+            return True
+        return False
+
+    def _ohlcv_load(
+        self, pair: str, timeframe: str, timerange: Optional[TimeRange], candle_type: CandleType
+    ) -> DataFrame:
+        store = self.store_for(pair, timeframe, candle_type)
+        if not store.exists():
+            return self._empty_ohlcv_df(candle_type)
+
+        start_ms = stop_ms = None
+        if timerange:
+            # One extra candle on each side: ohlcv_load trims to the exact range afterwards,
+            # but checks the untrimmed frame for missing data first
+            candle_ms = timeframe_to_seconds(timeframe) * 1000
+            if timerange.starttype == "date":
+                start_ms = timerange.startts * 1000 - candle_ms
+            if timerange.stoptype == "date":
+                stop_ms = timerange.stopts * 1000 + candle_ms
+        arrays = store.read(start_ms, stop_ms)
+        if len(arrays[_DATE]) == 0:
+            return self._empty_ohlcv_df(candle_type)
+
+        columns = {_DATE: pd.to_datetime(arrays.pop(_DATE), unit="ms", utc=True)}
+        columns.update(arrays)
+        return DataFrame(columns, copy=False)
+
+    def _trades_store(self, pair: str, data: DataFrame, trading_mode: TradingMode) -> None:
+        raise NotImplementedError("The memmap store only holds OHLCV data")
+
+    def trades_append(self, pair: str, data: DataFrame):
+        raise NotImplementedError("The memmap store only holds OHLCV data")
+
+    def _trades_load(
+        self, pair: str, trading_mode: TradingMode, timerange: Optional[TimeRange] = None
+    ) -> DataFrame:
+        raise NotImplementedError("The memmap store only holds OHLCV data")
+
+
+def datahandler(datadir: Path, data_format: str) -> IDataHandler:
+    """Like freqtrade's ``get_datahandler``, plus the ``memmap`` format."""
+    if data_format == DATA_FORMAT:
+        return MemmapDataHandler(Path(datadir))
+    return get_datahandler(Path(datadir), data_format)
+
+
+def load_data(datadir: Path, timeframe: str, pairs: List[str], *, data_format: str = "json",
+              data_handler: Optional[IDataHandler] = None, **kwargs) -> Dict[str, DataFrame]:
+    """
+    freqtrade's ``load_data`` that also reads the memmap store.
+
+    :param data_handler: Handler to read through instead of the one of ``data_format``
+    """
+    if data_handler is None and data_format != DATA_FORMAT:
+        return ft_load_data(datadir, timeframe, pairs, data_format=data_format, **kwargs)
+
+    handler = data_handler or datahandler(datadir, data_format)
+    fail_without_data = kwargs.pop("fail_without_data", False)
+    result = {}
+    for pair in pairs:
+        hist = load_pair_history(pair=pair, timeframe=timeframe, datadir=datadir,
+                                 data_handler=handler, **kwargs)
+        if not hist.empty:
+            result[pair] = hist
+    if fail_without_data and not result:
+        raise OperationalException("No data found. Terminating.")
+    return result
+
+
+class StoreDataProvider(DataProvider):
+    """
+    ``DataProvider`` whose historic (backtest) candles come from the memmap store
+    (or from ``data_handler``).
+    """
+
+    def __init__(self, config: dict, exchange=None, pairlists=None,
+                 data_handler: Optional[IDataHandler] = None) -> None:
+        super().__init__(config, exchange, pairlists)
+        self._handler = data_handler or datahandler(config["datadir"], config["dataformat_ohlcv"])
+        self._historic: Dict[Tuple[str, str, CandleType], DataFrame] = {}
+
+    def historic_ohlcv(self, pair: str, timeframe: str, candle_type: str = "") -> DataFrame:
+        _candle_type = (CandleType.from_string(candle_type) if candle_type != ""
+                        else self._config["candle_type_def"])
+        key = (pair, str(timeframe), _candle_type)
+        if key not in self._historic:
+            timerange = TimeRange.parse_timerange(self._config.get("timerange"))
+            timerange.subtract_start(
+                timeframe_to_seconds(str(timeframe)) * self.get_required_startup(str(timeframe)))
+            self._historic[key] = load_pair_history(
+                pair=pair, timeframe=timeframe, datadir=self._config["datadir"],
+                timerange=timerange, data_handler=self._handler, candle_type=_candle_type,
+            )
+        return self._historic[key].copy()
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Converter
+# ────────────────────────────────────────────────────────────────────────────────
+
+def convert(datadir: Path, source_format: str = "json", timeframes: Optional[List[str]] = None,
+            pairs: Optional[List[str]] = None,
+            trading_mode: TradingMode = TradingMode.SPOT) -> List[Tuple[str, str, int]]:
+    """
+    Copy every ``source_format`` candle file in ``datadir`` into the memmap
+    store next to it. Returns ``(pair, timeframe, rows)`` per converted file.
+    """
+    datadir = Path(datadir)
+    source = get_datahandler(datadir, source_format)
+    target = MemmapDataHandler(datadir)
+    converted = []
+    for pair, timeframe, candle_type in source.ohlcv_get_available_data(datadir, trading_mode):
+        if (timeframes and timeframe not in timeframes) or (pairs and pair not in pairs):
+            continue
+        data = source.ohlcv_load(pair, timeframe, candle_type, fill_missing=False,
+                                 warn_no_data=False)
+        if data.empty:
+            continue
+        target.ohlcv_store(pair, timeframe, data, candle_type)
+        converted.append((pair, timeframe, len(data)))
+        logger.info("%s %s: %d candles", pair, timeframe, len(data))
+    return converted
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Memory-mapped OHLCV store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    conv = commands.add_parser("convert", help="Convert candle files into the memmap store")
+    conv.add_argument("--datadir", default="user_data/data/binance")
+    conv.add_argument("--format-from", default="json",
+                      choices=["json", "jsongz", "feather", "parquet"])
+    conv.add_argument("--timeframes", nargs="+")
+    conv.add_argument("-p", "--pairs", nargs="+")
+    conv.add_argument("--trading-mode", default="spot", choices=["spot", "futures"])
+
+    show = commands.add_parser("list", help="List the stored pairs / timeframes")
+    show.add_argument("--datadir", default="user_data/data/binance")
+    show.add_argument("--trading-mode", default="spot", choices=["spot", "futures"])
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    trading_mode = TradingMode(args.trading_mode)
+
+    if args.command == "convert":
+        converted = convert(Path(args.datadir), args.format_from, args.timeframes, args.pairs,
+                            trading_mode)
+        print(f"Converted {len(converted)} file(s), {sum(r for _, _, r in converted)} candles")
+    else:
+        handler = MemmapDataHandler(Path(args.datadir))
+        for pair, timeframe, candle_type in sorted(
+                handler.ohlcv_get_available_data(Path(args.datadir), trading_mode)):
+            store = handler.store_for(pair, timeframe, candle_type)
+            dates = store.dates()
+            first, last = (pd.to_datetime([dates[0], dates[-1]], unit="ms", utc=True)
+                           if len(dates) else ("-", "-"))
+            print(f"{pair:<16} {timeframe:>4} {candle_type.value:<8} {len(dates):>10}  "
+                  f"{first} -> {last}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Order-book cache
+================
+
+With ``use_order_book`` in ``entry_pricing`` / ``exit_pricing`` every priced
+order fetches the pair's order book, and dry-run fills and
+``check_depth_of_market`` fetch it again: one REST request each, on the bot
+thread, between the signal and the order. ``OrderBookCache`` answers those
+reads with books no older than a TTL:
+
+* ``OrderBookStream`` keeps the books of the whitelist current from the
+  exchange's partial-depth stream (``<symbol>@depth20@100ms``, Binance
+  format), in a daemon thread like ``mhm.events.CandleEvents``;
+* a read the cache cannot answer (no book within the TTL, or fewer levels
+  than asked for - ``check_depth_of_market`` asks for 1000) goes to the
+  exchange, and the book it returns serves the next reads within the TTL.
+
+``install_order_book_cache`` sends the exchange's ``fetch_l2_order_book`` -
+which freqtrade's entry / exit pricing, depth-of-market check, dry-run fills
+and ``dp.orderbook`` all go through - via the cache.
+
+``BookReplayServer`` is a stand-in exchange for tests: it serves depth
+snapshots around the prices of stored candles with the same protocol (from
+the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.orderbook replay \\
+        --datadir user_data/data/binance -p BTC/USDT ETH/USDT --speed 60
+    PYTHONPATH=user_data/strategies python -m mhm.orderbook watch \\
+        --url ws://127.0.0.1:8766 -p BTC/USDT ETH/USDT
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from mhm.events import BINANCE_STREAM_URL, ReplayServer, StreamListener, symbol_of
+
+logger = logging.getLogger(__name__)
+
+# Levels of the partial-depth stream (Binance: 5, 10 or 20)
+STREAM_DEPTH = 20
+
+
+class _Cached(NamedTuple):
+    received: float     # monotonic time
+    levels: int         # levels the book answers for
+    book: dict
+
+
+class OrderBookCache:
+    """
+    Latest order book per pair, shared by the bot thread and the stream thread.
+    Books are ccxt-shaped (``bids`` / ``asks`` lists of [price, amount]) and
+    handed out as they are - callers must not modify them.
+
+    :param ttl: Seconds a book is served for
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._books: Dict[str, _Cached] = {}
+
+    def put(self, pair: str, book: dict, levels: int) -> None:
+        with self._lock:
+            self._books[pair] = _Cached(time.monotonic(), levels, book)
+
+    def get(self, pair: str, limit: int) -> Optional[dict]:
+        """Book of ``pair`` with at least ``limit`` levels received within the TTL."""
+        with self._lock:
+            cached = self._books.get(pair)
+        if (cached is None or cached.levels < limit
+                or time.monotonic() - cached.received > self.ttl):
+            return None
+        return cached.book
+
+    def fetch(self, fetch: Callable[[str, int], dict], pair: str, limit: int) -> dict:
+        """``get``, or ``fetch(pair, limit)`` from the exchange and cache the result."""
+        book = self.get(pair, limit)
+        if book is not None:
+            self.hits += 1
+            return book
+        self.misses += 1
+        book = fetch(pair, limit)
+        # El exchange redondea el límite hacia arriba (binance: 1 -> 5 niveles)
+        self.put(pair, book, max(limit, min(len(book["bids"]), len(book["asks"]))))
+        return book
+
+
+def install_order_book_cache(exchange, cache: OrderBookCache) -> Callable[[], None]:
+    """Route ``exchange.fetch_l2_order_book`` through ``cache``; returns the undo."""
+    original = exchange.fetch_l2_order_book
+
+    def fetch_l2_order_book(pair: str, limit: int = 100) -> dict:
+        return cache.fetch(original, pair, limit)
+
+    exchange.fetch_l2_order_book = fetch_l2_order_book
+
+    def restore() -> None:
+        vars(exchange).pop("fetch_l2_order_book", None)
+    return restore
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Depth stream
+# ────────────────────────────────────────────────────────────────────────────────
+
+def depth_stream_name(pair: str, depth: int = STREAM_DEPTH) -> str:
+    return f"{symbol_of(pair).lower()}@depth{depth}@100ms"
+
+
+def parse_depth(message: dict, pairs: Dict[str, str]) -> Optional[Tuple[str, dict]]:
+    """
+    Pair and ccxt-shaped book of a partial-depth message (spot payloads carry no
+    symbol: it comes from the combined-stream name).
+
+    :param pairs: Subscribed pairs by exchange symbol
+    """
+    data = message.get("data", message)
+    if not isinstance(data, dict):
+        return None
+    bids, asks = data.get("bids", data.get("b")), data.get("asks", data.get("a"))
+    if bids is None or asks is None:
+        return None
+    symbol = data.get("s") or message.get("stream", "").split("@")[0].upper()
+    pair = pairs.get(symbol)
+    if pair is None:
+        return None
+    timestamp = data.get("E")
+    return pair, {
+        "symbol": pair,
+        "bids": [[float(price), float(amount)] for price, amount in bids],
+        "asks": [[float(price), float(amount)] for price, amount in asks],
+        "timestamp": timestamp,
+        "datetime": None,
+        "nonce": data.get("lastUpdateId", data.get("u")),
+    }
+
+
+def depth_message(pair: str, bids: List[Tuple[float, float]], asks: List[Tuple[float, float]],
+                  update_id: int, depth: int = STREAM_DEPTH) -> str:
+    """Combined-stream partial-depth message, as sent by Binance (spot)."""
+    return json.dumps({
+        "stream": depth_stream_name(pair, depth),
+        "data": {
+            "lastUpdateId": update_id,
+            "bids": [[repr(price), repr(amount)] for price, amount in bids],
+            "asks": [[repr(price), repr(amount)] for price, amount in asks],
+        },
+    })
+
+
+class OrderBookStream(StreamListener):
+    """
+    Partial-depth stream listener feeding ``cache``.
+
+    :param url: Websocket endpoint (Binance combined streams, or ``BookReplayServer``)
+    :param depth: Levels per book (5, 10 or 20)
+    """
+
+    label = "Order-book stream"
+    thread_name = "mhm-order-books"
+
+    def __init__(self, url: str, cache: OrderBookCache, depth: int = STREAM_DEPTH) -> None:
+        super().__init__(url)
+        self.cache = cache
+        self.depth = depth
+
+    def stream(self, pair: str) -> str:
+        return depth_stream_name(pair, self.depth)
+
+    def _handle(self, raw) -> None:
+        try:
+            parsed = parse_depth(json.loads(raw), self._pairs)
+        except (ValueError, KeyError, TypeError):
+            return
+        if parsed is not None:
+            pair, book = parsed
+            self.cache.put(pair, book, self.depth)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Replay server
+# ────────────────────────────────────────────────────────────────────────────────
+
+class BookReplayServer(ReplayServer):
+    """
+    Serves stored candles as a Binance partial-depth stream: on every update of
+    a candle (``ReplayServer``) a book of ``depth`` levels per side around its
+    price, ``spread_bps`` apart, each level holding an even share of the
+    candle's volume.
+    """
+
+    def __init__(self, candles, timeframe: str, speed: float = 60.0, ticks: int = 4,
+                 host: str = "127.0.0.1", port: int = 8766, depth: int = STREAM_DEPTH,
+                 spread_bps: float = 1.0) -> None:
+        super().__init__(candles, timeframe, speed, ticks, host, port)
+        self.depth = depth
+        self.spread = spread_bps / 10_000
+        self._update_id = 0
+
+    def stream(self, pair: str) -> str:
+        return depth_stream_name(pair, self.depth)
+
+    def _tick(self, pair: str, open_time: int, open_: float, high: float, low: float,
+              close: float, volume: float, tick: int) -> str:
+        price, _, _ = self._price(open_, high, low, close, tick)
+        step = price * self.spread
+        amount = max(volume, 1.0) / (2 * self.depth)
+        self._update_id += 1
+        return depth_message(
+            pair,
+            [(price - step * (level + 0.5), amount) for level in range(self.depth)],
+            [(price + step * (level + 0.5), amount) for level in range(self.depth)],
+            self._update_id, self.depth,
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Order-book cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser("replay", help="Serve stored candles as a depth stream")
+    replay.add_argument("--datadir", default="user_data/data/binance")
+    replay.add_argument("--data-format", default="json")
+    replay.add_argument("-p", "--pairs", nargs="+", required=True)
+    replay.add_argument("--timeframe", default="1m")
+    replay.add_argument("--timerange")
+    replay.add_argument("--speed", type=float, default=60.0,
+                        help="Replay speed-up (60: one 1m candle per second)")
+    replay.add_argument("--ticks", type=int, default=4, help="Book updates per candle")
+    replay.add_argument("--spread-bps", type=float, default=1.0)
+    replay.add_argument("--host", default="127.0.0.1")
+    replay.add_argument("--port", type=int, default=8766)
+
+    watch = commands.add_parser("watch", help="Print the top of book of a depth stream")
+    watch.add_argument("--url", default=BINANCE_STREAM_URL)
+    watch.add_argument("-p", "--pairs", nargs="+", required=True)
+    watch.add_argument("--interval", type=float, default=1.0, help="Seconds between prints")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "replay":
+        from freqtrade.configuration import TimeRange
+        from mhm.ohlcv_store import load_data
+
+        candles = load_data(Path(args.datadir), args.timeframe, args.pairs,
+                            data_format=args.data_format,
+                            timerange=TimeRange.parse_timerange(args.timerange))
+        server = BookReplayServer(candles, args.timeframe, args.speed, args.ticks, args.host,
+                                  args.port, spread_bps=args.spread_bps)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    cache = OrderBookCache(ttl=args.interval)
+    books = OrderBookStream(args.url, cache)
+    books.watch(args.pairs)
+    books.start()
+    try:
+        while True:
+            time.sleep(args.interval)
+            for pair in args.pairs:
+                book = cache.get(pair, 1)
+                if book is not None:
+                    (bid, bid_amount), (ask, ask_amount) = book["bids"][0], book["asks"][0]
+                    print(f"{pair:<16} bid={bid:<12g} ({bid_amount:g})  ask={ask:<12g} "
+                          f"({ask_amount:g})", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        books.stop()
+
+
+if __name__ == "__main__":
+    main()
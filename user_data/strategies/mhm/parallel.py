@@ -0,0 +1,290 @@
+"""
+Parallel pair analysis
+======================
+
+Spreads ``analyze_ticker`` (indicators + entry / exit signals) for the
+whitelist over forked worker processes, for dry/live loops with many pairs.
+
+* Pairs are sharded by a stable hash, so a pair always lands on the same
+  worker. Per-pair state - streaming indicator state, the 15m merge cache -
+  lives in that worker and keeps being reused from one loop to the next instead
+  of being shipped between processes on every loop.
+* Candles travel through one ``multiprocessing.shared_memory`` block per loop
+  and the analyzed columns come back the same way; the pipes only carry
+  offsets and column layouts.
+* Results are returned keyed by pair; the caller consumes them in whitelist
+  order, so the outcome does not depend on which worker finishes first.
+
+Workers are forked from the set up strategy instance, which needs the
+``fork`` start method (Linux, i.e. the Docker image). Without it the caller
+keeps analyzing serially. ``start`` forks them once, from ``bot_start``: a
+fork copies only the calling thread, and a lock another thread held at that
+moment stays held in the child. freqtrade's own threads (API server,
+Telegram) are already running by then, but the workers only run the
+analysis, and ``logging`` re-creates its locks after a fork; the strategy's
+stream listeners start after the fork. For the same reason nothing forks
+again later: when a worker dies or stops answering, the pool is closed
+(``running`` turns False) and the caller goes back to analyzing serially.
+"""
+
+import logging
+import multiprocessing
+import zlib
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+logger = logging.getLogger(__name__)
+
+FORK_AVAILABLE: bool = "fork" in multiprocessing.get_all_start_methods()
+
+# (rows, [(column, dtype, offset)], {object column: values}, column order);
+# object columns are few and short, they travel in the pipe message instead
+_Layout = Tuple[int, List[Tuple[str, str, int]], Dict[str, list], List[str]]
+
+
+def shard_of(pair: str, workers: int) -> int:
+    return zlib.crc32(pair.encode()) % workers
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Shared-memory frames
+# ────────────────────────────────────────────────────────────────────────────────
+
+def _column_array(series: pd.Series) -> Tuple[Optional[np.ndarray], str]:
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return series.array.asi8, f"tz:{dtype.unit}:{dtype.tz}"
+    if dtype.kind in "biufM":
+        return np.ascontiguousarray(series.to_numpy()), dtype.str
+    return None, ""
+
+
+def frames_nbytes(frames: Iterable[DataFrame]) -> int:
+    total = 0
+    for frame in frames:
+        for _, series in frame.items():
+            array, _ = _column_array(series)
+            if array is not None:
+                total += -(-array.nbytes // 8) * 8
+    return max(total, 8)
+
+
+def write_frame(buf: memoryview, offset: int, frame: DataFrame) -> Tuple[_Layout, int]:
+    """Copy ``frame`` into ``buf`` at ``offset``; returns its layout and the next offset."""
+    columns, extras = [], {}
+    for name, series in frame.items():
+        array, dtype = _column_array(series)
+        if array is None:
+            extras[name] = series.tolist()
+            continue
+        np.frombuffer(buf, dtype=array.dtype, count=len(array), offset=offset)[:] = array
+        columns.append((name, dtype, offset))
+        offset += -(-array.nbytes // 8) * 8
+    return (len(frame), columns, extras, list(frame.columns)), offset
+
+
+def read_frame(buf: memoryview, layout: _Layout) -> DataFrame:
+    """DataFrame copied out of ``buf`` (the block can be released afterwards)."""
+    rows, columns, extras, order = layout
+    data: Dict[str, Any] = dict(extras)
+    for name, dtype, offset in columns:
+        if dtype.startswith("tz:"):
+            _, unit, tz = dtype.split(":", 2)
+            values = np.frombuffer(buf, dtype=np.int64, count=rows, offset=offset).copy()
+            data[name] = pd.DatetimeIndex(values.view(f"M8[{unit}]")).tz_localize(tz)
+        else:
+            data[name] = np.frombuffer(buf, dtype=np.dtype(dtype), count=rows,
+                                       offset=offset).copy()
+    return DataFrame({name: data[name] for name in order}, copy=False)
+
+
+def pack(frames: Dict[Any, DataFrame]) -> Tuple[SharedMemory, Dict[Any, _Layout]]:
+    """One shared-memory block holding all ``frames``; the caller unlinks it."""
+    shm = SharedMemory(create=True, size=frames_nbytes(frames.values()))
+    layouts, offset = {}, 0
+    for key, frame in frames.items():
+        layouts[key], offset = write_frame(shm.buf, offset, frame)
+    return shm, layouts
+
+
+def unpack(shm: SharedMemory, layouts: Dict[Any, _Layout]) -> Dict[Any, DataFrame]:
+    return {key: read_frame(shm.buf, layout) for key, layout in layouts.items()}
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Workers
+# ────────────────────────────────────────────────────────────────────────────────
+
+class _ShardProvider:
+    """What ``populate_indicators`` needs from ``dp`` inside a worker: the runmode
+    and the informative candles shipped with the current loop."""
+
+    def __init__(self, runmode, whitelist: List[str]) -> None:
+        self.runmode = runmode
+        self.whitelist = whitelist
+        self.frames: Dict[Tuple[str, str], DataFrame] = {}
+
+    def current_whitelist(self) -> List[str]:
+        return self.whitelist
+
+    def get_pair_dataframe(self, pair: str, timeframe: Optional[str] = None,
+                           candle_type: str = "") -> DataFrame:
+        return self.frames.get((pair, timeframe), DataFrame()).copy()
+
+
+def _worker(strategy, conn, report: Optional[Callable[[], Any]],
+            receive: Optional[Callable[[Dict[str, DataFrame]], None]]) -> None:
+    provider = _ShardProvider(strategy.dp.runmode if strategy.dp else None, [])
+    strategy.dp = provider
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        shm_name, layouts = message
+        shm = SharedMemory(name=shm_name)
+        try:
+            inputs = unpack(shm, layouts)
+        finally:
+            shm.close()
+
+        results: Dict[str, DataFrame] = {}
+        errors: Dict[str, str] = {}
+        shared = {name: frame for (name, kind), frame in inputs.items() if kind == "shared"}
+        if shared and receive is not None:
+            receive(shared)
+        provider.frames = {key: frame for key, frame in inputs.items()
+                           if key[1] not in ("base", "shared")}
+        provider.whitelist = sorted({pair for pair, kind in inputs if kind == "base"})
+        for (pair, kind), frame in inputs.items():
+            if kind != "base":
+                continue
+            try:
+                results[pair] = strategy.analyze_ticker(frame, {"pair": pair})
+            except Exception as exc:   # reported back, the parent analyzes the pair itself
+                errors[pair] = repr(exc)
+
+        out, out_layouts = pack(results) if results else (None, {})
+        conn.send((out.name if out else None, out_layouts, errors,
+                   report() if report is not None else None))
+        if out is not None:
+            out.close()     # the parent unlinks it once read
+
+
+class ParallelAnalyzer:
+    """
+    :param strategy: Strategy instance to fork the workers from
+    :param workers: Number of worker processes
+    :param informative_timeframes: Informative timeframes shipped with each pair
+
+    ``report`` (set before the workers start) runs in a worker after each batch;
+    its picklable result is passed to ``on_report`` in this process. ``receive``
+    (also set before the start) gets the ``shared`` frames of a batch in the worker.
+    """
+
+    def __init__(self, strategy, workers: int, informative_timeframes: Iterable[str] = ()
+                 ) -> None:
+        self.strategy = strategy
+        self.workers = workers
+        self.informative_timeframes = tuple(informative_timeframes)
+        self._procs: List[Tuple[multiprocessing.Process, Any]] = []
+        self.report: Optional[Callable[[], Any]] = None
+        self.on_report: Optional[Callable[[Any], None]] = None
+        self.receive: Optional[Callable[[Dict[str, DataFrame]], None]] = None
+
+    def start(self) -> None:
+        if self._procs:
+            return
+        # One tracker shared with the workers: blocks they create and we unlink are
+        # then accounted for in the same place
+        resource_tracker.ensure_running()
+        ctx = multiprocessing.get_context("fork")
+        for _ in range(self.workers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, daemon=True,
+                               args=(self.strategy, child, self.report, self.receive))
+            proc.start()
+            child.close()
+            self._procs.append((proc, parent))
+
+    @property
+    def running(self) -> bool:
+        return bool(self._procs)
+
+    def close(self) -> None:
+        for proc, conn in self._procs:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self._procs = []
+
+    def analyze(self, frames: Dict[str, DataFrame],
+                informative: Dict[Tuple[str, str], DataFrame],
+                shared: Optional[Dict[str, DataFrame]] = None) -> Dict[str, DataFrame]:
+        """
+        Analyzed dataframe per pair of ``frames``. Pairs a worker failed on are
+        missing from the result (the caller analyzes them serially).
+
+        :param shared: Frames sent to every worker with pairs in this batch (``receive``)
+        """
+        if not self._procs:
+            return {}       # not started (or closed): the caller analyzes serially
+        shards: List[Dict[Tuple[str, str], DataFrame]] = [{} for _ in self._procs]
+        for pair, frame in frames.items():
+            shard = shards[shard_of(pair, len(self._procs))]
+            shard[(pair, "base")] = frame
+            for timeframe in self.informative_timeframes:
+                if (pair, timeframe) in informative:
+                    shard[(pair, timeframe)] = informative[(pair, timeframe)]
+        for shard in shards:
+            if shard:
+                shard.update({(name, "shared"): frame for name, frame in (shared or {}).items()})
+
+        blocks = []
+        try:
+            for (_, conn), shard in zip(self._procs, shards):
+                if shard:
+                    shm, layouts = pack(shard)
+                    blocks.append(shm)
+                    conn.send((shm.name, layouts))
+                else:
+                    blocks.append(None)
+
+            results: Dict[str, DataFrame] = {}
+            for (proc, conn), shm in zip(self._procs, blocks):
+                if shm is None:
+                    continue
+                if not conn.poll(60) or not proc.is_alive() and not conn.poll():
+                    raise RuntimeError(f"Analysis worker {proc.pid} did not answer")
+                name, layouts, errors, report = conn.recv()
+                if report is not None and self.on_report is not None:
+                    self.on_report(report)
+                for pair, error in errors.items():
+                    logger.warning("Parallel analysis of %s failed: %s", pair, error)
+                if name:
+                    out = SharedMemory(name=name)
+                    try:
+                        results.update(unpack(out, layouts))
+                    finally:
+                        out.close()
+                        out.unlink()
+            return results
+        except (OSError, EOFError, RuntimeError) as exc:
+            # Sin volver a hacer fork: el proceso ya tiene hilos en marcha
+            logger.warning("Parallel analysis failed (%s): workers stopped, pairs are "
+                           "analyzed serially from now on", exc)
+            self.close()
+            return {}
+        finally:
+            for shm in blocks:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
@@ -0,0 +1,256 @@
+"""
+Shared indicator registry
+=========================
+
+Strategies analyzing the same candles in one process (``freqtrade backtesting
+--strategy-list SampleStrategy MultiHorizonMomentum``, sweeps) each compute
+their own RSI(14) and MACD(12/26/9). With ``REGISTRY`` a strategy declares
+its indicators once (``indicator``) and asks the registry for them:
+
+* An indicator is identified by its function and parameters, with the talib
+  defaults filled in - ``ta.RSI(df)`` and ``ta.RSI(df, timeperiod=14)`` are
+  the same indicator. Column names stay per strategy.
+* Outputs are kept per (indicator, pair, timeframe) for the candles they were
+  computed from (row count, first / last candle); other candles are a miss and
+  replace the entry. The arrays are read-only and shared by every strategy.
+* ``functions(pair, timeframe)`` answers ``talib.abstract``-style calls
+  (``shared.RSI(dataframe)``, ``shared.MACD(dataframe)["macd"]``) through the
+  registry, for strategies that keep one readable line per indicator.
+* Lifetime is reference counted: ``acquire`` registers an owner's indicators
+  for a timeframe, ``release`` (or the owner being garbage collected) drops
+  them. Outputs are only kept while at least two owners hold the indicator -
+  a strategy running alone computes as before and keeps nothing extra.
+
+Running several strategies then costs the union of their indicators instead of
+the sum. Separate bot processes do not share anything.
+"""
+
+import threading
+import weakref
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import talib.abstract as ta
+import freqtrade.vendor.qtpylib.indicators as qtpylib
+
+
+def _typical_bollinger(dataframe: DataFrame, window: int = 20, stds: float = 2) -> DataFrame:
+    return qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=window, stds=stds)
+
+
+# Indicators that are not talib functions: name -> (function, default params, outputs)
+CUSTOM_INDICATORS: Dict[str, Tuple[Callable[..., Any], Dict[str, Any], Tuple[str, ...]]] = {
+    "BOLLINGER_TP": (_typical_bollinger, {"window": 20, "stds": 2}, ("lower", "mid", "upper")),
+}
+
+
+class Indicator(NamedTuple):
+    function: str                           # talib abstract name or CUSTOM_INDICATORS key
+    params: Tuple[Tuple[str, Any], ...]     # every parameter, defaults included
+    columns: Tuple[Tuple[str, str], ...]    # (output, dataframe column)
+
+    @property
+    def key(self) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+        return self.function, self.params
+
+
+@lru_cache(maxsize=None)
+def _signature(function: str) -> Tuple[Tuple[Tuple[str, Any], ...], Tuple[str, ...]]:
+    """Default parameters and output names of ``function``."""
+    if function in CUSTOM_INDICATORS:
+        _, defaults, outputs = CUSTOM_INDICATORS[function]
+        return tuple(defaults.items()), outputs
+    info = ta.Function(function)
+    return tuple(info.parameters.items()), tuple(info.output_names)
+
+
+def indicator(function: str, columns: Union[str, Dict[str, str]], **params) -> Indicator:
+    """
+    Declare an indicator: ``indicator("RSI", "rsi")``,
+    ``indicator("STOCHF", {"fastk": "fastk", "fastd": "fastd"})``.
+
+    :param columns: Column name of a single-output function, or output -> column
+    :param params: Non-default parameters
+    """
+    defaults, outputs = _signature(function)
+    unknown = set(params) - {name for name, _ in defaults}
+    if unknown:
+        raise ValueError(f"Unknown {function} parameters: {sorted(unknown)}")
+    if isinstance(columns, str):
+        if len(outputs) != 1:
+            raise ValueError(f"{function} has several outputs {outputs}, map them to columns")
+        columns = {outputs[0]: columns}
+    missing = set(columns) - set(outputs)
+    if missing:
+        raise ValueError(f"{function} has no outputs {sorted(missing)}")
+    return Indicator(function, tuple((name, params.get(name, default)) for name, default in defaults),
+                     tuple(columns.items()))
+
+
+def _compute(item: Indicator, dataframe: DataFrame) -> Dict[str, np.ndarray]:
+    params = dict(item.params)
+    if item.function in CUSTOM_INDICATORS:
+        function, _, outputs = CUSTOM_INDICATORS[item.function]
+        result = function(dataframe, **params)
+    else:
+        result = getattr(ta, item.function)(dataframe, **params)
+        outputs = _signature(item.function)[1]
+    if isinstance(result, pd.Series) or isinstance(result, np.ndarray):
+        return {outputs[0]: np.asarray(result, dtype=np.float64)}
+    return {name: result[name].to_numpy(dtype=np.float64) for name in outputs}
+
+
+def _fingerprint(dataframe: DataFrame) -> Tuple:
+    """Identifies the candles of a pair: row count, first date, last candle."""
+    dates = dataframe["date"]
+    return (len(dataframe), dates.iat[0], dates.iat[-1],
+            float(dataframe["close"].iat[-1]), float(dataframe["volume"].iat[-1]))
+
+
+class IndicatorRegistry:
+    """Indicator outputs shared by the strategies of one process (see module doc)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        # (indicator key, timeframe) -> number of owners holding it
+        self._refs: Dict[Tuple, int] = {}
+        self._owners: Dict[int, List[Tuple]] = {}
+        # (indicator key, timeframe) -> pair -> (candle fingerprint, outputs)
+        self._outputs: Dict[Tuple, Dict[str, Tuple[Tuple, Dict[str, np.ndarray]]]] = {}
+        self.hits = 0
+        self.computations = 0
+
+    # ------------------------------------------------------------------
+    # Reference counting
+    # ------------------------------------------------------------------
+    def acquire(self, owner: object, timeframe: str, indicators: Iterable[Indicator]) -> None:
+        """Keep the outputs of ``indicators`` on ``timeframe`` while ``owner`` holds them."""
+        refs = list(dict.fromkeys((item.key, timeframe) for item in indicators))
+        with self._lock:
+            if id(owner) not in self._owners:
+                self._owners[id(owner)] = []
+                weakref.finalize(owner, self._release_id, id(owner))
+            held = self._owners[id(owner)]
+            for ref in refs:
+                if ref not in held:
+                    held.append(ref)
+                    self._refs[ref] = self._refs.get(ref, 0) + 1
+
+    def release(self, owner: object) -> None:
+        self._release_id(id(owner))
+
+    def _release_id(self, owner_id: int) -> None:
+        with self._lock:
+            for ref in self._owners.pop(owner_id, []):
+                self._refs[ref] -= 1
+                if self._refs[ref] < 2:
+                    self._outputs.pop(ref, None)
+                if not self._refs[ref]:
+                    del self._refs[ref]
+
+    def held(self) -> Dict[Tuple, int]:
+        """Owners per (indicator key, timeframe)."""
+        with self._lock:
+            return dict(self._refs)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def populate(self, dataframe: DataFrame, pair: str, timeframe: str,
+                 indicators: Iterable[Indicator]) -> DataFrame:
+        """Add the columns of ``indicators`` to the candles of ``pair`` / ``timeframe``."""
+        fingerprint = _fingerprint(dataframe) if len(dataframe) else None
+        columns: Dict[str, np.ndarray] = {}
+        for item in indicators:
+            outputs = self.compute(item, dataframe, pair, timeframe, fingerprint)
+            for output, column in item.columns:
+                columns[column] = outputs[output]
+        for column, values in columns.items():
+            dataframe[column] = values
+        return dataframe
+
+    def compute(self, item: Indicator, dataframe: DataFrame, pair: str, timeframe: str,
+                fingerprint: Optional[Tuple] = None) -> Dict[str, np.ndarray]:
+        """Outputs of ``item`` on the candles of ``pair`` / ``timeframe`` (read-only arrays)."""
+        if fingerprint is None and len(dataframe):
+            fingerprint = _fingerprint(dataframe)
+        outputs = self._lookup(item, pair, timeframe, fingerprint)
+        if outputs is None:
+            outputs = _compute(item, dataframe)
+            self.computations += 1
+            if fingerprint is not None:
+                self._keep(item, pair, timeframe, fingerprint, outputs)
+        return outputs
+
+    def functions(self, pair: str, timeframe: str) -> "SharedFunctions":
+        """``talib.abstract`` stand-in for the candles of ``pair`` / ``timeframe``."""
+        return SharedFunctions(self, pair, timeframe)
+
+    def publish(self, dataframe: DataFrame, pair: str, timeframe: str,
+                indicators: Iterable[Indicator]) -> None:
+        """Offer columns computed elsewhere (e.g. ``FeatureCache``) to the other owners."""
+        if dataframe.empty:
+            return
+        fingerprint = _fingerprint(dataframe)
+        for item in indicators:
+            if self._lookup(item, pair, timeframe, fingerprint, count=False) is None:
+                self._keep(item, pair, timeframe, fingerprint,
+                           {output: dataframe[column].to_numpy(dtype=np.float64, copy=True)
+                            for output, column in item.columns})
+
+    def _lookup(self, item: Indicator, pair: str, timeframe: str, fingerprint: Tuple,
+                count: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        with self._lock:
+            entry = self._outputs.get((item.key, timeframe), {}).get(pair)
+        if entry is None or fingerprint is None or entry[0] != fingerprint:
+            return None
+        outputs = entry[1]
+        if any(output not in outputs for output, _ in item.columns):
+            return None     # publicado con menos salidas de las que se piden
+        if count:
+            self.hits += 1
+        return outputs
+
+    def _keep(self, item: Indicator, pair: str, timeframe: str, fingerprint: Tuple,
+              outputs: Dict[str, np.ndarray]) -> None:
+        ref = (item.key, timeframe)
+        with self._lock:
+            if self._refs.get(ref, 0) < 2:
+                return      # nadie más lo usa
+            for values in outputs.values():
+                values.flags.writeable = False
+            self._outputs.setdefault(ref, {})[pair] = (fingerprint, outputs)
+
+
+class SharedFunctions:
+    """
+    Calls like ``talib.abstract`` (and ``CUSTOM_INDICATORS``) answered through a
+    registry: a Series for single-output functions, a DataFrame of the outputs
+    otherwise. Parameters not given take the talib defaults, as in ``indicator``.
+    """
+
+    def __init__(self, registry: IndicatorRegistry, pair: str, timeframe: str) -> None:
+        self._registry = registry
+        self._pair = pair
+        self._timeframe = timeframe
+
+    def __getattr__(self, function: str) -> Callable[..., Union[pd.Series, DataFrame]]:
+        if function.startswith("_"):
+            raise AttributeError(function)
+        outputs = _signature(function)[1]
+
+        def call(dataframe: DataFrame, **params) -> Union[pd.Series, DataFrame]:
+            item = indicator(function, {name: name for name in outputs}, **params)
+            values = self._registry.compute(item, dataframe, self._pair, self._timeframe)
+            if len(outputs) == 1:
+                return pd.Series(values[outputs[0]], index=dataframe.index, name=outputs[0])
+            return DataFrame(values, index=dataframe.index, columns=list(outputs))
+        return call
+
+
+# Process-wide registry the strategies share
+REGISTRY = IndicatorRegistry()
@@ -0,0 +1,314 @@
+"""
+Higher timeframes from 1m
+=========================
+
+The 15m / 1h / 4h / 1d candles are plain aggregates of the 1m ones, yet they
+are downloaded separately and, in dry/live, fetched again for every pair
+through ``informative_pairs``. ``Resampler`` builds them from the base
+candles instead, incrementally: each update only folds in the base candles
+newer than the last one it consumed, keeps the bar still being formed open
+and closes it once its last base candle (or a later one) has arrived. The
+higher timeframes then always agree with the 1m series they come from.
+
+``ResampledDataProvider`` wraps the strategy's ``dp`` and answers
+``get_pair_dataframe`` for the resampled timeframes (closed bars only, like
+the exchange data it replaces); anything else goes to the wrapped provider.
+The first request for a pair seeds it from the local base-timeframe candles
+(``history_loader``), far enough back for the startup candles of the higher
+timeframes - the bot's own 1m window is much shorter than that.
+
+Derive the higher-timeframe files from the 1m ones instead of downloading them
+(from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.resample \\
+        --datadir user_data/data/binance --timeframes 15m 1h 4h 1d
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.enums import RunMode
+from freqtrade.exchange import timeframe_to_msecs, timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+OHLCV = ("open", "high", "low", "close", "volume")
+
+
+def _bar_ns(timeframe: str, base_ns: Optional[int] = None) -> int:
+    if timeframe[-1] in "wM":
+        raise ValueError(f"{timeframe} bars are not aligned to the epoch, cannot resample")
+    bar_ns = timeframe_to_msecs(timeframe) * 10**6
+    if base_ns is not None and (bar_ns <= base_ns or bar_ns % base_ns):
+        raise ValueError(f"{timeframe} is not a multiple of the base timeframe")
+    return bar_ns
+
+
+def _aggregate(dates: np.ndarray, values: np.ndarray, bar_ns: int
+               ) -> Tuple[np.ndarray, np.ndarray]:
+    """Bar open dates and OHLCV of the base candles ``dates`` / ``values`` (int64 ns, (n, 5))."""
+    keys = dates - dates % bar_ns
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    bars = np.column_stack((
+        values[starts, 0],
+        np.maximum.reduceat(values[:, 1], starts),
+        np.minimum.reduceat(values[:, 2], starts),
+        values[ends, 3],
+        np.add.reduceat(values[:, 4], starts),
+    ))
+    return keys[starts], bars
+
+
+def resample_ohlcv(candles: DataFrame, timeframe: str) -> DataFrame:
+    """
+    Aggregate ``candles`` into ``timeframe`` bars (epoch aligned, like the
+    exchange), including the last bar even when incomplete.
+    """
+    if candles.empty:
+        return DataFrame(columns=["date", *OHLCV])
+    dates = candles["date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    values = np.column_stack([candles[col].to_numpy(dtype=np.float64) for col in OHLCV])
+    bar_dates, bars = _aggregate(dates, values, _bar_ns(timeframe))
+    return _frame(bar_dates, bars, candles["date"].dtype)
+
+
+def _frame(dates: np.ndarray, bars: np.ndarray, dtype) -> DataFrame:
+    frame = DataFrame(bars, columns=list(OHLCV))
+    frame.insert(0, "date", pd.to_datetime(dates, unit="ns", utc=True).astype(dtype))
+    return frame
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Incremental resampler
+# ────────────────────────────────────────────────────────────────────────────────
+
+class _Bars:
+    __slots__ = ("dates", "values", "open_date", "open_values")
+
+    def __init__(self) -> None:
+        self.dates = np.empty(0, dtype=np.int64)          # closed bars, open date in ns
+        self.values = np.empty((0, len(OHLCV)))
+        self.open_date: Optional[int] = None              # bar still being formed
+        self.open_values: Optional[np.ndarray] = None
+
+    def add(self, dates: np.ndarray, values: np.ndarray, bar_ns: int, base_ns: int,
+            max_bars: Optional[int]) -> None:
+        bar_dates, bars = _aggregate(dates, values, bar_ns)
+        if self.open_date is not None:
+            if bar_dates[0] == self.open_date:
+                prev = self.open_values
+                bars[0] = (prev[0], max(prev[1], bars[0, 1]), min(prev[2], bars[0, 2]),
+                           bars[0, 3], prev[4] + bars[0, 4])
+            else:
+                # A base candle of a later bar arrived: the open one is done
+                bar_dates = np.r_[self.open_date, bar_dates]
+                bars = np.vstack((self.open_values, bars))
+
+        complete = dates[-1] + base_ns >= bar_dates[-1] + bar_ns
+        closed = len(bar_dates) if complete else len(bar_dates) - 1
+        self.open_date = None if complete else int(bar_dates[-1])
+        self.open_values = None if complete else bars[-1]
+        if closed:
+            self.dates = np.r_[self.dates, bar_dates[:closed]]
+            self.values = np.vstack((self.values, bars[:closed]))
+            if max_bars is not None and len(self.dates) > max_bars:
+                self.dates = self.dates[-max_bars:]
+                self.values = self.values[-max_bars:]
+
+
+class Resampler:
+    """
+    Per-pair ``timeframes`` bars built from base candles fed through ``update``.
+
+    :param base_timeframe: Timeframe of the candles fed in
+    :param timeframes: Higher timeframes to build (multiples of the base one)
+    :param max_bars: Closed bars kept per pair and timeframe (None: all)
+    """
+
+    def __init__(self, base_timeframe: str, timeframes: Iterable[str],
+                 max_bars: Optional[int] = None) -> None:
+        self.base_timeframe = base_timeframe
+        self._base_ns = _bar_ns(base_timeframe)
+        self.timeframes = {tf: _bar_ns(tf, self._base_ns) for tf in timeframes}
+        self.max_bars = max_bars
+        self._pairs: Dict[str, Dict[str, _Bars]] = {}
+        self._last: Dict[str, int] = {}
+        self._dtype: Dict[str, object] = {}
+
+    def __contains__(self, pair: str) -> bool:
+        return pair in self._last
+
+    def update(self, pair: str, candles: DataFrame) -> int:
+        """Fold in the candles of ``pair`` newer than the last one consumed; returns how many."""
+        if candles.empty:
+            return 0
+        dates = candles["date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        last = self._last.get(pair)
+        start = 0 if last is None else int(np.searchsorted(dates, last, side="right"))
+        if start >= len(dates):
+            return 0
+
+        dates = dates[start:]
+        values = np.column_stack([candles[col].to_numpy(dtype=np.float64)[start:]
+                                  for col in OHLCV])
+        series = self._pairs.setdefault(pair, {tf: _Bars() for tf in self.timeframes})
+        for timeframe, bar_ns in self.timeframes.items():
+            series[timeframe].add(dates, values, bar_ns, self._base_ns, self.max_bars)
+        self._last[pair] = int(dates[-1])
+        self._dtype.setdefault(pair, candles["date"].dtype)
+        return len(dates)
+
+    def dataframe(self, pair: str, timeframe: str, include_open: bool = False,
+                  until: Optional[int] = None) -> DataFrame:
+        """
+        Bars of ``pair``.
+
+        :param include_open: Append the bar still being formed
+        :param until: Only bars closed by the base candle opening at this date (ns)
+        """
+        bars = self._pairs.get(pair, {}).get(timeframe)
+        if bars is None:
+            return DataFrame(columns=["date", *OHLCV])
+        dates, values = bars.dates, bars.values
+        if include_open and bars.open_date is not None:
+            dates = np.r_[dates, bars.open_date]
+            values = np.vstack((values, bars.open_values))
+        if until is not None:
+            bar_ns = self.timeframes[timeframe]
+            dates = dates[:np.searchsorted(dates + bar_ns, until + self._base_ns, side="right")]
+            values = values[:len(dates)]
+        return _frame(dates, values, self._dtype[pair])
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# DataProvider
+# ────────────────────────────────────────────────────────────────────────────────
+
+def history_loader(config: dict, dp, base_timeframe: str, timeframes: Iterable[str]
+                   ) -> Callable[[str], DataFrame]:
+    """
+    Local ``base_timeframe`` candles of a pair (``config["datadir"]``), reaching
+    back to the startup candles of ``timeframes`` before the backtest timerange,
+    or before now in dry/live.
+    """
+    from freqtrade.configuration import TimeRange
+    from freqtrade.data.history import load_pair_history
+
+    from mhm.ohlcv_store import datahandler
+
+    reach = max(timeframe_to_seconds(tf) * dp.get_required_startup(tf) for tf in timeframes)
+    if dp.runmode in (RunMode.BACKTEST, RunMode.HYPEROPT):
+        timerange = TimeRange.parse_timerange(config.get("timerange"))
+        timerange.subtract_start(reach)
+    else:
+        timerange = TimeRange("date", None, int(time.time()) - reach, 0)
+    handler = datahandler(Path(config["datadir"]), config.get("dataformat_ohlcv", "feather"))
+
+    def load(pair: str) -> DataFrame:
+        return load_pair_history(pair=pair, timeframe=base_timeframe, datadir=Path(config["datadir"]),
+                                 timerange=timerange, data_handler=handler,
+                                 candle_type=config.get("candle_type_def", "spot"))
+    return load
+
+
+class ResampledDataProvider:
+    """
+    Strategy ``dp`` serving ``timeframes`` from the base candles of each pair;
+    every other call goes to the wrapped ``DataProvider``.
+
+    :param history: Seeds a pair the first time it is requested (``history_loader``)
+    :param max_bars: Closed bars kept per pair and timeframe (None: all)
+    """
+
+    def __init__(self, dp, base_timeframe: str, timeframes: Iterable[str],
+                 history: Optional[Callable[[str], DataFrame]] = None,
+                 max_bars: Optional[int] = None) -> None:
+        self._dp = dp
+        self.resampler = Resampler(base_timeframe, timeframes, max_bars)
+        self._history = history
+
+    def __getattr__(self, name: str):
+        # Solo llega aquí lo que no existe; al deserializar (workers de hyperopt) ni
+        # _dp existe todavía, y pickle busca __setstate__ & co.: no reenviarlos
+        if name == "_dp" or (name.startswith("__") and name.endswith("__")):
+            raise AttributeError(name)
+        return getattr(self._dp, name)
+
+    def get_pair_dataframe(self, pair: str, timeframe: Optional[str] = None,
+                           candle_type: str = "") -> DataFrame:
+        resampler = self.resampler
+        if timeframe not in resampler.timeframes:
+            return self._dp.get_pair_dataframe(pair, timeframe, candle_type)
+
+        if pair not in resampler and self._history is not None:
+            seeded = resampler.update(pair, self._history(pair))
+            if not seeded:
+                logger.warning("No local %s candles for %s: %s bars start with the bot's own "
+                               "window", resampler.base_timeframe, pair, timeframe)
+        base = self._dp.get_pair_dataframe(pair, resampler.base_timeframe, candle_type)
+        resampler.update(pair, base)
+        if pair not in resampler:
+            return self._dp.get_pair_dataframe(pair, timeframe, candle_type)
+        # Backtest callbacks only get the base candles up to the current one: same cut here
+        until = base["date"].iat[-1].value if not base.empty else None
+        return resampler.dataframe(pair, timeframe, until=until)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Derived files
+# ────────────────────────────────────────────────────────────────────────────────
+
+def derive(datadir: Path, timeframes: List[str], base_timeframe: str = "1m",
+           data_format: str = "json", pairs: Optional[List[str]] = None
+           ) -> List[Tuple[str, str, int]]:
+    """
+    Write the ``timeframes`` candle files of every pair with ``base_timeframe``
+    data in ``datadir``. Returns ``(pair, timeframe, bars)`` per written file.
+    """
+    from freqtrade.enums import TradingMode
+
+    from mhm.ohlcv_store import datahandler
+
+    handler = datahandler(Path(datadir), data_format)
+    written = []
+    for pair, timeframe, candle_type in handler.ohlcv_get_available_data(Path(datadir),
+                                                                         TradingMode.SPOT):
+        if timeframe != base_timeframe or (pairs and pair not in pairs):
+            continue
+        candles = handler.ohlcv_load(pair, timeframe, candle_type, fill_missing=False,
+                                     warn_no_data=False)
+        resampler = Resampler(base_timeframe, timeframes)
+        resampler.update(pair, candles)
+        for target in timeframes:
+            bars = resampler.dataframe(pair, target)
+            handler.ohlcv_store(pair, target, bars, candle_type)
+            written.append((pair, target, len(bars)))
+            logger.info("%s %s: %d bars", pair, target, len(bars))
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Derive higher-timeframe candles from 1m")
+    parser.add_argument("--datadir", default="user_data/data/binance")
+    parser.add_argument("--data-format", default="json")
+    parser.add_argument("--timeframes", nargs="+", default=["15m", "1h", "4h", "1d"])
+    parser.add_argument("--base-timeframe", default="1m")
+    parser.add_argument("-p", "--pairs", nargs="+")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    written = derive(Path(args.datadir), args.timeframes, args.base_timeframe, args.data_format,
+                     args.pairs)
+    print(f"Wrote {len(written)} file(s), {sum(n for _, _, n in written)} bars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Backtest results catalog
+========================
+
+SQLite index over ``user_data/backtest_results``. Every
+``backtest-result-*.zip`` (or legacy ``.json``) is read once; per strategy
+run the catalog keeps
+
+* ``runs``      - summary metrics, timerange, pairs and parameters (the
+  strategy's upper-case class constants, read from the strategy source
+  freqtrade stores in the zip, plus stoploss / ROI / fee);
+* ``run_pairs`` - the per-pair rows of ``results_per_pair``;
+* ``trades``    - one row per trade.
+
+``sync`` is incremental: a file is only (re)indexed when its size or mtime
+changed, and rows of deleted files are dropped. ``query`` syncs first, so new
+results show up without a separate step.
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.results_catalog query \\
+        --pair BTC/USDT --timeframe 1m --min-pf 1 --sort profit_total_abs
+    PYTHONPATH=user_data/strategies python -m mhm.results_catalog sql \\
+        "SELECT exit_reason, COUNT(*), SUM(profit_abs) FROM trades GROUP BY 1"
+"""
+
+import argparse
+import ast
+import json
+import logging
+import sqlite3
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from pandas import DataFrame
+
+logger = logging.getLogger(__name__)
+
+CATALOG_NAME = "catalog.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file TEXT PRIMARY KEY, size INTEGER, mtime REAL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    file TEXT, strategy TEXT, run_start_ts INTEGER,
+    timeframe TEXT, timeframe_detail TEXT, timerange TEXT,
+    backtest_start_ts INTEGER, backtest_end_ts INTEGER, pairs TEXT,
+    stake_currency TEXT, stake_amount TEXT, starting_balance REAL, max_open_trades INTEGER,
+    total_trades INTEGER, wins INTEGER, draws INTEGER, losses INTEGER, winrate REAL,
+    profit_total REAL, profit_total_abs REAL, profit_mean REAL, profit_factor REAL,
+    expectancy REAL, max_drawdown_account REAL, max_drawdown_abs REAL,
+    sharpe REAL, sortino REAL, calmar REAL, cagr REAL, trades_per_day REAL,
+    params TEXT,
+    PRIMARY KEY (file, strategy)
+);
+CREATE TABLE IF NOT EXISTS run_pairs (
+    file TEXT, strategy TEXT, pair TEXT,
+    trades INTEGER, wins INTEGER, draws INTEGER, losses INTEGER, winrate REAL,
+    profit_total REAL, profit_total_abs REAL, profit_mean REAL, profit_factor REAL,
+    max_drawdown_account REAL,
+    PRIMARY KEY (file, strategy, pair)
+);
+CREATE TABLE IF NOT EXISTS trades (
+    file TEXT, strategy TEXT, pair TEXT, is_short INTEGER, leverage REAL,
+    open_ts INTEGER, close_ts INTEGER, open_rate REAL, close_rate REAL, amount REAL,
+    stake_amount REAL, fee_open REAL, fee_close REAL, min_rate REAL, max_rate REAL,
+    profit_ratio REAL, profit_abs REAL, exit_reason TEXT, enter_tag TEXT,
+    trade_duration INTEGER, is_open INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_timeframe ON runs (timeframe, profit_factor);
+CREATE INDEX IF NOT EXISTS run_pairs_pair ON run_pairs (pair, profit_factor);
+CREATE INDEX IF NOT EXISTS trades_run ON trades (file, strategy);
+CREATE INDEX IF NOT EXISTS trades_pair ON trades (pair, close_ts);
+"""
+
+_RUN_METRICS = (
+    "total_trades", "wins", "draws", "losses", "winrate", "profit_total", "profit_total_abs",
+    "profit_mean", "profit_factor", "expectancy", "max_drawdown_account", "max_drawdown_abs",
+    "sharpe", "sortino", "calmar", "cagr", "trades_per_day",
+)
+_PAIR_METRICS = (
+    "trades", "wins", "draws", "losses", "winrate", "profit_total", "profit_total_abs",
+    "profit_mean", "profit_factor", "max_drawdown_account",
+)
+_TRADE_COLUMNS = (
+    "pair", "is_short", "leverage", "open_timestamp", "close_timestamp", "open_rate",
+    "close_rate", "amount", "stake_amount", "fee_open", "fee_close", "min_rate", "max_rate",
+    "profit_ratio", "profit_abs", "exit_reason", "enter_tag", "trade_duration", "is_open",
+)
+
+
+def connect(results_dir: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(Path(results_dir) / CATALOG_NAME)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Indexing
+# ────────────────────────────────────────────────────────────────────────────────
+
+def result_files(results_dir: Path) -> Iterator[Path]:
+    for path in sorted(Path(results_dir).glob("backtest-result-*")):
+        if path.suffix == ".zip" or (path.suffix == ".json" and not path.name.endswith(
+                (".meta.json", "_config.json"))):
+            yield path
+
+
+def sync(conn: sqlite3.Connection, results_dir: Path) -> Tuple[int, int]:
+    """Index new / changed result files, forget deleted ones. Returns (indexed, removed)."""
+    known = {file: (size, mtime) for file, size, mtime in conn.execute("SELECT * FROM files")}
+    present = set()
+    indexed = 0
+    for path in result_files(results_dir):
+        stat = path.stat()
+        present.add(path.name)
+        if known.get(path.name) == (stat.st_size, stat.st_mtime):
+            continue
+        try:
+            content, source = _read_result(path)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as exc:
+            logger.warning("Skipping %s: %s", path.name, exc)
+            continue
+        with conn:
+            _forget(conn, path.name)
+            for strategy, result in content.get("strategy", {}).items():
+                _insert_run(conn, path.name, strategy, result, source.get(strategy))
+            conn.execute("INSERT INTO files VALUES (?, ?, ?)",
+                         (path.name, stat.st_size, stat.st_mtime))
+        indexed += 1
+
+    removed = [file for file in known if file not in present]
+    with conn:
+        for file in removed:
+            _forget(conn, file)
+    return indexed, len(removed)
+
+
+def _forget(conn: sqlite3.Connection, file: str) -> None:
+    for table in ("files", "runs", "run_pairs", "trades"):
+        conn.execute(f"DELETE FROM {table} WHERE file = ?", (file,))
+
+
+def _read_result(path: Path) -> Tuple[Dict, Dict[str, str]]:
+    """Result JSON and the strategy sources stored next to it (zip only)."""
+    if path.suffix != ".zip":
+        return json.loads(path.read_text()), {}
+    with zipfile.ZipFile(path) as archive:
+        content = json.loads(archive.read(f"{path.stem}.json"))
+        source = {}
+        for name in archive.namelist():
+            if name.endswith(".py"):
+                strategy = name[len(path.stem) + 1:-3]
+                source[strategy] = archive.read(name).decode("utf-8", errors="replace")
+    return content, source
+
+
+def _insert_run(conn: sqlite3.Connection, file: str, strategy: str, result: Dict,
+                source: Optional[str]) -> None:
+    params = strategy_constants(source, strategy) if source else {}
+    params.update(stoploss=result.get("stoploss"), minimal_roi=result.get("minimal_roi"),
+                  use_custom_stoploss=result.get("use_custom_stoploss"),
+                  trailing_stop=result.get("trailing_stop"))
+    trades = result.get("trades", [])
+    if trades:
+        params["fee"] = trades[0].get("fee_open")
+
+    conn.execute(
+        f"INSERT INTO runs VALUES ({', '.join('?' * (12 + len(_RUN_METRICS) + 2))})",
+        (file, strategy, _ms(result.get("backtest_run_start_ts")), result.get("timeframe"),
+         result.get("timeframe_detail"), result.get("timerange"),
+         result.get("backtest_start_ts"), result.get("backtest_end_ts"),
+         json.dumps(result.get("pairlist", [])), result.get("stake_currency"),
+         str(result.get("stake_amount")), result.get("starting_balance"),
+         result.get("max_open_trades"),
+         *(_number(result.get(key)) for key in _RUN_METRICS),
+         json.dumps(params, default=str)),
+    )
+    conn.executemany(
+        f"INSERT OR REPLACE INTO run_pairs VALUES ({', '.join('?' * (3 + len(_PAIR_METRICS)))})",
+        [(file, strategy, row["key"], *(_number(row.get(key)) for key in _PAIR_METRICS))
+         for row in result.get("results_per_pair", []) if row.get("key") != "TOTAL"],
+    )
+    conn.executemany(
+        f"INSERT INTO trades VALUES ({', '.join('?' * (2 + len(_TRADE_COLUMNS)))})",
+        [(file, strategy, *(trade.get(key) for key in _TRADE_COLUMNS)) for trade in trades],
+    )
+
+
+def _ms(seconds: Optional[float]) -> Optional[int]:
+    return None if seconds is None else int(seconds * 1000)
+
+
+def _number(value: Any) -> Any:
+    # freqtrade writes a few metrics as formatted strings (e.g. max_drawdown_abs)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return value
+
+
+def strategy_constants(source: str, strategy: str) -> Dict[str, Any]:
+    """
+    Upper-case literal class attributes of ``strategy`` (ENTRY_RSI_MIN, ATR_TP_MULT, ...);
+    for hyperopt parameters (``IntParameter(50, 70, default=60)``) their default.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {}
+    constants: Dict[str, Any] = {}
+    for node in tree.body:
+        if not (isinstance(node, ast.ClassDef) and node.name == strategy):
+            continue
+        for stmt in node.body:
+            if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+                target, value = stmt.targets[0], stmt.value
+            elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+                target, value = stmt.target, stmt.value
+            else:
+                continue
+            if isinstance(target, ast.Name) and target.id.isupper():
+                if isinstance(value, ast.Call):
+                    value = next((kw.value for kw in value.keywords if kw.arg == "default"),
+                                 value)
+                try:
+                    constants[target.id] = ast.literal_eval(value)
+                except ValueError:
+                    pass
+    return constants
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Queries
+# ────────────────────────────────────────────────────────────────────────────────
+
+def sort_keys(pair: Optional[str] = None) -> Tuple[str, ...]:
+    """Columns ``query`` can sort by: the run metrics, or the pair's with ``pair``."""
+    metrics = ("trades", *_PAIR_METRICS[1:]) if pair else _RUN_METRICS
+    return (*metrics, "run_start_ts", "timerange")
+
+
+def query(conn: sqlite3.Connection, pair: Optional[str] = None, timeframe: Optional[str] = None,
+          strategy: Optional[str] = None, min_profit_factor: Optional[float] = None,
+          min_trades: Optional[int] = None, sort: str = "profit_total_abs",
+          limit: Optional[int] = 50) -> DataFrame:
+    """
+    Runs matching the filters, best ``sort`` first. With ``pair`` the metrics
+    (profit, profit factor, trades, ...) are that pair's.
+    """
+    metrics = ("trades", *_PAIR_METRICS[1:]) if pair else _RUN_METRICS
+    if sort not in sort_keys(pair):
+        raise ValueError(f"Cannot sort by {sort!r}, use one of: {', '.join(sort_keys(pair))}")
+    source = "runs r JOIN run_pairs m USING (file, strategy)" if pair else "runs r"
+    prefix = "m." if pair else "r."
+    where, args = [], []
+    for clause, value in (("m.pair = ?", pair), ("r.timeframe = ?", timeframe),
+                          ("r.strategy = ?", strategy),
+                          (f"{prefix}profit_factor > ?", min_profit_factor),
+                          (f"{prefix}{'trades' if pair else 'total_trades'} >= ?", min_trades)):
+        if value is not None:
+            where.append(clause)
+            args.append(value)
+
+    columns = ", ".join(
+        ["r.file", "r.strategy", "r.timeframe", "r.timerange"]
+        + (["m.pair"] if pair else [])
+        + [f"{prefix}{col}" for col in metrics] + ["r.params"])
+    sql = (f"SELECT {columns} FROM {source}"
+           + (f" WHERE {' AND '.join(where)}" if where else "")
+           + f" ORDER BY {prefix if sort in metrics else 'r.'}{sort} DESC"
+           + (f" LIMIT {int(limit)}" if limit else ""))
+    return pd.read_sql_query(sql, conn, params=args)
+
+
+def run_trades(conn: sqlite3.Connection, file: str, strategy: Optional[str] = None) -> DataFrame:
+    sql = "SELECT * FROM trades WHERE file = ?" + (" AND strategy = ?" if strategy else "")
+    return pd.read_sql_query(sql, conn, params=[file, strategy] if strategy else [file])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Index and query freqtrade backtest results")
+    parser.add_argument("--results-dir", default="user_data/backtest_results")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("sync", help="Index new / changed result files")
+
+    find = commands.add_parser("query", help="List runs matching the filters")
+    find.add_argument("-p", "--pair")
+    find.add_argument("--timeframe")
+    find.add_argument("-s", "--strategy")
+    find.add_argument("--min-pf", type=float, help="Profit factor strictly above")
+    find.add_argument("--min-trades", type=int)
+    find.add_argument("--sort", default="profit_total_abs")
+    find.add_argument("--limit", type=int, default=50)
+    find.add_argument("--params", action="store_true", help="Show the run parameters")
+
+    show = commands.add_parser("trades", help="Trades of one result file")
+    show.add_argument("file")
+    show.add_argument("-s", "--strategy")
+
+    raw = commands.add_parser("sql", help="Run a SQL statement against the catalog")
+    raw.add_argument("statement")
+
+    for sub in (find, show, raw):
+        sub.add_argument("--no-sync", action="store_true", help="Do not index new files first")
+
+    args = parser.parse_args(argv)
+    # Antes de sincronizar: un --sort inválido no debe esperar a indexar los resultados
+    if args.command == "query" and args.sort not in sort_keys(args.pair):
+        parser.error(f"argument --sort: invalid choice {args.sort!r} "
+                     f"(choose from {', '.join(sort_keys(args.pair))})")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    conn = connect(Path(args.results_dir))
+
+    if args.command == "sync" or not args.no_sync:
+        indexed, removed = sync(conn, Path(args.results_dir))
+        if args.command == "sync" or indexed or removed:
+            logger.info("Indexed %d file(s), removed %d", indexed, removed)
+    if args.command == "sync":
+        return
+
+    if args.command == "query":
+        table = query(conn, args.pair, args.timeframe, args.strategy, args.min_pf,
+                      args.min_trades, args.sort, args.limit)
+        if not args.params:
+            table = table.drop(columns="params")
+    elif args.command == "trades":
+        table = run_trades(conn, args.file, args.strategy)
+    else:
+        table = pd.read_sql_query(args.statement, conn)
+
+    with pd.option_context("display.width", 250, "display.max_columns", 40,
+                           "display.max_rows", 1000, "display.max_colwidth", 120):
+        print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,535 @@
+"""
+Backtest service
+================
+
+Every ``test_*.sh`` script runs ``docker compose run --rm freqtrade backtesting``
+and pays, per run, for the container, the Python / talib / pandas imports, the
+exchange markets, the strategy file and the candle files - then throws them
+away. ``mhm.service`` is a long-lived process that keeps them:
+
+* candles stay in memory per (pair, timeframe, candle type) and are read from
+  disk again only when their file changes (``ResidentDataHandler``); a job
+  gets a copy of its timerange;
+* exchanges (markets, fees, precision) are loaded once per exchange and
+  trading mode;
+* a strategy file is executed again only when it changes
+  (``StrategyClasses``) - the cached class gets its hyperopt parameters back
+  to their values from the file.
+
+Jobs (strategy, pairs, timerange, fee, ...) arrive over a unix socket from
+``mhm.client``, are queued, and run one at a time on a worker thread, with
+freqtrade's ``Backtesting`` (same report and stored result as ``freqtrade
+backtesting``) or the fast backtester (``mhm.backtest``). Configuration files
+are read again for every job. The ``mhm`` package itself is imported once:
+after changing it, restart the service (jobs report it as a warning).
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.service -c user_data/config.json
+    PYTHONPATH=user_data/strategies python -m mhm.client backtest \\
+        -p BTC/USDT --timerange 20241120-20241210 --fee 0.0002 --timeframe 1m
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+from pandas import DataFrame, Series
+
+from freqtrade.commands.optimize_commands import setup_optimize_configuration
+from freqtrade.configuration import TimeRange
+from freqtrade.constants import DATETIME_PRINT_FORMAT
+from freqtrade.data import history
+from freqtrade.data.btanalysis.historic_precision import get_tick_size_over_time
+from freqtrade.data.history.datahandlers import IDataHandler
+from freqtrade.enums import BacktestState, CandleType, RunMode, TradingMode
+from freqtrade.exchange import timeframe_to_seconds
+from freqtrade.optimize.backtesting import Backtesting
+from freqtrade.resolvers import ExchangeResolver, StrategyResolver
+from freqtrade.strategy.hyper import detect_all_parameters
+
+from mhm.backtest import print_report, run, summarize
+from mhm.client import ENGINES, SOCKET_PATH
+from mhm.ohlcv_store import StoreDataProvider, datahandler, load_data
+
+logger = logging.getLogger(__name__)
+
+# Columns get_tick_size_over_time adds to the candles it is given
+_TICK_COLUMNS = ["open_count", "high_count", "low_count", "close_count", "max_count"]
+
+
+def _stamp(path: Path) -> Tuple[int, ...]:
+    """Size and mtime of a file (of every file of a directory, e.g. a memmap store)."""
+    try:
+        files = sorted(path.iterdir()) if path.is_dir() else [path]
+        return tuple(value for file in files
+                     for value in (file.stat().st_size, file.stat().st_mtime_ns))
+    except OSError:
+        return ()
+
+
+def _sources_stamp() -> Tuple[int, ...]:
+    """Stamp of the ``mhm`` package sources."""
+    return tuple(value for path in sorted(Path(__file__).parent.glob("*.py"))
+                 for value in _stamp(path))
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Resident candles
+# ────────────────────────────────────────────────────────────────────────────────
+
+class ResidentDataHandler(IDataHandler):
+    """
+    Candle frames of the ``data_format`` files of ``datadir`` kept in memory
+    (OHLCV only). A frame is read again when its file changes; loads get a copy
+    of the rows around the requested timerange, which ``ohlcv_load`` then trims
+    and cleans as usual. The price precision freqtrade infers from the loaded
+    candles (``tick_sizes``) is kept as well.
+    """
+
+    def __init__(self, datadir: Path, data_format: str) -> None:
+        super().__init__(Path(datadir))
+        self.data_format = data_format
+        self.reads = 0
+        self._source = datahandler(self._datadir, data_format)
+        self._frames: Dict[Tuple[str, str, CandleType], Tuple[Tuple[int, ...], DataFrame]] = {}
+        self._ticks: Dict[Tuple[str, str, CandleType], Tuple[Tuple, Series, DataFrame]] = {}
+
+    @classmethod
+    def _get_file_extension(cls) -> str:
+        return "resident"
+
+    @property
+    def frames(self) -> int:
+        return len(self._frames)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(int(frame.memory_usage(index=False).sum())
+                   for _, frame in list(self._frames.values()))
+
+    def _frame(self, pair: str, timeframe: str, candle_type: CandleType) -> DataFrame:
+        key = (pair, timeframe, candle_type)
+        stamp = _stamp(self._source._pair_data_filename(self._datadir, pair, timeframe,
+                                                        candle_type))
+        cached = self._frames.get(key)
+        if cached is None or cached[0] != stamp:
+            frame = self._source._ohlcv_load(pair, timeframe, None, candle_type)
+            frame = frame.sort_values("date", kind="stable", ignore_index=True)
+            cached = self._frames[key] = (stamp, frame)
+            self.reads += 1
+        return cached[1]
+
+    def _ohlcv_load(
+        self, pair: str, timeframe: str, timerange: Optional[TimeRange], candle_type: CandleType
+    ) -> DataFrame:
+        frame = self._frame(pair, timeframe, candle_type)
+        start, stop = 0, len(frame)
+        if timerange and stop:
+            # Una vela más a cada lado, como MemmapDataHandler
+            candle = timeframe_to_seconds(timeframe)
+            if timerange.starttype == "date":
+                start = frame["date"].searchsorted(
+                    pd.Timestamp(timerange.startts - candle, unit="s", tz="UTC"))
+            if timerange.stoptype == "date":
+                stop = frame["date"].searchsorted(
+                    pd.Timestamp(timerange.stopts + candle, unit="s", tz="UTC"), side="right")
+        return frame.iloc[start:stop].copy()
+
+    def tick_sizes(self, pair: str, timeframe: str, candle_type: CandleType,
+                   candles: DataFrame) -> Series:
+        """
+        ``get_tick_size_over_time(candles)`` for candles loaded through this
+        handler - formatting every price takes longer than the rest of the load,
+        so the result (and the columns it adds to ``candles``) is reused while
+        the same rows of an unchanged file come back.
+        """
+        key = (pair, timeframe, candle_type)
+        fingerprint = (self._frames[key][0] if key in self._frames else (), len(candles),
+                       candles["date"].iloc[0], candles["date"].iloc[-1])
+        cached = self._ticks.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            for column in _TICK_COLUMNS:
+                candles[column] = cached[2][column].to_numpy()
+            return cached[1].copy()
+        ticks = get_tick_size_over_time(candles)
+        self._ticks[key] = (fingerprint, ticks.copy(), candles[_TICK_COLUMNS].copy())
+        return ticks
+
+    def ohlcv_store(
+        self, pair: str, timeframe: str, data: DataFrame, candle_type: CandleType
+    ) -> None:
+        raise NotImplementedError("Resident candles are read-only")
+
+    def ohlcv_append(
+        self, pair: str, timeframe: str, data: DataFrame, candle_type: CandleType
+    ) -> None:
+        raise NotImplementedError("Resident candles are read-only")
+
+    def _trades_store(self, pair: str, data: DataFrame, trading_mode: TradingMode) -> None:
+        raise NotImplementedError("Resident candles are read-only")
+
+    def trades_append(self, pair: str, data: DataFrame):
+        raise NotImplementedError("Resident candles are read-only")
+
+    def _trades_load(
+        self, pair: str, trading_mode: TradingMode, timerange: Optional[TimeRange] = None
+    ) -> DataFrame:
+        raise NotImplementedError("Resident candles only hold OHLCV data")
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Strategy classes
+# ────────────────────────────────────────────────────────────────────────────────
+
+class _Loaded(NamedTuple):
+    stamp: Tuple[int, ...]
+    cls: type
+    source: str
+    params: Dict[str, Any]      # hyperopt parameter values right after executing the file
+
+
+class StrategyClasses:
+    """
+    Strategy classes by file. freqtrade executes the strategy file on every
+    load; here it is executed again only when the file changed. The parameter
+    objects of a class are shared by its instances, so a cached class gets
+    their values reset before it is handed out again.
+    """
+
+    def __init__(self) -> None:
+        self.loads = 0
+        self._classes: Dict[Tuple[Path, str], _Loaded] = {}
+
+    @property
+    def names(self) -> List[str]:
+        return sorted(name for _, name in self._classes)
+
+    def get(self, resolve: Callable[..., Iterator], module_path: Path,
+            object_name: str) -> Iterator[Tuple[type, str]]:
+        """
+        ``(class, source)`` of ``object_name`` in ``module_path``, like the
+        resolver's ``_get_valid_object`` (``resolve``).
+        """
+        key = (module_path, object_name)
+        stamp = _stamp(module_path)
+        loaded = self._classes.get(key)
+        if loaded is not None and loaded.stamp == stamp:
+            for name, value in loaded.params.items():
+                getattr(loaded.cls, name).value = value
+            return iter([(loaded.cls, loaded.source)])
+
+        found = next(resolve(module_path, object_name), None)
+        if found is None:
+            self._classes.pop(key, None)
+            return iter([])
+        cls, source = found
+        params = {name: param.value for space in detect_all_parameters(cls).values()
+                  for name, param in space.items()}
+        self._classes[key] = _Loaded(stamp, cls, source, params)
+        self.loads += 1
+        logger.info("%s strategy %s from %s", "Reloaded" if loaded else "Loaded", object_name,
+                    module_path.name)
+        return iter([found])
+
+
+def install_strategy_classes(classes: StrategyClasses) -> Callable[[], None]:
+    """Resolve strategies through ``classes``; returns the undo."""
+    resolve = StrategyResolver._get_valid_object
+
+    def _get_valid_object(cls, module_path: Path, object_name: Optional[str],
+                          enum_failed: bool = False) -> Iterator:
+        if object_name is None or enum_failed:
+            return resolve(module_path, object_name, enum_failed)
+        return classes.get(resolve, module_path, object_name)
+
+    StrategyResolver._get_valid_object = classmethod(_get_valid_object)
+
+    def restore() -> None:
+        if "_get_valid_object" in vars(StrategyResolver):
+            del StrategyResolver._get_valid_object
+    return restore
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Backtests
+# ────────────────────────────────────────────────────────────────────────────────
+
+class ResidentBacktesting(Backtesting):
+    """
+    freqtrade's ``Backtesting`` reading the strategy timeframe and informative
+    candles through ``data_handler`` (``timeframe_detail`` and futures rates
+    are still read from disk), without terminal progress bars.
+    """
+
+    def __init__(self, config: dict, exchange, data_handler: ResidentDataHandler) -> None:
+        super().__init__(config, exchange, progress_callback=lambda task: None)
+        self._data_handler = data_handler
+        self.dataprovider = StoreDataProvider(self.config, self.exchange, self.pairlists,
+                                              data_handler=data_handler)
+
+    def load_bt_data(self) -> Tuple[Dict[str, DataFrame], TimeRange]:
+        # Igual que Backtesting.load_bt_data, con velas residentes
+        self._set_progress_step(BacktestState.DATALOAD, 1)
+        data = load_data(
+            datadir=self.config["datadir"],
+            pairs=self.pairlists.whitelist,
+            timeframe=self.timeframe,
+            timerange=self.timerange,
+            startup_candles=self.required_startup,
+            fail_without_data=True,
+            data_handler=self._data_handler,
+            candle_type=self.config.get("candle_type_def", CandleType.SPOT),
+        )
+        min_date, max_date = history.get_timerange(data)
+        logger.info(
+            f"Loading data from {min_date.strftime(DATETIME_PRINT_FORMAT)} "
+            f"up to {max_date.strftime(DATETIME_PRINT_FORMAT)} "
+            f"({(max_date - min_date).days} days)."
+        )
+        self.timerange.adjust_start_if_necessary(
+            timeframe_to_seconds(self.timeframe), self.required_startup, min_date
+        )
+        self._increment_progress()
+        self._load_bt_data_detail()
+        self.price_pair_prec = {}
+        candle_type = self.config.get("candle_type_def", CandleType.SPOT)
+        for pair in self.pairlists.whitelist:
+            if pair in data:
+                self.price_pair_prec[pair] = self._data_handler.tick_sizes(
+                    pair, self.timeframe, candle_type, data[pair])
+                self.available_pairs.append(pair)
+        return data, self.timerange
+
+
+class BacktestService:
+    """
+    Queue of backtest jobs, run in submission order on one worker thread
+    (freqtrade's backtesting keeps process-wide state), sharing candles,
+    exchanges and strategy classes.
+
+    :param config: Config file(s) for jobs that do not name their own
+    """
+
+    def __init__(self, config: List[str]) -> None:
+        self.config = config
+        self.done = 0
+        self.strategies = StrategyClasses()
+        self._handlers: Dict[Tuple[str, str], ResidentDataHandler] = {}
+        self._exchanges: Dict[Tuple[str, str, str], Any] = {}
+        self._worker = ThreadPoolExecutor(1, thread_name_prefix="mhm-backtest")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._sources = _sources_stamp()
+        self._restore = install_strategy_classes(self.strategies)
+
+    def submit(self, job: Dict[str, Any]) -> Tuple[Future, int]:
+        """Queue ``job``; returns its future and the number of jobs ahead of it."""
+        if job.get("engine", "freqtrade") not in ENGINES:
+            raise ValueError(f"Unknown engine {job['engine']!r}")
+        with self._lock:
+            position = self._pending
+            self._pending += 1
+        return self._worker.submit(self._run, job), position
+
+    def _run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self.run(job)
+        except Exception:
+            logger.exception("Backtest job failed: %s", job)
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Run ``job`` now (on the worker thread); report text, summary and timings."""
+        started = time.perf_counter()
+        args = {"config": job.get("config") or self.config,
+                "strategy": job.get("strategy", "MultiHorizonMomentum")}
+        for name in ("pairs", "timerange", "timeframe", "fee", "max_open_trades"):
+            if job.get(name) is not None:
+                args[name] = job[name]
+        config = setup_optimize_configuration(args, RunMode.BACKTEST)
+        handler = self._handler(config)
+        exchange = self._exchange(config)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            if job.get("engine", "freqtrade") == "fast":
+                summary = self._run_fast(config, exchange, handler,
+                                         job.get("exchange_precision", False))
+            else:
+                summary = self._run_freqtrade(config, exchange, handler)
+
+        warnings = []
+        if _sources_stamp() != self._sources:
+            warnings.append("the mhm package changed since the service started - "
+                            "restart it to use the new code")
+        self.done += 1
+        seconds = time.perf_counter() - started
+        logger.info("Job %d (%s, %s, %s) done in %.2f s", self.done, args["strategy"],
+                    ", ".join(config["exchange"]["pair_whitelist"]),
+                    config.get("timerange") or "all", seconds)
+        return {"output": output.getvalue(), "summary": summary, "warnings": warnings,
+                "seconds": seconds}
+
+    def _run_freqtrade(self, config: dict, exchange, handler: ResidentDataHandler) -> Dict[str, Any]:
+        backtesting = ResidentBacktesting(config, exchange, handler)
+        try:
+            backtesting.start()
+        finally:
+            Backtesting.cleanup()
+        summary = {}
+        for name, stats in backtesting.results["strategy"].items():
+            summary[name] = {key: stats.get(key) for key in (
+                "total_trades", "wins", "draws", "losses", "winrate", "profit_total_abs",
+                "profit_factor")}
+        return summary
+
+    def _run_fast(self, config: dict, exchange, handler: ResidentDataHandler,
+                  exchange_precision: bool) -> Dict[str, Any]:
+        if config.get("fee") is None:
+            config["fee"] = exchange.get_fee(symbol=config["exchange"]["pair_whitelist"][0],
+                                             taker_or_maker="maker")
+        trades, rejected = run(config, exchange if exchange_precision else None,
+                               data_handler=handler)
+        print_report(trades, rejected, config["stake_currency"])
+        return {config["strategy"]: {**summarize(trades), "rejected": rejected}}
+
+    def _handler(self, config: dict) -> ResidentDataHandler:
+        key = (str(config["datadir"]), config["dataformat_ohlcv"])
+        if key not in self._handlers:
+            self._handlers[key] = ResidentDataHandler(config["datadir"],
+                                                      config["dataformat_ohlcv"])
+        return self._handlers[key]
+
+    def _exchange(self, config: dict):
+        key = (config["exchange"]["name"], str(config.get("trading_mode", "")),
+               str(config.get("margin_mode", "")))
+        if key not in self._exchanges:
+            self._exchanges[key] = ExchangeResolver.load_exchange(config,
+                                                                  load_leverage_tiers=True)
+        return self._exchanges[key]
+
+    def status(self) -> Dict[str, Any]:
+        handlers = list(self._handlers.values())
+        return {
+            "queued": self._pending,
+            "done": self.done,
+            "strategies": self.strategies.names,
+            "strategy_loads": self.strategies.loads,
+            "candle_frames": sum(handler.frames for handler in handlers),
+            "candle_reads": sum(handler.reads for handler in handlers),
+            "candle_mb": round(sum(handler.nbytes for handler in handlers) / 1024 / 1024, 1),
+            "exchanges": [name for name, _, _ in self._exchanges],
+        }
+
+    def close(self) -> None:
+        """Finish the queued jobs and stop the worker."""
+        self._worker.shutdown(wait=True)
+        self._restore()
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Socket server
+# ────────────────────────────────────────────────────────────────────────────────
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        try:
+            message = json.loads(self.rfile.readline())
+            op = message["op"]
+        except (ValueError, KeyError, TypeError):
+            self._send({"event": "error", "error": "Invalid request"})
+            return
+        service = self.server.service
+
+        if op == "status":
+            self._send({"event": "status", **service.status()})
+        elif op == "shutdown":
+            self._send({"event": "shutdown"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif op == "backtest":
+            try:
+                future, position = service.submit(message.get("job") or {})
+            except ValueError as exc:
+                self._send({"event": "error", "error": str(exc)})
+                return
+            self._send({"event": "queued", "position": position})
+            try:
+                answer = {"event": "done", **future.result()}
+            except Exception as exc:    # cualquier fallo del job va al cliente, no al servicio
+                answer = {"event": "error", "error": f"{type(exc).__name__}: {exc}"}
+            self._send(answer)
+        else:
+            self._send({"event": "error", "error": f"Unknown op {op!r}"})
+
+    def _send(self, answer: dict) -> None:
+        try:
+            self.wfile.write(json.dumps(answer, default=str).encode() + b"\n")
+            self.wfile.flush()
+        except OSError:
+            pass    # el cliente se fue; sus jobs siguen en la cola
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, service: BacktestService) -> None:
+        self.service = service
+        super().__init__(path, _Handler)
+
+
+def _claim_socket(path: str) -> None:
+    """Remove a socket left by a service that is no longer running."""
+    if not os.path.exists(path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise SystemExit(f"A backtest service is already listening on {path}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Persistent backtest service")
+    parser.add_argument("-c", "--config", nargs="+", default=["user_data/config.json"],
+                        help="Config file(s) for jobs that do not name their own")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    _claim_socket(args.socket)
+    service = BacktestService(args.config)
+    server = _Server(args.socket, service)
+    logger.info("Backtest service listening on %s", args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        server.server_close()
+        os.unlink(args.socket)
+        logger.info("Backtest service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Entry-signal cache
+==================
+
+Exit-tuning runs (``ATR_TP_MULT``, ``ATR_TRAIL_MULT``, ``stoploss``, ...)
+recompute the same indicators and entry signals every time, although only the
+trade simulation depends on what changed. ``SignalCache`` stores what the fast
+backtester simulates - per pair the ``PairArrays``: candles, ATR, entry
+candles, tick sizes - in ``user_data/cache/signals``, under a key of
+everything that can change them (``entry_key``):
+
+* the strategy module and the ``mhm`` modules loaded with it (source);
+* the strategy's upper-case attributes and hyperopt parameter values, except
+  the exit settings (``mhm.backtest.EXIT_ATTRIBUTES``), its timeframe and
+  startup candles;
+* pairs, timerange, data format and candle type, and the candle files (name,
+  size and modification time of every file under ``datadir``).
+
+A run with a known key skips loading candles, indicators and signals and
+only simulates the exits, on the same arrays a full run builds - the trades
+are identical. Entries are evicted least recently used beyond ``max_entries``.
+"""
+
+import hashlib
+import inspect
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from freqtrade.strategy import IStrategy
+
+from mhm.backtest import EXIT_ATTRIBUTES, PairArrays, strategy_value
+
+logger = logging.getLogger(__name__)
+
+_ARRAYS = ("dates", "open", "high", "low", "atr", "entries")
+
+
+def entry_key(config: dict, strategy: IStrategy) -> str:
+    """Hash of everything the entry signals and simulated candles depend on (see module doc)."""
+    digest = hashlib.blake2b(digest_size=16)
+    # El resolver de freqtrade carga la estrategia fuera de sys.modules: su fichero va en __file__
+    sources = [getattr(strategy, "__file__", None) or inspect.getsourcefile(type(strategy))]
+    sources += sorted(module.__file__ for name, module in list(sys.modules.items())
+                      if name.startswith("mhm.") and getattr(module, "__file__", None))
+    for source in sources:
+        digest.update(Path(source).read_bytes())
+
+    attributes = sorted(name for name in dir(type(strategy))
+                        if name.isupper() and name not in EXIT_ATTRIBUTES)
+    digest.update(repr([(name, strategy_value(strategy, name)) for name in attributes]).encode())
+    digest.update(repr((
+        type(strategy).__name__, config["timeframe"], strategy.startup_candle_count,
+        config.get("timerange"), config["exchange"]["pair_whitelist"],
+        config["dataformat_ohlcv"], str(config.get("candle_type_def", "spot")),
+    )).encode())
+
+    datadir = Path(config["datadir"])
+    for root, _, files in sorted(os.walk(datadir)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            digest.update(f"{os.path.relpath(root, datadir)}/{name}:{stat.st_size}:"
+                          f"{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+class SignalCache:
+    """
+    One ``.npz`` per key with the arrays of every pair.
+
+    :param directory: Cache directory (created on first store)
+    :param max_entries: Entries kept; least recently used go first
+    """
+
+    def __init__(self, directory: Path, max_entries: int = 32) -> None:
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+
+    @staticmethod
+    def key(config: dict, strategy: IStrategy) -> str:
+        return entry_key(config, strategy)
+
+    def load(self, key: str) -> Optional[List[PairArrays]]:
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                pairs = [
+                    PairArrays(
+                        pair=str(pair),
+                        **{name: entry[f"{name}_{i}"] for name in _ARRAYS},
+                        price_ticks=pd.Series(
+                            entry[f"ticks_{i}"],
+                            index=pd.DatetimeIndex(pd.to_datetime(entry[f"tick_dates_{i}"],
+                                                                  utc=True), name="date"),
+                        ),
+                    )
+                    for i, pair in enumerate(entry["pairs"])
+                ]
+        except (OSError, ValueError, KeyError) as exc:
+            if path.exists():
+                logger.warning("Ignoring unreadable signal cache %s: %s", path.name, exc)
+            return None
+        os.utime(path)
+        return pairs
+
+    def store(self, key: str, pairs: List[PairArrays]) -> None:
+        arrays = {"pairs": np.array([data.pair for data in pairs])}
+        for i, data in enumerate(pairs):
+            for name in _ARRAYS:
+                arrays[f"{name}_{i}"] = getattr(data, name)
+            arrays[f"ticks_{i}"] = data.price_ticks.to_numpy(dtype=np.float64)
+            arrays[f"tick_dates_{i}"] = data.price_ticks.index.as_unit("ns").asi8
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_name(f"{key}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(fh, allow_pickle=False, **arrays)
+        os.replace(tmp, path)
+        self._evict(keep=path)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def _evict(self, keep: Path) -> None:
+        files = []
+        for entry in self.directory.glob("*.npz"):
+            try:
+                files.append((entry.stat().st_mtime, entry))
+            except FileNotFoundError:     # evicted meanwhile by a concurrent run
+                continue
+        files.sort(key=lambda item: item[0], reverse=True)
+        for _, entry in files[self.max_entries:]:
+            if entry != keep:
+                entry.unlink(missing_ok=True)
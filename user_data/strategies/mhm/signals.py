@@ -0,0 +1,188 @@
+"""
+Fused entry conditions
+======================
+
+``populate_entry_trend`` AND-s six or seven conditions. Evaluated as pandas
+expressions, each one allocates its own full-length boolean Series (plus the
+rolling mean, ``pct_change`` and ``diff`` temporaries) before they are
+combined. ``entry_mask`` evaluates them straight on the column arrays into
+one ``uint8`` per row, one bit per condition, through one reused scratch
+row (plus the rolling volume threshold).
+
+The mask is kept in the analyzed dataframe (``ENTRY_MASK_COLUMN``), so
+later analysis can ask which conditions held on a candle without
+recomputing them::
+
+    mask = dataframe[ENTRY_MASK_COLUMN].to_numpy()
+    rsi_ok = condition(mask, "rsi")
+    almost = only_missing(mask, "volume")   # every condition but volume held
+
+For hyperopt, ``indicator_bank`` computes the columns the entry parameters
+select between - an EMA per candidate period, a rolling volume mean per
+candidate window - once, as one 2-D block; each epoch then only points
+``entry_mask`` at its columns (``ema_columns``, ``volume_mean_column``).
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+import talib
+
+ENTRY_MASK_COLUMN = "entry_mask"
+
+# Bit order of the mask - append only, stored masks depend on it
+ENTRY_CONDITIONS = (
+    "ema_stack",        # ema_fast > ema_mid > ema_slow
+    "volume",           # volume > rolling(volume_window) mean * volume_mult
+    "direction_15m",    # ema_fast_15m > ema_mid_15m (set when the 15m columns are missing)
+    "rsi",              # rsi > rsi_min
+    "macd",             # macd > macdsignal
+    "volume_roc",       # volume.pct_change(5) > 0
+    "usdt",             # usdt_sma7_diff_1d < 0 (daily SMA7 change of USDT dominance)
+)
+BITS: Dict[str, int] = {name: 1 << i for i, name in enumerate(ENTRY_CONDITIONS)}
+
+VOLUME_WINDOW = 30
+VOLUME_ROC_PERIOD = 5
+
+EMA_COLUMNS: Tuple[str, str, str] = ("ema_fast", "ema_mid", "ema_slow")
+
+
+def ema_bank_column(period: int) -> str:
+    """Bank column of the EMA(``period``) of the close."""
+    return f"ema_{period}"
+
+
+def volume_bank_column(window: int) -> str:
+    """Bank column of the rolling ``window``-candle volume mean."""
+    return f"volume_mean_{window}"
+
+
+def volume_mean(volume: np.ndarray, window: int = VOLUME_WINDOW) -> np.ndarray:
+    """Rolling mean of ``volume`` over ``window`` candles (NaN before the first full window)."""
+    n = len(volume)
+    mean = np.full(n, np.nan)
+    if n >= window:
+        acc = mean[window - 1:]
+        acc[:] = volume[window - 1:]
+        for lag in range(1, window):    # in-place shifted adds, no window copies
+            np.add(acc, volume[window - 1 - lag:n - lag], out=acc)
+        np.divide(mean, window, out=mean)
+    return mean
+
+
+def indicator_bank(dataframe: DataFrame, ema_periods: Sequence[int],
+                   volume_windows: Sequence[int]) -> DataFrame:
+    """
+    EMA of the close for every period and volume mean for every window, as
+    one float64 block (``ema_bank_column`` / ``volume_bank_column`` names).
+    """
+    close = dataframe["close"].to_numpy(dtype=np.float64)
+    volume = dataframe["volume"].to_numpy(dtype=np.float64)
+    names = ([ema_bank_column(p) for p in ema_periods]
+             + [volume_bank_column(w) for w in volume_windows])
+    # Una fila por columna: cada columna del DataFrame queda contigua en memoria
+    bank = np.empty((len(names), len(dataframe)), dtype=np.float64)
+    for row, period in enumerate(ema_periods):
+        bank[row] = talib.EMA(close, timeperiod=period) if len(close) else close
+    for row, window in enumerate(volume_windows, start=len(ema_periods)):
+        bank[row] = volume_mean(volume, window)
+    return DataFrame(bank.T, columns=names, index=dataframe.index, copy=False)
+
+
+def entry_mask(dataframe: DataFrame, rsi_min: float, volume_mult: float,
+               usdt_column: Optional[str] = None,
+               ema_columns: Tuple[str, str, str] = EMA_COLUMNS,
+               volume_window: int = VOLUME_WINDOW,
+               volume_mean_column: Optional[str] = None) -> np.ndarray:
+    """
+    Per-row condition bits (see ``ENTRY_CONDITIONS``). NaN inputs leave a bit
+    unset, like the pandas comparisons they replace.
+
+    :param usdt_column: Daily change of the USDT dominance SMA; the ``usdt`` bit stays unset
+        without it
+    :param ema_columns: Fast / mid / slow EMA columns of the stack
+    :param volume_window: Candles of the rolling volume mean
+    :param volume_mean_column: Precomputed rolling volume mean (``indicator_bank``) to use
+        instead of computing it over ``volume_window``
+    """
+    n = len(dataframe)
+    mask = np.zeros(n, dtype=np.uint8)
+    hit = np.empty(n, dtype=np.uint8)   # scratch: one condition at a time
+    flag = hit.view(bool)
+    if n == 0:
+        return mask
+
+    def col(name: str) -> np.ndarray:
+        return dataframe[name].to_numpy(dtype=np.float64, copy=False)
+
+    def put(bit: int, combine=np.bitwise_or) -> None:
+        np.left_shift(hit, bit.bit_length() - 1, out=hit)
+        if combine is np.bitwise_and:
+            np.bitwise_or(hit, 0xFF ^ bit, out=hit)
+        combine(mask, hit, out=mask)
+
+    fast, mid, slow = ema_columns
+    np.greater(col(fast), col(mid), out=flag)
+    put(BITS["ema_stack"])
+    np.greater(col(mid), col(slow), out=flag)
+    put(BITS["ema_stack"], np.bitwise_and)
+
+    volume = col("volume")
+    if volume_mean_column is not None:
+        threshold = np.multiply(col(volume_mean_column), volume_mult)
+    else:
+        threshold = volume_mean(volume, volume_window)
+        np.multiply(threshold, volume_mult, out=threshold)
+    np.greater(volume, threshold, out=flag)     # NaN (short history): bit unset
+    put(BITS["volume"])
+
+    if "ema_fast_15m_15m" in dataframe.columns and "ema_mid_15m_15m" in dataframe.columns:
+        np.greater(col("ema_fast_15m_15m"), col("ema_mid_15m_15m"), out=flag)
+        put(BITS["direction_15m"])
+    else:
+        mask |= BITS["direction_15m"]
+
+    np.greater(col("rsi"), rsi_min, out=flag)
+    put(BITS["rsi"])
+    np.greater(col("macd"), col("macdsignal"), out=flag)
+    put(BITS["macd"])
+
+    # pct_change(5) > 0  <=>  volume grew over 5 candles (volume is never negative)
+    flag[:VOLUME_ROC_PERIOD] = False
+    np.greater(volume[VOLUME_ROC_PERIOD:], volume[:-VOLUME_ROC_PERIOD],
+               out=flag[VOLUME_ROC_PERIOD:])
+    put(BITS["volume_roc"])
+
+    if usdt_column is not None:
+        np.less(col(usdt_column), 0, out=flag)
+        put(BITS["usdt"])
+
+    return mask
+
+
+def required_bits(use_usdt: bool = False) -> int:
+    """Bits that must all be set for an entry."""
+    bits = 0
+    for name in ENTRY_CONDITIONS:
+        if name != "usdt" or use_usdt:
+            bits |= BITS[name]
+    return bits
+
+
+def entries(mask: np.ndarray, required: int) -> np.ndarray:
+    """Rows where every ``required`` condition held."""
+    return (mask & required) == required
+
+
+def condition(mask: np.ndarray, name: str) -> np.ndarray:
+    """Rows where condition ``name`` held."""
+    return (mask & BITS[name]) != 0
+
+
+def only_missing(mask: np.ndarray, name: str, required: Optional[int] = None) -> np.ndarray:
+    """Rows where every required condition but ``name`` held, and ``name`` did not."""
+    required = required_bits() if required is None else required
+    return (mask & required) == (required & ~BITS[name])
@@ -0,0 +1,158 @@
+"""
+Warm-restart candle snapshots
+=============================
+
+After a restart (``restart: unless-stopped``, a deploy) freqtrade starts with
+an empty candle cache and downloads the startup candles of every pair and
+informative timeframe again before the strategy can analyze anything.
+``CandleSnapshot`` keeps a copy of the exchange's candle cache (the 1m and
+15m frames ``dp.ohlcv`` / ``dp.get_pair_dataframe`` answer from) in
+``user_data/cache/snapshots``, written on a schedule and at shutdown, and
+puts it back into the cache when the bot starts. The recursive state of the
+streaming indicators (``StreamingIndicators.export``) is written to the same
+file, so the restored pairs resume it instead of re-seeding it.
+
+freqtrade then treats the restored frames like its own: the first refresh is
+a single call per pair for the candles since the last snapshotted one, merged
+onto the snapshot, and a timeframe whose last candle is still current (the
+15m bar after a quick restart) is not fetched at all. A frame whose gap is
+longer than one exchange call can cover is left out, and freqtrade downloads
+it in full as usual. The informative caches are rebuilt from the restored
+candles on the first analysis.
+
+The candle cache is freqtrade's private ``Exchange._klines`` /
+``_pairs_last_refresh_time``. ``supported`` checks that the running version
+still keeps it that way; otherwise the bot starts cold, as without snapshots.
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from freqtrade.data.converter import ohlcv_to_dataframe
+from freqtrade.enums import CandleType
+from freqtrade.exchange import date_minus_candles
+
+logger = logging.getLogger(__name__)
+
+# Candle types with OHLCV frames (funding rates have other columns and refresh on their own)
+_CANDLE_TYPES = (CandleType.SPOT, CandleType.FUTURES, CandleType.MARK, CandleType.INDEX)
+
+# Prefix of the indicator-state arrays in the snapshot file
+_INDICATORS = "indicators_"
+
+
+def supported(exchange) -> bool:
+    """True when ``exchange`` keeps its candle cache the way the snapshots expect."""
+    klines = getattr(exchange, "_klines", None)
+    refreshed = getattr(exchange, "_pairs_last_refresh_time", None)
+    if not isinstance(klines, dict) or not isinstance(refreshed, dict):
+        return False
+    if not callable(getattr(exchange, "ohlcv_candle_limit", None)):
+        return False
+    return all(isinstance(key, tuple) and len(key) == 3 and isinstance(frame, DataFrame)
+               for key, frame in list(klines.items()))
+
+
+class CandleSnapshot:
+    """
+    One ``.npz`` with the cached candles of every (pair, timeframe, candle type)
+    of an exchange.
+
+    :param directory: Snapshot directory (created on first save)
+    :param name: File name, e.g. the exchange and trading mode
+    :param interval: Minimum seconds between two scheduled saves (``due``)
+    """
+
+    def __init__(self, directory: Path, name: str, interval: float) -> None:
+        self.path = Path(directory) / f"{name}.npz"
+        self.interval = interval
+        self.indicators: Dict[str, np.ndarray] = {}     # state read by restore
+        self._saved = time.monotonic()
+
+    def due(self) -> bool:
+        return time.monotonic() - self._saved >= self.interval
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot file was written (inf if there is none)."""
+        try:
+            return time.time() - self.path.stat().st_mtime
+        except OSError:
+            return float("inf")
+
+    def save(self, exchange, indicators: Optional[Dict[str, np.ndarray]] = None) -> int:
+        """
+        Write the exchange's candle cache; number of frames written.
+
+        :param indicators: Indicator state arrays to store alongside (``indicators`` on restore)
+        """
+        arrays: Dict[str, np.ndarray] = {}
+        keys = []
+        for (pair, timeframe, candle_type), frame in list(exchange._klines.items()):
+            if candle_type not in _CANDLE_TYPES or frame.empty:
+                continue
+            i = len(keys)
+            keys.append((pair, timeframe, str(candle_type)))
+            arrays[f"dates_{i}"] = frame["date"].dt.as_unit("ms").astype("int64").to_numpy()
+            arrays[f"values_{i}"] = frame.iloc[:, 1:6].to_numpy(dtype=np.float64)
+        self._saved = time.monotonic()
+        if not keys:
+            return 0
+        arrays["keys"] = np.array(keys)
+        arrays.update({_INDICATORS + name: values for name, values in (indicators or {}).items()})
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(fh, allow_pickle=False, **arrays)
+        os.replace(tmp, self.path)
+        return len(keys)
+
+    def restore(self, exchange) -> Tuple[int, int]:
+        """
+        Seed the exchange's candle cache from the snapshot, and read the indicator
+        state stored with it into ``indicators``.
+
+        :return: Frames restored, frames skipped because their gap is too long
+        """
+        try:
+            with np.load(self.path, allow_pickle=False) as entry:
+                frames = [(tuple(key), entry[f"dates_{i}"], entry[f"values_{i}"])
+                          for i, key in enumerate(entry["keys"])]
+                self.indicators = {name[len(_INDICATORS):]: entry[name] for name in entry.files
+                                   if name.startswith(_INDICATORS)}
+        except (OSError, ValueError, KeyError) as exc:
+            if self.path.exists():
+                logger.warning("Ignoring unreadable candle snapshot %s: %s", self.path.name, exc)
+            return 0, 0
+
+        restored = stale = 0
+        for (pair, timeframe, candle_type), dates, values in frames:
+            candle_type = CandleType.from_string(candle_type)
+            key = (str(pair), str(timeframe), candle_type)
+            if key in exchange._klines or not len(dates):
+                continue
+            # Igual que freqtrade: una sola llamada (límite - 5 velas) debe cubrir el hueco
+            limit = exchange.ohlcv_candle_limit(key[1], candle_type)
+            oldest = date_minus_candles(key[1], limit - 5).timestamp() * 1000
+            if dates[-1] <= oldest:
+                stale += 1
+                continue
+            exchange._klines[key] = _frame(key, dates, values)
+            exchange._pairs_last_refresh_time[key] = int(dates[-1])
+            restored += 1
+        return restored, stale
+
+
+def _frame(key: Tuple[str, str, CandleType], dates: np.ndarray, values: np.ndarray) -> DataFrame:
+    pair, timeframe, candle_type = key
+    # ms exactos en float64 hasta el año 287396
+    rows = np.column_stack((dates.astype(np.float64), values)).tolist()
+    return ohlcv_to_dataframe(rows, timeframe, pair, fill_missing=False, drop_incomplete=False,
+                              candle_type=candle_type)
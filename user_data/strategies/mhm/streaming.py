@@ -0,0 +1,324 @@
+"""
+Streaming (incremental) indicators
+==================================
+
+Keeps per-pair recursive state for every indicator ``MultiHorizonMomentum``
+computes on the base timeframe, so a new closed candle costs one O(1) update per
+indicator instead of a full recompute of the dataframe:
+
+* EMA: the last average, ``ema += (close - ema) * 2 / (n + 1)``;
+* ATR (Wilder): the last average and close, ``atr = (atr * (n - 1) + tr) / n``;
+* RSI (Wilder): the average gain and loss, smoothed the same way;
+* MACD: its fast and slow EMA and the signal EMA.
+
+The state is seeded from talib's batch output over the first dataframe of a pair
+(``MomentumStreams.open_and_fill``) and every update follows talib's own
+recursion, so streamed values track the batch path run over the same candles up
+to floating-point rounding (``tests/test_streaming.py`` checks the tolerance).
+The state remembers every candle it has been fed, so in dry/live its values
+match the batch path run over the pair's history since it was seeded, not the
+batch path re-run over freqtrade's sliding candle window (which re-seeds the
+long EMAs on every call).
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+import talib
+
+
+class InsufficientHistory(ValueError):
+    """Fewer candles than the longest indicator warm-up."""
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Recursive indicator state
+# ────────────────────────────────────────────────────────────────────────────────
+
+def _is_zero(value: float) -> bool:
+    # TA_IS_ZERO de talib
+    return -0.00000001 < value < 0.00000001
+
+
+class _Ema:
+    __slots__ = ("k", "value")
+
+    def __init__(self, period: int, value: float) -> None:
+        self.k = 2.0 / (period + 1)
+        self.value = value
+
+    def update(self, close: float) -> float:
+        self.value = ((close - self.value) * self.k) + self.value
+        return self.value
+
+
+class _Atr:
+    __slots__ = ("period", "value", "close")
+
+    def __init__(self, period: int, value: float, close: float) -> None:
+        self.period = period
+        self.value = value
+        self.close = close
+
+    def update(self, high: float, low: float, close: float) -> float:
+        true_range = max(high - low, abs(self.close - high), abs(low - self.close))
+        self.close = close
+        self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+
+class _Rsi:
+    __slots__ = ("period", "gain", "loss", "close")
+
+    def __init__(self, period: int, gain: float, loss: float, close: float) -> None:
+        self.period = period
+        self.gain = gain
+        self.loss = loss
+        self.close = close
+
+    @classmethod
+    def seed(cls, close: np.ndarray, period: int) -> "_Rsi":
+        """Wilder averages after ``close``, accumulated in talib's order."""
+        diffs = np.diff(close).tolist()
+        gain = sum(diff for diff in diffs[:period] if diff > 0)
+        loss = -sum(diff for diff in diffs[:period] if diff < 0)
+        state = cls(period, gain / period, loss / period, float(close[period]))
+        for value in close[period + 1:].tolist():
+            state.update(value)
+        return state
+
+    def update(self, close: float) -> float:
+        diff = close - self.close
+        self.close = close
+        self.loss *= self.period - 1
+        self.gain *= self.period - 1
+        if diff < 0:
+            self.loss -= diff
+        else:
+            self.gain += diff
+        self.loss /= self.period
+        self.gain /= self.period
+        total = self.loss + self.gain
+        return 100.0 * (self.gain / total) if not _is_zero(total) else 0.0
+
+
+class _Macd:
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast: _Ema, slow: _Ema, signal: _Ema) -> None:
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# MultiHorizonMomentum indicator set
+# ────────────────────────────────────────────────────────────────────────────────
+
+class MomentumStreams:
+    """Recursive state of every indicator column of ``MultiHorizonMomentum``."""
+
+    columns: Tuple[str, ...] = (
+        "ema_fast", "ema_mid", "ema_slow", "atr100", "rsi", "macd", "macdsignal", "macdhist",
+    )
+
+    def __init__(self, emas: List[_Ema], atr: _Atr, rsi: _Rsi, macd: _Macd) -> None:
+        self.emas = emas
+        self.atr = atr
+        self.rsi = rsi
+        self.macd = macd
+
+    @classmethod
+    def open_and_fill(cls, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                      ema_periods: Sequence[int] = (30, 120, 360), atr_period: int = 100,
+                      rsi_period: int = 14, macd_periods: Sequence[int] = (12, 26, 9)
+                      ) -> Tuple["MomentumStreams", np.ndarray]:
+        """Batch values over the history, and the state after its last candle.
+
+        Raises ``InsufficientHistory`` when the history is shorter than the
+        longest warm-up (EMA(360) with the default periods).
+        """
+        fast, slow, signal = macd_periods
+        if len(close) <= max(*ema_periods, atr_period, rsi_period, slow + signal - 2):
+            raise InsufficientHistory(f"{len(close)} candles")
+
+        values = np.empty((len(close), len(cls.columns)), dtype=np.float64)
+        emas = []
+        for idx, period in enumerate(ema_periods):
+            values[:, idx] = talib.EMA(close, timeperiod=period)
+            emas.append(_Ema(period, values[-1, idx]))
+        col = len(ema_periods)
+        values[:, col] = talib.ATR(high, low, close, timeperiod=atr_period)
+        atr = _Atr(atr_period, values[-1, col], close[-1])
+        values[:, col + 1] = talib.RSI(close, timeperiod=rsi_period)
+        rsi = _Rsi.seed(close, rsi_period)
+        values[:, col + 2], values[:, col + 3], values[:, col + 4] = talib.MACD(
+            close, fastperiod=fast, slowperiod=slow, signalperiod=signal)
+        # talib siembra la EMA rápida del MACD donde empieza la lenta
+        macd = _Macd(_Ema(fast, talib.EMA(close[slow - fast:], timeperiod=fast)[-1]),
+                     _Ema(slow, talib.EMA(close, timeperiod=slow)[-1]),
+                     _Ema(signal, values[-1, col + 3]))
+        return cls(emas, atr, rsi, macd), values
+
+    def update(self, high: float, low: float, close: float) -> List[float]:
+        row = [ema.update(close) for ema in self.emas]
+        row.append(self.atr.update(high, low, close))
+        row.append(self.rsi.update(close))
+        row.extend(self.macd.update(close))
+        return row
+
+    def state(self) -> List[float]:
+        """Running values of every indicator, in the order ``from_state`` takes them."""
+        return [ema.value for ema in self.emas] + [
+            self.atr.value, self.atr.close, self.rsi.gain, self.rsi.loss, self.rsi.close,
+            self.macd.fast.value, self.macd.slow.value, self.macd.signal.value,
+        ]
+
+    @classmethod
+    def from_state(cls, state: Sequence[float], ema_periods: Sequence[int] = (30, 120, 360),
+                   atr_period: int = 100, rsi_period: int = 14,
+                   macd_periods: Sequence[int] = (12, 26, 9)) -> "MomentumStreams":
+        count = len(ema_periods)
+        emas = [_Ema(period, float(value)) for period, value in zip(ema_periods, state[:count])]
+        atr, atr_close, gain, loss, rsi_close, fast, slow, signal = map(float, state[count:])
+        fast_period, slow_period, signal_period = macd_periods
+        return cls(emas, _Atr(atr_period, atr, atr_close),
+                   _Rsi(rsi_period, gain, loss, rsi_close),
+                   _Macd(_Ema(fast_period, fast), _Ema(slow_period, slow),
+                         _Ema(signal_period, signal)))
+
+
+def indicator_periods(ema_periods: Sequence[int] = (30, 120, 360), atr_period: int = 100,
+                      rsi_period: int = 14, macd_periods: Sequence[int] = (12, 26, 9)
+                      ) -> Tuple[int, ...]:
+    """Every period of a ``MomentumStreams`` configuration (defaults filled in)."""
+    return (*ema_periods, atr_period, rsi_period, *macd_periods)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Per-pair engine
+# ────────────────────────────────────────────────────────────────────────────────
+
+def resume_index(cached_dates: np.ndarray, dates: np.ndarray) -> Optional[int]:
+    """
+    Number of leading candles of ``dates`` already covered by ``cached_dates``
+    (i.e. the index of the first unseen candle), or None when ``dates`` does not
+    continue the cached window and cached outputs can't be reused.
+    """
+    if len(cached_dates) == 0 or len(dates) == 0:
+        return None
+    last = cached_dates[-1]
+    pos = int(np.searchsorted(dates, last))
+    if pos >= len(dates) or dates[pos] != last:
+        return None
+    overlap = pos + 1
+    if overlap > len(cached_dates) or cached_dates[len(cached_dates) - overlap] != dates[0]:
+        return None
+    return overlap
+
+
+class _PairState:
+    __slots__ = ("streams", "dates", "values")
+
+    def __init__(self, streams: MomentumStreams, dates: np.ndarray, values: np.ndarray) -> None:
+        self.streams = streams
+        self.dates = dates
+        self.values = values
+
+
+class StreamingIndicators:
+    """
+    Fills the indicator columns of each new analysis dataframe for a pair,
+    advancing the per-pair indicator state only over candles not seen before.
+
+    The first call for a pair - or any call whose candles do not continue the
+    previous ones, e.g. after a gap or a reload - seeds fresh state from the
+    batch indicators over the whole dataframe. Later calls feed only the appended candles and reuse the
+    stored outputs for the rest of the window.
+
+    ``populate`` returns None when the dataframe is too short to seed the
+    state; the caller then computes the batch indicators for that call.
+    """
+
+    def __init__(self, max_rows: int = 5000, **indicator_kwargs) -> None:
+        self.max_rows = max_rows
+        self.indicator_kwargs = indicator_kwargs
+        self.columns = MomentumStreams.columns
+        self._pairs: Dict[str, _PairState] = {}
+
+    def export(self) -> Dict[str, np.ndarray]:
+        """Per-pair state as plain arrays (``np.savez`` without pickling), for ``load``."""
+        arrays: Dict[str, np.ndarray] = {
+            "periods": np.array(indicator_periods(**self.indicator_kwargs), dtype=np.int64),
+            "pairs": np.array(list(self._pairs), dtype=str),
+        }
+        for i, state in enumerate(self._pairs.values()):
+            arrays[f"dates_{i}"] = state.dates
+            arrays[f"values_{i}"] = state.values
+            arrays[f"state_{i}"] = np.array(state.streams.state(), dtype=np.float64)
+        return arrays
+
+    def load(self, arrays: Dict[str, np.ndarray]) -> int:
+        """
+        Take back the state ``export`` wrote (e.g. before a restart); pairs already
+        analyzed keep theirs. Ignored when the indicator periods differ.
+
+        :return: Pairs restored
+        """
+        if "periods" not in arrays or tuple(arrays["periods"].tolist()) != indicator_periods(
+                **self.indicator_kwargs):
+            return 0
+        restored = 0
+        for i, pair in enumerate(arrays["pairs"].tolist()):
+            if pair in self._pairs:
+                continue
+            streams = MomentumStreams.from_state(arrays[f"state_{i}"].tolist(),
+                                                 **self.indicator_kwargs)
+            self._pairs[pair] = _PairState(streams, arrays[f"dates_{i}"], arrays[f"values_{i}"])
+            restored += 1
+        return restored
+
+    def reset(self, pair: Optional[str] = None) -> None:
+        if pair is None:
+            self._pairs.clear()
+        else:
+            self._pairs.pop(pair, None)
+
+    def populate(self, dataframe: DataFrame, pair: str) -> Optional[DataFrame]:
+        dates = dataframe["date"].values
+        high = dataframe["high"].to_numpy(dtype=np.float64)
+        low = dataframe["low"].to_numpy(dtype=np.float64)
+        close = dataframe["close"].to_numpy(dtype=np.float64)
+
+        state = self._pairs.get(pair)
+        start = resume_index(state.dates, dates) if state is not None else None
+
+        if start is None:
+            try:
+                streams, values = MomentumStreams.open_and_fill(
+                    high, low, close, **self.indicator_kwargs)
+            except InsufficientHistory:
+                self._pairs.pop(pair, None)
+                return None
+        else:
+            streams = state.streams
+            new = np.array([
+                streams.update(h, l, c)
+                for h, l, c in zip(high[start:].tolist(), low[start:].tolist(),
+                                   close[start:].tolist())
+            ], dtype=np.float64).reshape(-1, len(self.columns))
+            values = np.concatenate((state.values[len(state.values) - start:], new))
+
+        keep = min(len(values), self.max_rows)
+        self._pairs[pair] = _PairState(streams, dates[-keep:], values[-keep:])
+
+        for idx, col in enumerate(self.columns):
+            dataframe[col] = values[:, idx]
+        return dataframe
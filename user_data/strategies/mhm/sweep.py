@@ -0,0 +1,206 @@
+"""
+Parameter sweep
+===============
+
+Runs a grid of ``MultiHorizonMomentum`` variants through the fast backtester
+(``mhm.backtest``). The expensive part - loading candles and
+``populate_indicators`` (talib, 15m merge) - runs once per pair; each variant
+only re-evaluates ``populate_entry_trend`` on a copy of the indicator frames
+and simulates the trades. Variants are spread over a process pool; the
+indicator frames reach each worker once, through the pool initializer.
+
+A variant is a set of strategy class attributes, e.g. ``ENTRY_RSI_MIN``,
+``ENTRY_VOLUME_MULT``, ``ATR_TP_MULT``, ``ATR_TRAIL_MULT``. Hyperopt parameters
+are swept within their ranges; the indicators are calculated as for a
+hyperopt of them, so the ones that select indicator columns (EMA periods,
+volume window) work too. A grid of exit settings only (``EXIT_ATTRIBUTES``)
+builds the entry signals once and only simulates per variant.
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.sweep -c user_data/config.json \\
+        -p BTC/USDT --timerange 20241120-20241210 --fee 0.0002 --timeframe 1m \\
+        --grid ENTRY_RSI_MIN=55,60 ENTRY_VOLUME_MULT=1.7,2.0 ATR_TP_MULT=3.5,4.0
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.configuration import Configuration, TimeRange
+from freqtrade.enums import RunMode
+from freqtrade.resolvers import StrategyResolver
+from freqtrade.strategy.parameters import BaseParameter
+
+from mhm.backtest import (EXIT_ATTRIBUTES, ExitModel, PairArrays, candidates, check_supported,
+                          load_indicators, pair_arrays, set_strategy_value, simulate, summarize,
+                          tick_sizes)
+from mhm.ohlcv_store import DATA_FORMAT
+
+logger = logging.getLogger(__name__)
+
+# Attributes the fast backtest reads but freqtrade never acts on for this strategy
+_NO_EFFECT = {"ATR_SL_MULT": "custom_stoploss is not called (use_custom_stoploss is unset)"}
+
+# Per-process state, set by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def parse_grid(items: List[str]) -> Dict[str, List[Any]]:
+    """``["NAME=v1,v2", ...]`` -> ``{"NAME": [v1, v2]}`` (values parsed as JSON scalars)."""
+    grid: Dict[str, List[Any]] = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if not values:
+            raise ValueError(f"Grid entry {item!r} is not NAME=value[,value...]")
+        grid[name.strip()] = [_parse_value(value) for value in values.split(",")]
+    return grid
+
+
+def _parse_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def variants(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Workers
+# ────────────────────────────────────────────────────────────────────────────────
+
+def _init_worker(config: dict, indicators: Dict[str, DataFrame], ticks: Dict[str, pd.Series],
+                 timerange: TimeRange, arrays: Optional[List[PairArrays]] = None) -> None:
+    strategy = StrategyResolver.load_strategy(config)
+    strategy.ft_load_hyper_params()     # parameter file values, as in the parent
+    _WORKER.update(
+        strategy=strategy,
+        config=config,
+        indicators=indicators,
+        ticks=ticks,
+        timerange=timerange,
+        arrays=arrays,
+    )
+
+
+def _run_variant(params: Dict[str, Any]) -> Dict[str, Any]:
+    strategy = _WORKER["strategy"]
+    config = _WORKER["config"]
+    for name, value in params.items():
+        set_strategy_value(strategy, name, value)
+
+    pairs = _WORKER["arrays"] or _signal_arrays(strategy, _WORKER["indicators"],
+                                                _WORKER["ticks"], _WORKER["timerange"])
+    trades, rejected = simulate(pairs, ExitModel.from_strategy(strategy),
+                                float(config["stake_amount"]), float(config["fee"]),
+                                int(config.get("max_open_trades", -1)))
+    return {**params, **summarize(trades), "rejected": rejected}
+
+
+def _signal_arrays(strategy, indicators: Dict[str, DataFrame], ticks: Dict[str, pd.Series],
+                   timerange: TimeRange) -> List[PairArrays]:
+    pairs = []
+    for pair, df in indicators.items():
+        analyzed = strategy.ft_advise_signals(df.copy(), {"pair": pair})
+        arrays = pair_arrays(pair, analyzed, timerange, strategy.startup_candle_count,
+                             price_ticks=ticks[pair])
+        if arrays is not None:
+            pairs.append(arrays)
+    return pairs
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Runner
+# ────────────────────────────────────────────────────────────────────────────────
+
+def sweep(config: dict, grid: Dict[str, List[Any]], workers: Optional[int] = None,
+          sort_by: str = "profit_total_abs") -> DataFrame:
+    """Evaluate every combination of ``grid``; one row per variant, best first."""
+    strategy = StrategyResolver.load_strategy(config)
+    check_supported(strategy)
+    unknown = [name for name in grid if not hasattr(type(strategy), name)]
+    if unknown:
+        raise ValueError(f"{type(strategy).__name__} has no attribute(s): {', '.join(unknown)}")
+    optimized = []
+    for name, values in grid.items():
+        if name in _NO_EFFECT:
+            logger.warning("%s has no effect on the results: %s", name, _NO_EFFECT[name])
+        param = getattr(strategy, name)
+        if isinstance(param, BaseParameter):
+            outside = [value for value in values if value not in candidates(param)]
+            if outside:
+                raise ValueError(f"{name}: {outside} outside the parameter's hyperopt range")
+            optimized.append(name)
+
+    indicators, timerange = load_indicators(config, strategy, optimized=optimized)
+    ticks = {pair: tick_sizes(df) for pair, df in indicators.items()}
+    arrays = None
+    if all(name in EXIT_ATTRIBUTES for name in grid):
+        # Solo cambian las salidas: las entradas se calculan una vez para todas las variantes
+        arrays = _signal_arrays(strategy, indicators, ticks, timerange)
+    init_args = (config, indicators, ticks, timerange, arrays)
+    todo = variants(grid)
+
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers <= 1:
+        _init_worker(*init_args)
+        rows = [_run_variant(params) for params in todo]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args) as pool:
+            rows = list(pool.map(_run_variant, todo))
+
+    return DataFrame(rows).sort_values(sort_by, ascending=False, kind="stable") \
+        .reset_index(drop=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Parameter sweep for MultiHorizonMomentum")
+    parser.add_argument("-c", "--config", default="user_data/config.json")
+    parser.add_argument("-s", "--strategy", default="MultiHorizonMomentum")
+    parser.add_argument("-p", "--pairs", nargs="+")
+    parser.add_argument("--timerange")
+    parser.add_argument("--timeframe")
+    parser.add_argument("--fee", type=float)
+    parser.add_argument("--max-open-trades", type=int)
+    parser.add_argument("--data-format", choices=["json", "jsongz", "feather", "parquet",
+                                                  DATA_FORMAT],
+                        help="Candle storage format (default: dataformat_ohlcv from the config)")
+    parser.add_argument("--grid", nargs="+", required=True, metavar="NAME=V1,V2",
+                        help="Strategy attribute and the values to try")
+    parser.add_argument("-j", "--workers", type=int, help="Processes (default: all cores)")
+    parser.add_argument("--sort", default="profit_total_abs")
+    parser.add_argument("--export", metavar="CSV", help="Also write the table to a CSV file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cli = {"config": [args.config], "strategy": args.strategy, "timerange": args.timerange,
+           "timeframe": args.timeframe, "fee": args.fee, "pairs": args.pairs,
+           "max_open_trades": args.max_open_trades}
+    config = Configuration({k: v for k, v in cli.items() if v is not None},
+                           RunMode.BACKTEST).get_config()
+    if args.data_format:
+        config["dataformat_ohlcv"] = args.data_format
+    if config.get("fee") is None:
+        parser.error("--fee is required (or set 'fee' in the config)")
+
+    table = sweep(config, parse_grid(args.grid), args.workers, args.sort)
+    with pd.option_context("display.width", 200, "display.max_columns", 30,
+                           "display.max_rows", 500):
+        print(table.to_string(float_format=lambda v: f"{v:.4f}"))
+    if args.export:
+        table.to_csv(args.export, index=False)
+
+
+if __name__ == "__main__":
+    main()
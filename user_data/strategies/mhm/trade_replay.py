@@ -0,0 +1,342 @@
+"""
+Trade-level replay backtest
+===========================
+
+On 1m candles the ATR exits of ``custom_exit`` are only approximated: the
+take-profit is checked against the candle open, ``trade.max_rate`` jumps to
+the candle high at once, and whether the high or the low came first is
+unknown. ``replay`` backtests on the exchange trades instead
+(``dataformat_trades``: ``json`` / ``jsongz``), streamed from the files in
+bounded chunks - a file is never loaded whole:
+
+1. the trades files are decompressed and parsed a block at a time
+   (``iter_trades``) and aggregated into candles of the strategy timeframe
+   (``build_candles``), from ``startup_candle_count`` candles before the
+   timerange;
+2. the strategy analyzes those candles as in ``mhm.backtest`` - same entries,
+   at the first trade of the candle after the signal;
+3. the trades are streamed again, every pair from its own forward-only
+   cursor, and each open trade's exits are evaluated on every exchange trade:
+   ``current_rate`` is the trade price, ``max_rate`` the highest price since
+   the entry, the ATR the one of the last closed candle. Take-profit,
+   trailing and stop fill at the price of the trade that crosses them.
+
+``max_open_trades``, re-entries (from the candle after the exit) and the
+signal shift are handled by ``mhm.backtest.simulate``. Trades still open at
+the end are closed at the last trade of the timerange. Informative
+timeframes (15m) are still read from the stored candles.
+
+Usage (from the repository root)::
+
+    PYTHONPATH=user_data/strategies python -m mhm.trade_replay -c user_data/config.json \\
+        -p BTC/USDT --timerange 20241101-20241201 --fee 0.0002 --timeframe 1m
+"""
+
+import argparse
+import gzip
+import io
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.configuration import Configuration, TimeRange
+from freqtrade.data.converter import clean_ohlcv_dataframe
+from freqtrade.data.history.datahandlers.idatahandler import get_datahandlerclass
+from freqtrade.enums import ExitType, RunMode, TradingMode
+from freqtrade.exchange import timeframe_to_msecs
+from freqtrade.resolvers import StrategyResolver
+
+from mhm.backtest import (ExitModel, PairArrays, _Exit, analyze, check_supported,
+                          exchange_precision, pair_arrays, print_report, simulate)
+from mhm.resample import _Bars
+
+logger = logging.getLogger(__name__)
+
+# Decompressed bytes read per block (gzip read(n) returns n bytes of json)
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Trade columns read from the files (DEFAULT_TRADES_COLUMNS: timestamp, id, type, side,
+# price, amount, cost)
+_COLUMNS = (0, 4, 5)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Trades files
+# ────────────────────────────────────────────────────────────────────────────────
+
+def trades_file(datadir: Path, pair: str, data_format: str,
+                trading_mode: TradingMode = TradingMode.SPOT) -> Path:
+    if data_format not in ("json", "jsongz"):
+        raise ValueError(f"Trades in {data_format} cannot be streamed - use json or jsongz")
+    handler = get_datahandlerclass(data_format)
+    return handler._pair_trades_filename(Path(datadir), pair, trading_mode)
+
+
+def _parse_rows(rows: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # "[t,id,type,side,price,amount,cost],[...]" -> una línea CSV por trade
+    text = rows.replace(b"],[", b"\n").replace(b"], [", b"\n").strip(b"[] \n")
+    frame = pd.read_csv(io.BytesIO(text), header=None, usecols=list(_COLUMNS),
+                        dtype={0: np.int64, 4: np.float64, 5: np.float64}, engine="c",
+                        float_precision="round_trip")
+    return frame[0].to_numpy(), frame[4].to_numpy(), frame[5].to_numpy()
+
+
+def iter_trades(path: Path, start_ms: Optional[int] = None, stop_ms: Optional[int] = None,
+                chunk_bytes: int = CHUNK_BYTES
+                ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Trades of a json / jsongz trades file as (timestamp ms, price, amount) arrays,
+    one block at a time, limited to ``start_ms <= timestamp < stop_ms``. Reading
+    stops at the first trade past ``stop_ms`` (the files are in time order).
+    ``chunk_bytes``: decompressed json bytes per block.
+    """
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as fh:
+        pending = fh.read(chunk_bytes).lstrip()[1:]     # "[" del array exterior
+        while pending:
+            block = fh.read(chunk_bytes)
+            if block:
+                # Corte tras la última fila completa ("],")
+                cut = pending.rfind(b"],")
+                if cut < 0:
+                    pending += block
+                    continue
+                rows, pending = pending[:cut + 1], pending[cut + 2:] + block
+            else:
+                rows, pending = pending.rstrip()[:-1], b""      # "]" del array exterior
+            if not rows.strip():
+                continue
+            dates, prices, amounts = _parse_rows(rows)
+            first = 0 if start_ms is None else int(np.searchsorted(dates, start_ms))
+            last = len(dates) if stop_ms is None else int(np.searchsorted(dates, stop_ms))
+            if first < last:
+                yield dates[first:last], prices[first:last], amounts[first:last]
+            if last < len(dates):
+                return
+
+
+def build_candles(trades: Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                  timeframe: str, pair: str = "") -> DataFrame:
+    """OHLCV candles of ``timeframe`` from streamed trades (gaps filled like freqtrade)."""
+    bar_ns = timeframe_to_msecs(timeframe) * 10**6
+    bars = _Bars()
+    for dates, prices, amounts in trades:
+        values = np.column_stack((prices, prices, prices, prices, amounts))
+        bars.add(dates * 10**6, values, bar_ns, 10**6, None)
+    dates, values = bars.dates, bars.values
+    if bars.open_date is not None:
+        dates = np.r_[dates, bars.open_date]
+        values = np.vstack((values, bars.open_values))
+    candles = DataFrame(values, columns=["open", "high", "low", "close", "volume"])
+    candles.insert(0, "date", pd.to_datetime(dates, unit="ns", utc=True))
+    return clean_ohlcv_dataframe(candles, timeframe, pair, fill_missing=True,
+                                 drop_incomplete=False)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Trade-level exits
+# ────────────────────────────────────────────────────────────────────────────────
+
+class TradeCursor:
+    """Forward-only position in the trades of one pair."""
+
+    def __init__(self, chunks: Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> None:
+        self._chunks = chunks
+        self.dates = np.empty(0, dtype=np.int64)
+        self.prices = np.empty(0)
+        self.pos = 0
+        self.last_date: Optional[int] = None
+        self.last_price: Optional[float] = None
+
+    def block(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Trades from the current position to the end of the loaded block (None at the end)."""
+        while self.pos >= len(self.dates):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return None
+            self.dates, self.prices, _ = chunk
+            self.pos = 0
+            if len(self.dates):
+                self.last_date, self.last_price = int(self.dates[-1]), float(self.prices[-1])
+        return self.dates[self.pos:], self.prices[self.pos:]
+
+    def seek(self, date_ms: int) -> None:
+        """Skip the trades before ``date_ms``."""
+        while (block := self.block()) is not None:
+            skip = int(np.searchsorted(block[0], date_ms))
+            self.pos += skip
+            if skip < len(block[0]):
+                return
+
+
+def find_trade_exit(cursor: TradeCursor, data: PairArrays, entry: int, model: ExitModel,
+                    stop_rate: float) -> Tuple[_Exit, np.datetime64]:
+    """
+    First exchange trade from the open of candle ``entry`` on that crosses an
+    exit level of a trade opened there; the exit and its date.
+    """
+    candle_ms = data.dates.astype("datetime64[ms]").view(np.int64)
+    open_rate = float(data.open[entry])
+    cursor.seek(int(candle_ms[entry]))
+    max_rate = open_rate
+
+    while (block := cursor.block()) is not None:
+        dates, prices = block
+        candle = np.searchsorted(candle_ms, dates, side="right") - 1
+        atr = np.full(len(dates), data.atr[entry]) if model.fixed_at_entry else data.atr[candle]
+        rates = np.maximum.accumulate(np.maximum(prices, max_rate))
+
+        take_profit = open_rate + model.tp_mult * atr
+        trail = open_rate + model.trail_mult * atr
+        hit_tp = (atr != 0) & (prices >= take_profit)
+        hit_trail = (atr != 0) & (rates >= trail) & (prices < trail)
+        hit_stop = prices <= stop_rate
+
+        hits = np.flatnonzero(hit_tp | hit_trail | hit_stop)
+        if hits.size:
+            idx = int(hits[0])
+            cursor.pos += idx + 1
+            if hit_tp[idx] or hit_trail[idx]:
+                exit_ = _Exit(int(candle[idx]), float(prices[idx]), ExitType.CUSTOM_EXIT.value,
+                              "atr_tp" if hit_tp[idx] else "atr_trail")
+            else:
+                exit_ = _Exit(int(candle[idx]), float(prices[idx]), ExitType.STOP_LOSS.value,
+                              None)
+            return exit_, np.datetime64(int(dates[idx]), "ms").astype("datetime64[ns]")
+        max_rate = float(rates[-1])
+        cursor.pos += len(dates)
+
+    last = len(data.dates) - 1
+    if cursor.last_date is None:
+        return (_Exit(last, float(data.open[last]), ExitType.FORCE_EXIT.value, None),
+                data.dates[last])
+    return (_Exit(last, cursor.last_price, ExitType.FORCE_EXIT.value, None),
+            np.datetime64(cursor.last_date, "ms").astype("datetime64[ns]"))
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Runner
+# ────────────────────────────────────────────────────────────────────────────────
+
+def _ms(date: np.datetime64) -> int:
+    return int(date.astype("datetime64[ms]").astype(np.int64))
+
+
+def _stream_range(config: dict, timerange: TimeRange, startup_candles: int
+                  ) -> Tuple[Optional[int], Optional[int]]:
+    """Milliseconds of the trades to read: startup candles before the timerange included."""
+    start = stop = None
+    if timerange.startts:
+        startup_ms = startup_candles * timeframe_to_msecs(config["timeframe"])
+        start = timerange.startts * 1000 - startup_ms
+    if timerange.stopts:
+        stop = timerange.stopts * 1000
+    return start, stop
+
+
+def replay(config: dict, exchange=None, chunk_bytes: int = CHUNK_BYTES
+           ) -> Tuple[DataFrame, int, Dict[str, float]]:
+    """
+    Trade-level backtest of ``config["strategy"]`` over ``config["timerange"]``.
+
+    :return: Trades, entries rejected for lack of a slot, and statistics (trades in
+        the replayed range, size of their files, seconds taken)
+    """
+    if not isinstance(config["stake_amount"], (int, float)):
+        raise ValueError("Trade replay needs a fixed stake_amount")
+    strategy = StrategyResolver.load_strategy(config)
+    check_supported(strategy)
+    timerange = TimeRange.parse_timerange(config.get("timerange"))
+    start, stop = _stream_range(config, timerange, strategy.startup_candle_count)
+    data_format = config.get("dataformat_trades", "feather")
+    files = {pair: trades_file(config["datadir"], pair, data_format,
+                               config.get("trading_mode", TradingMode.SPOT))
+             for pair in config["exchange"]["pair_whitelist"]}
+    stats = {"trades": 0, "bytes": 0, "seconds": 0.0}
+
+    def counted(pair: str) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        for chunk in iter_trades(files[pair], start, stop, chunk_bytes):
+            stats["trades"] += len(chunk[0])
+            yield chunk
+
+    began = time.perf_counter()
+    candles = {}
+    for pair, path in files.items():
+        if not path.exists():
+            logger.warning("No trades for %s (%s)", pair, path)
+            continue
+        candles[pair] = build_candles(counted(pair), config["timeframe"], pair)
+        stats["bytes"] += path.stat().st_size
+        logger.info("%s: %d candles from %s", pair, len(candles[pair]), path.name)
+    if not candles:
+        raise ValueError("No trades files found.")
+
+    analyzed, timerange = analyze(config, strategy, data=candles)
+    pairs: List[PairArrays] = []
+    for pair, df in analyzed.items():
+        arrays = pair_arrays(pair, df, timerange, strategy.startup_candle_count)
+        if arrays is not None:
+            pairs.append(arrays._replace(**exchange_precision(exchange, pair)))
+    if not pairs:
+        raise ValueError("No data left after adjusting for startup candles.")
+
+    model = ExitModel.from_strategy(strategy)
+    cursors = [TradeCursor(iter_trades(files[data.pair], _ms(data.dates[0]), stop, chunk_bytes))
+               for data in pairs]
+
+    def exits(order: int, entry: int, stop_rate: float):
+        return find_trade_exit(cursors[order], pairs[order], entry, model, stop_rate)
+
+    trades, rejected = simulate(pairs, model, float(config["stake_amount"]), float(config["fee"]),
+                                int(config.get("max_open_trades", -1)), exits=exits)
+    stats["seconds"] = time.perf_counter() - began
+    return trades, rejected, stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Trade-level replay backtest")
+    parser.add_argument("-c", "--config", default="user_data/config.json")
+    parser.add_argument("-s", "--strategy", default="MultiHorizonMomentum")
+    parser.add_argument("-p", "--pairs", nargs="+")
+    parser.add_argument("--timerange")
+    parser.add_argument("--timeframe")
+    parser.add_argument("--fee", type=float)
+    parser.add_argument("--max-open-trades", type=int)
+    parser.add_argument("--data-format-trades", choices=["json", "jsongz"],
+                        help="Trades storage format (default: dataformat_trades from the config)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / 1024 / 1024,
+                        help="Decompressed MB of json parsed per block")
+    parser.add_argument("--exchange-precision", action="store_true",
+                        help="Load exchange markets to round amounts like freqtrade")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cli = {"config": [args.config], "strategy": args.strategy, "timerange": args.timerange,
+           "timeframe": args.timeframe, "fee": args.fee, "pairs": args.pairs,
+           "max_open_trades": args.max_open_trades}
+    config = Configuration({k: v for k, v in cli.items() if v is not None},
+                           RunMode.BACKTEST).get_config()
+    if args.data_format_trades:
+        config["dataformat_trades"] = args.data_format_trades
+    if config.get("fee") is None:
+        parser.error("--fee is required (or set 'fee' in the config)")
+
+    exchange = None
+    if args.exchange_precision:
+        from freqtrade.resolvers import ExchangeResolver
+        exchange = ExchangeResolver.load_exchange(config, load_leverage_tiers=False)
+
+    trades, rejected, stats = replay(config, exchange, int(args.chunk_mb * 1024 * 1024))
+    print_report(trades, rejected, config["stake_currency"])
+    print(f"Replayed        : {stats['trades']:,} exchange trades, "
+          f"{stats['bytes'] / 1024 / 1024:.0f} MB of files in {stats['seconds']:.1f} s "
+          f"({stats['trades'] / max(stats['seconds'], 1e-9):,.0f} trades/s overall)")
+
+
+if __name__ == "__main__":
+    main()